@@ -0,0 +1,24 @@
+CREATE EXTENSION IF NOT EXISTS unaccent;
+
+-- Configuración de full-text en español que además ignora acentos
+-- ("Cartelería" y "Carteleria" generan el mismo lexema).
+DO $$
+BEGIN
+    IF NOT EXISTS (SELECT 1 FROM pg_ts_config WHERE cfgname = 'docbot_es') THEN
+        CREATE TEXT SEARCH CONFIGURATION docbot_es (COPY = spanish);
+        ALTER TEXT SEARCH CONFIGURATION docbot_es
+            ALTER MAPPING FOR hword, hword_part, word
+            WITH unaccent, spanish_stem;
+    END IF;
+END
+$$;
+
+ALTER TABLE doc_chunks
+    ADD COLUMN IF NOT EXISTS search_tsv tsvector
+    GENERATED ALWAYS AS (
+        setweight(to_tsvector('docbot_es', coalesce(heading, '')), 'A')
+        || setweight(to_tsvector('docbot_es', content), 'B')
+    ) STORED;
+
+CREATE INDEX IF NOT EXISTS idx_chunks_search_tsv
+    ON doc_chunks USING GIN (search_tsv);
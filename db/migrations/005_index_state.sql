@@ -0,0 +1,10 @@
+-- Generación del índice: se incrementa en cada sync que cambia docs/chunks.
+-- Los caches en proceso (resultados de búsqueda, respuestas) la usan como
+-- parte de su clave para invalidarse solos entre réplicas del API.
+CREATE TABLE IF NOT EXISTS index_state (
+    id         BOOLEAN PRIMARY KEY DEFAULT true CHECK (id),
+    generation BIGINT NOT NULL DEFAULT 0,
+    updated_at TIMESTAMPTZ DEFAULT now()
+);
+
+INSERT INTO index_state (id) VALUES (true) ON CONFLICT (id) DO NOTHING;
@@ -0,0 +1,44 @@
+-- Copia de docs.source / docs.doc_type en doc_chunks para que los índices
+-- HNSW parciales (WHERE doc_type = '...') puedan expresarse sobre la tabla
+-- indexada. Los triggers mantienen la copia sin cambios en el indexer.
+-- Idempotente (se re-ejecuta en cada arranque): el backfill solo toca
+-- chunks anteriores a los triggers y los triggers se reemplazan sin
+-- DROP (CREATE OR REPLACE TRIGGER, Postgres >= 14), así no hay una
+-- ventana en la que un INSERT concurrente quede sin copiar.
+
+ALTER TABLE doc_chunks ADD COLUMN IF NOT EXISTS source TEXT;
+ALTER TABLE doc_chunks ADD COLUMN IF NOT EXISTS doc_type TEXT;
+
+UPDATE doc_chunks c
+SET source = d.source, doc_type = d.doc_type
+FROM docs d
+WHERE c.doc_id = d.id
+  AND c.source IS NULL;
+
+CREATE OR REPLACE FUNCTION doc_chunks_copy_filters() RETURNS trigger AS $$
+BEGIN
+    SELECT d.source, d.doc_type INTO NEW.source, NEW.doc_type
+    FROM docs d
+    WHERE d.id = NEW.doc_id;
+    RETURN NEW;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE TRIGGER trg_doc_chunks_copy_filters
+    BEFORE INSERT OR UPDATE OF doc_id ON doc_chunks
+    FOR EACH ROW EXECUTE FUNCTION doc_chunks_copy_filters();
+
+CREATE OR REPLACE FUNCTION docs_propagate_filters() RETURNS trigger AS $$
+BEGIN
+    UPDATE doc_chunks
+    SET source = NEW.source, doc_type = NEW.doc_type
+    WHERE doc_id = NEW.id;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE TRIGGER trg_docs_propagate_filters
+    AFTER UPDATE OF source, doc_type ON docs
+    FOR EACH ROW
+    WHEN (OLD.source IS DISTINCT FROM NEW.source OR OLD.doc_type IS DISTINCT FROM NEW.doc_type)
+    EXECUTE FUNCTION docs_propagate_filters();
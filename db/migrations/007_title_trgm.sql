@@ -0,0 +1,16 @@
+CREATE EXTENSION IF NOT EXISTS pg_trgm;
+
+-- Normalización de títulos igual a docbot.search.resolver.normalize: sin
+-- acentos, minúsculas y todo lo que no sea alfanumérico como espacio
+-- ("Turn-o-Matic" → "turn o matic"). unaccent no es IMMUTABLE, así que se
+-- envuelve fijando el diccionario para poder indexar la expresión.
+CREATE OR REPLACE FUNCTION docbot_normalize(text) RETURNS text
+LANGUAGE sql IMMUTABLE PARALLEL SAFE STRICT AS $$
+    SELECT trim(regexp_replace(
+        lower(public.unaccent('public.unaccent'::regdictionary, $1)),
+        '[^a-z0-9]+', ' ', 'g'
+    ))
+$$;
+
+CREATE INDEX IF NOT EXISTS idx_docs_title_trgm
+    ON docs USING GIN (docbot_normalize(title) gin_trgm_ops);
@@ -0,0 +1,17 @@
+-- Blast radius precalculado: por doc, sus dependientes transitivos (hasta
+-- la profundidad máxima de analyze_impact) con salto, camino y aristas.
+-- Lo reescribe completo cada sync con cambios (docbot.search.blast_radius).
+CREATE TABLE IF NOT EXISTS blast_radius (
+    doc_id             UUID PRIMARY KEY REFERENCES docs(id) ON DELETE CASCADE,
+    max_depth          INT NOT NULL,
+    dependents_count   INT NOT NULL,
+    criticality_counts JSONB NOT NULL DEFAULT '{}',
+    nodes              JSONB NOT NULL,
+    edges              JSONB NOT NULL,
+    generation         BIGINT NOT NULL,
+    computed_at        TIMESTAMPTZ DEFAULT now()
+);
+
+-- Generación del índice que refleja la tabla; si difiere de la actual el
+-- blast radius está desactualizado y se calcula en vivo.
+ALTER TABLE index_state ADD COLUMN IF NOT EXISTS blast_radius_generation BIGINT;
@@ -0,0 +1,38 @@
+-- Una sola arista por (from, to, relation_type). Antes el indexer insertaba
+-- una fila por mención (frontmatter + wikilink al mismo destino) y cada
+-- duplicado multiplicaba filas en los recorridos recursivos.
+
+-- Compacta los duplicados existentes: conserva la fila de mayor confianza
+-- con la evidencia de todo el grupo. Idempotente: sin duplicados no hace nada.
+WITH groups AS (
+    SELECT
+        from_doc_id,
+        to_doc_id,
+        relation_type,
+        (array_agg(id ORDER BY confidence DESC NULLS LAST, updated_at DESC))[1] AS keep_id,
+        string_agg(DISTINCT evidence, '; ' ORDER BY evidence) AS evidence,
+        max(confidence) AS confidence
+    FROM edges
+    GROUP BY from_doc_id, to_doc_id, relation_type
+    HAVING count(*) > 1
+),
+merged AS (
+    UPDATE edges e
+    SET evidence = g.evidence, confidence = g.confidence, updated_at = now()
+    FROM groups g
+    WHERE e.id = g.keep_id
+    RETURNING e.id
+)
+DELETE FROM edges e
+USING groups g
+WHERE e.from_doc_id = g.from_doc_id
+  AND e.to_doc_id = g.to_doc_id
+  AND e.relation_type = g.relation_type
+  AND e.id <> g.keep_id;
+
+-- Cubre también las búsquedas por from_doc_id (prefijo), que antes usaban
+-- idx_edges_from.
+CREATE UNIQUE INDEX IF NOT EXISTS uq_edges_from_to_type
+    ON edges (from_doc_id, to_doc_id, relation_type);
+
+DROP INDEX IF EXISTS idx_edges_from;
@@ -0,0 +1,4 @@
+-- Centralidad del doc en el grafo de edges (PageRank ponderado por
+-- confidence, normalizado a [0, 1]). La recalcula cada sync con cambios
+-- (docbot.search.centrality) y la búsqueda la usa como prior del ranking.
+ALTER TABLE docs ADD COLUMN IF NOT EXISTS centrality REAL NOT NULL DEFAULT 0;
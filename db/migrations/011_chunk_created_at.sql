@@ -0,0 +1,5 @@
+-- Momento en que se escribió cada chunk. La réplica en memoria
+-- (docbot.search.replica) versiona cada doc por sus chunks (cantidad y
+-- último created_at), no solo por docs.updated_at, para no quedarse con
+-- chunks viejos si refresca a mitad de un sync.
+ALTER TABLE doc_chunks ADD COLUMN IF NOT EXISTS created_at TIMESTAMPTZ NOT NULL DEFAULT now();
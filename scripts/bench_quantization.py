@@ -0,0 +1,129 @@
+"""Compara recall y latencia de los índices vectoriales (float32, halfvec, binario).
+
+Uso (con el venv del proyecto activado y la BD ya indexada):
+
+    python scripts/bench_quantization.py
+    python scripts/bench_quantization.py --queries 200 --top-k 10 --rerank-factor 4 8
+
+Lee la configuración desde el archivo .env de la raíz del proyecto.
+
+El script:
+1. Toma ``--queries`` embeddings de chunks existentes como queries de prueba.
+2. Calcula el top-k exacto (fuerza bruta sobre float32) como ground truth.
+3. Ejecuta cada variante (HNSW float32, halfvec y binario con re-rank) y
+   reporta recall@k contra el ground truth y latencias p50/p95.
+
+Los índices compactos deben existir (``DOCBOT_SEARCH_VECTOR_INDEX`` +
+``ensure_vector_indexes``); las variantes cuyo índice falta se reportan
+igual pero caen a un seq scan, lo que se nota en la latencia.
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import pathlib
+import statistics
+import sys
+import time
+
+# Asegura que `src/` esté en el path cuando se ejecuta como script.
+_PROJECT_ROOT = pathlib.Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(_PROJECT_ROOT / "src"))
+
+from docbot.clients import close_clients  # noqa: E402
+from docbot.config import get_settings  # noqa: E402
+from docbot.database import close_pool, create_pool  # noqa: E402
+from docbot.search.hybrid import hybrid_search  # noqa: E402
+from docbot.search.planner import SearchPlan  # noqa: E402
+
+_SAMPLE_QUERY = """
+    SELECT embedding
+    FROM doc_chunks
+    WHERE embedding IS NOT NULL
+    ORDER BY random()
+    LIMIT $1
+"""
+
+
+def _parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        description="Benchmark de recall/latencia de los índices vectoriales compactos.",
+    )
+    parser.add_argument("--queries", type=int, default=100, help="Queries de prueba. Default: 100")
+    parser.add_argument("--top-k", type=int, default=10, help="k del recall@k. Default: 10")
+    parser.add_argument(
+        "--rerank-factor",
+        type=int,
+        nargs="+",
+        default=[2, 4, 8],
+        help="Factores de re-rank a probar para halfvec/binario. Default: 2 4 8",
+    )
+    return parser.parse_args()
+
+
+def _percentile(values: list[float], pct: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(pct * (len(ordered) - 1))))]
+
+
+async def _run(conn, embeddings, top_k: int, plan: SearchPlan) -> tuple[list[set[str]], list[float]]:
+    hits: list[set[str]] = []
+    latencies: list[float] = []
+    for emb in embeddings:
+        t0 = time.perf_counter()
+        results = await hybrid_search(conn, emb, top_k=top_k, plan=plan, use_cache=False)
+        latencies.append((time.perf_counter() - t0) * 1000)
+        hits.append({r.chunk_id for r in results})
+    return hits, latencies
+
+
+async def main() -> int:
+    args = _parse_args()
+    settings = get_settings()
+    print(f"[info] DB: {settings.database_url[:55]}…")
+
+    pool = await create_pool(settings)
+    try:
+        async with pool.acquire() as conn:
+            rows = await conn.fetch(_SAMPLE_QUERY, args.queries)
+            embeddings = [list(map(float, r["embedding"])) for r in rows]
+            if not embeddings:
+                print("[error] No hay chunks con embedding; corre sync_local.py primero.")
+                return 1
+
+            print(f"[info] {len(embeddings)} queries, top_k={args.top_k}")
+            truth, exact_ms = await _run(
+                conn, embeddings, args.top_k, SearchPlan(strategy="exact")
+            )
+
+            variants: list[tuple[str, SearchPlan]] = [("full", SearchPlan())]
+            for index in ("halfvec", "binary"):
+                for factor in args.rerank_factor:
+                    variants.append(
+                        (f"{index} x{factor}", SearchPlan(vector_index=index, rerank_factor=factor))
+                    )
+
+            print()
+            print(f"  {'variante':<14} {'recall@k':>9} {'p50 ms':>8} {'p95 ms':>8}")
+            print(
+                f"  {'exact':<14} {1.0:>9.3f} "
+                f"{statistics.median(exact_ms):>8.1f} {_percentile(exact_ms, 0.95):>8.1f}"
+            )
+            for name, plan in variants:
+                hits, latencies = await _run(conn, embeddings, args.top_k, plan)
+                recall = statistics.mean(
+                    len(h & t) / len(t) for h, t in zip(hits, truth) if t
+                )
+                print(
+                    f"  {name:<14} {recall:>9.3f} "
+                    f"{statistics.median(latencies):>8.1f} {_percentile(latencies, 0.95):>8.1f}"
+                )
+        return 0
+    finally:
+        await close_pool()
+        await close_clients()
+
+
+if __name__ == "__main__":
+    raise SystemExit(asyncio.run(main()))
@@ -28,9 +28,11 @@ import sys
 _PROJECT_ROOT = pathlib.Path(__file__).resolve().parent.parent
 sys.path.insert(0, str(_PROJECT_ROOT / "src"))
 
+from docbot.clients import close_clients  # noqa: E402
 from docbot.config import get_settings  # noqa: E402
 from docbot.database import close_pool, create_pool, run_migrations  # noqa: E402
 from docbot.indexer.sync import sync_repo  # noqa: E402
+from docbot.search.indexes import ensure_vector_indexes  # noqa: E402
 
 
 DEFAULT_VAULT = "/Users/hervispichardo/zeroq/knowledge-web/vault"
@@ -88,6 +90,8 @@ async def main() -> int:
         if not args.no_migrations:
             print("[info] Ejecutando migraciones SQL…")
             await run_migrations(pool)
+            async with pool.acquire() as conn:
+                await ensure_vector_indexes(conn, settings)
 
         print("[info] Iniciando sync (puede tardar varios minutos en el primer run)…")
         result = await sync_repo(
@@ -116,6 +120,7 @@ async def main() -> int:
         return 0 if not result.errors else 2
     finally:
         await close_pool()
+        await close_clients()
 
 
 if __name__ == "__main__":
@@ -3,16 +3,24 @@
 from __future__ import annotations
 
 from dataclasses import dataclass, field
-from typing import Union
+from typing import AsyncIterator, Union
 
 import asyncpg
-from langchain_core.messages import AIMessage, BaseMessage, HumanMessage, SystemMessage
+from langchain_core.messages import (
+    AIMessage,
+    AIMessageChunk,
+    BaseMessage,
+    HumanMessage,
+    SystemMessage,
+)
 from langchain_openai import ChatOpenAI
 from langgraph.prebuilt import create_react_agent
 
 from docbot.agent.tools import ALL_TOOLS, configure_tools
+from docbot.clients import get_http_client, prompt_cache_kwargs
 from docbot.config import Settings
 from docbot.rag.prompts import ANSWER_SYSTEM_PROMPT
+from docbot.usage import record_message_usage
 
 _compiled_graph = None
 
@@ -27,6 +35,9 @@ def build_agent(settings: Settings, pool: asyncpg.Pool):
         model=settings.rag_model,
         temperature=settings.rag_temperature,
         api_key=settings.openai_api_key,
+        http_async_client=get_http_client(settings),
+        stream_usage=True,
+        model_kwargs=prompt_cache_kwargs(settings, "agent"),
     )
 
     _compiled_graph = create_react_agent(
@@ -65,14 +76,36 @@ class AgentAnswer:
     tool_calls: list[dict] = field(default_factory=list)
 
 
+@dataclass
+class AgentStep:
+    """Paso intermedio del agente durante ``stream_agent``.
+
+    ``kind`` es ``tool_start`` (con ``tool`` y ``args``), ``tool_end`` (con
+    ``tool`` y el preview del resultado en ``text``), ``token`` (fragmento
+    de la respuesta final en ``text``) o ``thinking`` (texto que el LLM
+    escribió en un turno que terminó llamando tools).
+    """
+
+    kind: str
+    tool: str | None = None
+    args: dict | None = None
+    text: str = ""
+
+
 AgentResult = Union[AgentAnswer, AgentClarification]
+AgentEvent = Union[AgentStep, AgentAnswer, AgentClarification]
 
 
 def _build_lc_messages(
     messages: list[dict[str, str]],
     command_prompt: str | None,
 ) -> list[BaseMessage]:
-    """Construye la lista de mensajes para LangGraph desde el historial JSON."""
+    """Construye la lista de mensajes para LangGraph desde el historial JSON.
+
+    El agente antepone ``ANSWER_SYSTEM_PROMPT`` (tools + ese prompt son el
+    prefijo estático que cachea el proveedor); el prompt del comando va
+    después, así no rompe el prefijo compartido entre comandos.
+    """
     lc_messages: list[BaseMessage] = []
 
     if command_prompt:
@@ -95,56 +128,86 @@ def _extract_final_reply(messages: list[BaseMessage]) -> str:
     return ""
 
 
-async def invoke_agent(
+async def stream_agent(
     messages: list[dict[str, str]],
     *,
     command_prompt: str | None = None,
-) -> AgentResult:
-    """Ejecuta el agente y retorna AgentAnswer o AgentClarification.
-
-    Usa `astream(stream_mode="updates")` para inspeccionar cada paso del grafo:
+    tokens: bool = True,
+) -> AsyncIterator[AgentEvent]:
+    """Ejecuta el agente emitiendo sus pasos a medida que ocurren.
+
+    Emite ``AgentStep`` intermedios (``tool_start`` por cada tool_call del
+    LLM, ``tool_end`` por cada tool ejecutada y, con ``tokens``, ``token``
+    con cada fragmento de texto del LLM) y termina con un único
+    ``AgentAnswer`` o ``AgentClarification``.
+
+    Los fragmentos de cada turno del LLM se retienen hasta que el turno
+    termina: si no llamó tools se emiten como ``token`` (y suman exactamente
+    ``AgentAnswer.reply``); si llamó tools, su texto (preámbulos, razonamiento
+    antes de ``ask_user``) sale como un único ``thinking``.
+
+    Recorre ``astream`` con ``stream_mode="updates"`` (más ``"messages"``
+    para los tokens):
     - Si en el nodo `agent` el LLM emite un tool_call con name="ask_user",
-      se interrumpe el ReAct loop ANTES de ejecutar la tool y se retorna
+      se interrumpe el ReAct loop ANTES de ejecutar la tool y se emite
       AgentClarification con la pregunta.
     - En cualquier otro caso se acumulan los tool_calls intermedios y se
-      retorna AgentAnswer con el texto del último AIMessage.
-
-    Args:
-        messages: Historial [{"role": "user"|"assistant", "content": "..."}].
-        command_prompt: System prompt alternativo para comandos (ej: /user-story).
-
-    Returns:
-        AgentAnswer o AgentClarification.
+      emite AgentAnswer con el texto del último AIMessage.
     """
     agent = get_agent()
     lc_messages = _build_lc_messages(messages, command_prompt)
 
     tool_calls_info: list[dict] = []
     all_messages: list[BaseMessage] = list(lc_messages)
-
-    async for update in agent.astream(
-        {"messages": lc_messages}, stream_mode="updates"
-    ):
-        # update es {nodo: {messages: [...nuevos mensajes...]}}
-        for node, payload in update.items():
+    turn_tokens: list[str] = []
+    modes = ["updates", "messages"] if tokens else ["updates"]
+
+    async for mode, chunk in agent.astream({"messages": lc_messages}, stream_mode=modes):
+        if mode == "messages":
+            # chunk es (AIMessageChunk, metadata) por cada fragmento del LLM.
+            msg, metadata = chunk
+            if (
+                isinstance(msg, AIMessageChunk)
+                and metadata.get("langgraph_node") == "agent"
+                and isinstance(msg.content, str)
+                and msg.content
+            ):
+                turn_tokens.append(msg.content)
+            continue
+
+        # chunk es {nodo: {messages: [...nuevos mensajes...]}}
+        for node, payload in chunk.items():
             new_msgs = payload.get("messages", []) if isinstance(payload, dict) else []
             all_messages.extend(new_msgs)
 
             if node == "agent":
+                for m in new_msgs:
+                    record_message_usage(m)
                 # Inspeccionar tool_calls del último AIMessage para detectar ask_user
                 if not new_msgs:
                     continue
                 ai_msg = new_msgs[-1]
                 tool_calls = getattr(ai_msg, "tool_calls", None) or []
+                if tool_calls and turn_tokens:
+                    yield AgentStep(kind="thinking", text="".join(turn_tokens))
+                elif not tool_calls:
+                    for text in turn_tokens:
+                        yield AgentStep(kind="token", text=text)
+                turn_tokens.clear()
                 for tc in tool_calls:
                     if tc.get("name") == "ask_user":
                         args = tc.get("args", {}) or {}
-                        return AgentClarification(
+                        yield AgentClarification(
                             question=str(args.get("question", "")).strip(),
                             options=args.get("options"),
                             reason=args.get("reason"),
                             tool_calls=tool_calls_info,
                         )
+                        return
+                for tc in tool_calls:
+                    yield AgentStep(
+                        kind="tool_start", tool=tc.get("name"), args=tc.get("args") or {}
+                    )
 
             elif node == "tools":
                 # Loguear las tools que sí se ejecutaron
@@ -152,12 +215,31 @@ async def invoke_agent(
                     name = getattr(m, "name", None)
                     if name:
                         content = getattr(m, "content", "") or ""
-                        tool_calls_info.append(
-                            {
-                                "tool": name,
-                                "result_preview": content[:200] if isinstance(content, str) else "",
-                            }
-                        )
+                        preview = content[:200] if isinstance(content, str) else ""
+                        tool_calls_info.append({"tool": name, "result_preview": preview})
+                        yield AgentStep(kind="tool_end", tool=name, text=preview)
+
+    yield AgentAnswer(reply=_extract_final_reply(all_messages), tool_calls=tool_calls_info)
+
+
+async def invoke_agent(
+    messages: list[dict[str, str]],
+    *,
+    command_prompt: str | None = None,
+) -> AgentResult:
+    """Ejecuta el agente y retorna AgentAnswer o AgentClarification.
+
+    Versión sin streaming de ``stream_agent``: descarta los pasos
+    intermedios y retorna el resultado final.
+
+    Args:
+        messages: Historial [{"role": "user"|"assistant", "content": "..."}].
+        command_prompt: System prompt alternativo para comandos (ej: /user-story).
 
-    reply = _extract_final_reply(all_messages)
-    return AgentAnswer(reply=reply, tool_calls=tool_calls_info)
+    Returns:
+        AgentAnswer o AgentClarification.
+    """
+    async for event in stream_agent(messages, command_prompt=command_prompt, tokens=False):
+        if not isinstance(event, AgentStep):
+            return event
+    raise RuntimeError("El agente terminó sin resultado.")
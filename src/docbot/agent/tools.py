@@ -11,8 +11,19 @@ from langchain_core.tools import tool
 
 from docbot.config import Settings
 from docbot.embeddings import embed_text
-from docbot.search.graph import impact_analysis
-from docbot.search.hybrid import hybrid_search
+from docbot.profiling import acquire
+from docbot.search.blast_radius import MAX_DEPTH as BLAST_RADIUS_MAX_DEPTH
+from docbot.search.centrality import prior_for
+from docbot.search.diversify import diversity_for
+from docbot.search.expand import expand_with_neighbors, expansion_for
+from docbot.search.graph import (
+    ImpactResult,
+    dependency_graph,
+    impact_analysis,
+    resolve_titles,
+)
+from docbot.search.hybrid import fusion_for, hybrid_search
+from docbot.search.planner import plan_search
 
 logger = structlog.get_logger(__name__)
 
@@ -43,6 +54,11 @@ async def knowledge_search(
         "module, agent, skill, runbook. None = todos los tipos.",
     ] = None,
     top_k: Annotated[int, "Cantidad de resultados a retornar (1-20)"] = 6,
+    expand_graph: Annotated[
+        bool | None,
+        "True = agrega fragmentos de los docs enlazados (dependencias / servicios "
+        "relacionados) a los mejores resultados. None = según la configuración.",
+    ] = None,
 ) -> str:
     """Busca en la base de conocimiento de ZeroQ usando búsqueda semántica híbrida.
 
@@ -62,6 +78,10 @@ async def knowledge_search(
     - Skills (capacidades AI): query="skill de resiliencia code review", doc_type="skill"
     - Agentes AI: query="cómo está armado el Docbot", doc_type="agent"
 
+    Con `expand_graph=True` también trae fragmentos de los docs enlazados a los
+    mejores resultados (ej: la infra de la que depende el servicio encontrado),
+    evitando llamadas extra a `get_service_detail` / `analyze_impact`.
+
     Retorna los fragmentos más relevantes con su ubicación exacta para citar.
     Si la primera búsqueda no devuelve resultados, reintenta sin doc_type o con
     sinónimos antes de afirmar que no existe documentación.
@@ -69,10 +89,26 @@ async def knowledge_search(
     pool, settings = _require_deps()
     query_embedding = await embed_text(query, settings)
 
-    async with pool.acquire() as conn:
+    top_k = min(top_k, 20)
+
+    async with acquire(pool, "knowledge_search") as conn:
+        plan = await plan_search(conn, settings, top_k=top_k, doc_type=doc_type)
         results = await hybrid_search(
-            conn, query_embedding, top_k=min(top_k, 20), doc_type=doc_type,
+            conn,
+            query_embedding,
+            top_k=top_k,
+            doc_type=doc_type,
+            query_text=query,
+            fusion=fusion_for(settings),
+            plan=plan,
+            diversity=diversity_for(settings, settings.rag_diversify),
+            prior=prior_for(settings),
         )
+        expansion = expansion_for(settings, expand_graph)
+        if results and expansion is not None:
+            results = results + await expand_with_neighbors(
+                conn, query_embedding, results, expansion
+            )
 
     if not results:
         return "No se encontraron resultados relevantes en la base de conocimiento."
@@ -81,7 +117,10 @@ async def knowledge_search(
     for i, r in enumerate(results, 1):
         heading = f"#{r.heading}" if r.heading else ""
         ref = f"{r.repo}:{r.path}{heading}"
-        parts.append(f"[{i}] {ref} (score: {r.score:.2f})\n{r.snippet}")
+        via = ""
+        if r.expanded_from:
+            via = f" (relacionado: {r.relation_type} con {r.expanded_from})"
+        parts.append(f"[{i}] {ref} (score: {r.score:.2f}){via}\n{r.snippet}")
 
     parts.append(
         "\n--- IMPORTANTE: Cita estas fuentes en tu respuesta con formato "
@@ -118,18 +157,29 @@ async def analyze_impact(
     """
     pool, _ = _require_deps()
 
-    async with pool.acquire() as conn:
-        result = await impact_analysis(conn, service_name, depth=min(depth, 3))
+    async with acquire(pool, "analyze_impact") as conn:
+        result = await impact_analysis(
+            conn, service_name, depth=min(depth, BLAST_RADIUS_MAX_DEPTH)
+        )
 
     if not result.nodes:
         return f"No se encontró el servicio '{service_name}' o no tiene dependientes documentados."
 
     lines = [f"## Análisis de impacto: {service_name}\n"]
     lines.append(f"**Servicios afectados:** {len(result.nodes)}\n")
+    if result.criticality_counts:
+        counts = ", ".join(f"{k}: {v}" for k, v in sorted(result.criticality_counts.items()))
+        lines.append(f"**Por criticidad:** {counts}\n")
 
     for node in result.nodes:
         crit = f" [{node.criticality}]" if node.criticality else ""
-        lines.append(f"- **{node.title}** ({node.doc_type or 'unknown'}){crit}")
+        hop = ""
+        if result.depths.get(node.doc_id):
+            via = result.paths.get(node.doc_id, [])
+            hop = f" — salto {result.depths[node.doc_id]}"
+            if len(via) > 2:
+                hop += f" vía {' → '.join(via[1:-1])}"
+        lines.append(f"- **{node.title}** ({node.doc_type or 'unknown'}){crit}{hop}")
 
     if result.edges:
         lines.append("\n**Relaciones:**")
@@ -139,6 +189,120 @@ async def analyze_impact(
     return "\n".join(lines)
 
 
+def _format_graph(header: str, result: ImpactResult) -> str:
+    lines = [f"## {header}\n", f"**Nodos:** {len(result.nodes)}\n"]
+    for node in result.nodes:
+        crit = f" [{node.criticality}]" if node.criticality else ""
+        lines.append(f"- **{node.title}** ({node.doc_type or 'unknown'}){crit}")
+    if result.edges:
+        lines.append("\n**Relaciones:**")
+        for edge in result.edges:
+            lines.append(f"- {edge.from_title} --[{edge.relation_type}]--> {edge.to_title}")
+    return "\n".join(lines)
+
+
+@tool
+async def get_dependencies(
+    service_name: Annotated[
+        str,
+        "Nombre del servicio o componente cuyas dependencias se quieren conocer "
+        "(ej: turn-o-matic, webapi)",
+    ],
+    depth: Annotated[int, "Profundidad del recorrido (1-3)"] = 1,
+) -> str:
+    """Lista de qué depende un servicio (dirección opuesta a `analyze_impact`).
+
+    Usa esta tool cuando el usuario pregunte:
+    - "¿De qué depende webapi?" / "¿Qué usa turn-o-matic?"
+    - "¿Qué infraestructura necesita X para funcionar?"
+
+    Una sola llamada reemplaza varias búsquedas de `depends_on`/`related_services`.
+    """
+    pool, _ = _require_deps()
+
+    async with acquire(pool, "get_dependencies") as conn:
+        graph = await dependency_graph(conn)
+
+    node = graph.lookup(service_name)
+    if node is None:
+        return f"No se encontró el servicio '{service_name}'."
+
+    result = graph.dependencies(node.doc_id, depth=min(max(depth, 1), 3))
+    if not result.edges:
+        return f"'{node.title}' no tiene dependencias documentadas."
+    return _format_graph(f"Dependencias de {node.title}", result)
+
+
+@tool
+async def find_connection(
+    source: Annotated[str, "Primer servicio o documento (ej: webapi)"],
+    target: Annotated[str, "Segundo servicio o documento (ej: Redis)"],
+) -> str:
+    """Encuentra cómo se conectan dos componentes (camino más corto en el grafo).
+
+    Usa esta tool cuando el usuario pregunte:
+    - "¿Cómo se relaciona X con Y?"
+    - "¿Por qué una caída de Y afecta a X?"
+    - "¿X depende de Y, aunque sea indirectamente?"
+
+    Retorna la cadena de relaciones que une ambos docs o indica que no hay camino.
+    """
+    pool, _ = _require_deps()
+
+    async with acquire(pool, "find_connection") as conn:
+        graph = await dependency_graph(conn)
+
+    start, end = graph.lookup(source), graph.lookup(target)
+    if start is None or end is None:
+        missing = source if start is None else target
+        return f"No se encontró el documento '{missing}'."
+
+    path = graph.shortest_path(start.doc_id, end.doc_id)
+    if path is None:
+        return f"No hay un camino documentado entre '{start.title}' y '{end.title}'."
+
+    chain = " → ".join(n.title for n in path.nodes)
+    return _format_graph(f"Conexión {start.title} ↔ {end.title}: {chain}", path)
+
+
+@tool
+async def explore_graph(
+    names: Annotated[
+        list[str],
+        "Uno o más servicios/documentos a explorar (ej: ['webapi', 'Redis'])",
+    ],
+    depth: Annotated[int, "Saltos alrededor de cada doc (0-2)"] = 1,
+    relation_types: Annotated[
+        list[str] | None,
+        "Filtra relaciones: depends_on, related_service. None = todas.",
+    ] = None,
+) -> str:
+    """Devuelve el subgrafo alrededor de uno o más docs (ambas direcciones).
+
+    Útil para preguntas de arquitectura que involucran varios componentes a la vez:
+    - "¿Cómo se relacionan webapi, turn-o-matic y Redis?"
+    - "Muéstrame el vecindario de RabbitMQ"
+    """
+    pool, _ = _require_deps()
+
+    async with acquire(pool, "explore_graph") as conn:
+        graph = await dependency_graph(conn)
+
+    nodes = [graph.lookup(name) for name in names]
+    missing = [name for name, node in zip(names, nodes) if node is None]
+    found = [node.doc_id for node in nodes if node is not None]
+    if not found:
+        return f"No se encontraron los documentos: {', '.join(missing)}."
+
+    result = graph.subgraph(
+        found, depth=min(max(depth, 0), 2), relation_types=relation_types
+    )
+    text = _format_graph("Subgrafo", result)
+    if missing:
+        text += f"\n\n(No encontrados: {', '.join(missing)})"
+    return text
+
+
 @tool
 async def list_services(
     doc_type: Annotated[
@@ -172,7 +336,7 @@ async def list_services(
         WHERE ($1::text IS NULL OR doc_type = $1)
         ORDER BY doc_type, title
     """
-    async with pool.acquire() as conn:
+    async with acquire(pool, "list_services") as conn:
         rows = await conn.fetch(query, doc_type)
 
     if not rows:
@@ -216,16 +380,14 @@ async def get_service_detail(
     """
     pool, _ = _require_deps()
 
-    row = await pool.fetchrow(
-        """
-        SELECT title, doc_type, path, repo, frontmatter
-        FROM docs
-        WHERE lower(title) LIKE '%' || lower($1) || '%'
-        ORDER BY (doc_type = 'service')::int DESC
-        LIMIT 1
-        """,
-        service_name,
-    )
+    async with acquire(pool, "get_service_detail") as conn:
+        matches = await resolve_titles(conn, service_name, limit=4)
+        row = None
+        if matches:
+            row = await conn.fetchrow(
+                "SELECT title, doc_type, path, repo, frontmatter FROM docs WHERE id = $1::uuid",
+                matches[0].doc_id,
+            )
 
     if row is None:
         return f"No se encontró un servicio con nombre '{service_name}'."
@@ -264,6 +426,14 @@ async def get_service_detail(
         rels = fm["related_services"] if isinstance(fm["related_services"], list) else [fm["related_services"]]
         lines.append(f"**Servicios relacionados:** {', '.join(rels)}")
 
+    # Si el match no es exacto, se muestran las alternativas para que el
+    # agente pueda corregir sin otra vuelta de búsqueda.
+    if matches[0].score < 1.0 and len(matches) > 1:
+        others = ", ".join(f"{m.title} ({m.score:.2f})" for m in matches[1:])
+        lines.append(
+            f"\n_Coincidencia aproximada ({matches[0].score:.2f}). Otros candidatos: {others}_"
+        )
+
     return "\n".join(lines)
 
 
@@ -315,6 +485,9 @@ async def ask_user(
 ALL_TOOLS = [
     knowledge_search,
     analyze_impact,
+    get_dependencies,
+    find_connection,
+    explore_graph,
     list_services,
     get_service_detail,
     ask_user,
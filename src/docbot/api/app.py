@@ -2,6 +2,7 @@
 
 from __future__ import annotations
 
+import asyncio
 import os
 import time
 import uuid
@@ -26,19 +27,63 @@ async def lifespan(app: FastAPI):
         logger.info("config_loaded", db_host=settings.database_url[:40] + "…")
         pool = await create_pool(settings)
         await run_migrations(pool)
+
+        from docbot.search.indexes import ensure_vector_indexes
+
+        async with pool.acquire() as conn:
+            await ensure_vector_indexes(conn, settings)
         app.state.pool = pool
         app.state.settings = settings
 
+        from docbot.clients import create_clients
+
+        create_clients(settings)
+
         from docbot.agent.graph import build_agent
 
         build_agent(settings, pool)
         logger.info("agent_initialized")
+
+        from docbot.search.cache import configure_cache
+
+        configure_cache(settings)
+
+        from docbot.rag.cache import configure_answer_cache
+
+        configure_answer_cache(settings)
+
+        from docbot.profiling import configure_profiling
+
+        configure_profiling(settings)
+
+        if settings.graph_cache_enabled:
+            from docbot.search.graph import refresh_dependency_graph
+
+            async with pool.acquire() as conn:
+                await refresh_dependency_graph(conn)
+
+        replica_task: asyncio.Task | None = None
+        if settings.replica_enabled:
+            from docbot.search.replica import refresh_replica, replica_refresh_loop
+
+            async with pool.acquire() as conn:
+                await refresh_replica(conn, settings)
+            if settings.replica_refresh_seconds > 0:
+                replica_task = asyncio.create_task(replica_refresh_loop(pool, settings))
+            logger.info("replica_initialized")
+
         logger.info("app_started", version=__version__)
     except Exception:
         logger.exception("startup_failed")
         raise
     yield
+    if replica_task is not None:
+        replica_task.cancel()
     await close_pool()
+
+    from docbot.clients import close_clients
+
+    await close_clients()
     logger.info("app_stopped")
 
 
@@ -84,8 +129,10 @@ def create_app() -> FastAPI:
         return response
 
     # --- Routers ---
+    from docbot.api.routes.admin import router as admin_router
     from docbot.api.routes.answer import router as answer_router
     from docbot.api.routes.chat import router as chat_router
+    from docbot.api.routes.graph import router as graph_router
     from docbot.api.routes.health import router as health_router
     from docbot.api.routes.search import router as search_router
     from docbot.api.routes.sync import router as sync_router
@@ -94,7 +141,9 @@ def create_app() -> FastAPI:
     app.include_router(search_router, tags=["search"])
     app.include_router(answer_router, tags=["rag"])
     app.include_router(chat_router, tags=["chat"])
+    app.include_router(graph_router, tags=["graph"])
     app.include_router(sync_router, tags=["indexer"])
+    app.include_router(admin_router, tags=["admin"])
 
     @app.get("/", include_in_schema=False)
     async def root():
@@ -0,0 +1,37 @@
+"""Helpers del modo debug (profiling por request) para los routers."""
+
+from __future__ import annotations
+
+from fastapi import Request
+
+from docbot.api.schemas import DebugInfo, TokenUsageItem
+from docbot.profiling import DEBUG_HEADER, Profile, start_profile
+from docbot.usage import TokenUsage, current_usage
+
+
+def profile_request(request: Request) -> Profile | None:
+    """Abre un perfil si el request trae ``X-Docbot-Debug`` o ``?debug=``."""
+    flag = request.headers.get(DEBUG_HEADER) or request.query_params.get("debug")
+    return start_profile(flag)
+
+
+def debug_info(profile: Profile | None) -> DebugInfo | None:
+    if profile is None:
+        return None
+    return DebugInfo(
+        timings_ms={name: round(ms, 2) for name, ms in profile.timings.items()},
+        total_ms=round(profile.total_ms, 2),
+        query_plans=profile.query_plans,
+        llm_usage=usage_item(current_usage()),
+    )
+
+
+def usage_item(usage: TokenUsage | None) -> TokenUsageItem | None:
+    if usage is None:
+        return None
+    return TokenUsageItem(
+        calls=usage.calls,
+        prompt_tokens=usage.prompt_tokens,
+        completion_tokens=usage.completion_tokens,
+        cached_tokens=usage.cached_tokens,
+    )
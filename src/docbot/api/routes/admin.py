@@ -0,0 +1,90 @@
+"""Endpoints de administración: tamaño y uso de los índices, uso del pool de DB y del LLM."""
+
+from __future__ import annotations
+
+from fastapi import APIRouter, Request
+
+from docbot.api.debug import usage_item
+from docbot.api.schemas import (
+    IndexReportResponse,
+    IndexUsageItem,
+    PoolStatsResponse,
+    UsageStatsResponse,
+    UsageSummaryItem,
+)
+from docbot.config import get_settings
+from docbot.profiling import acquire, pool_stats
+from docbot.search.indexes import index_report, partial_filters
+from docbot.usage import TokenUsage, usage_summaries
+
+router = APIRouter()
+
+
+@router.get("/admin/indexes", response_model=IndexReportResponse)
+async def indexes(request: Request) -> IndexReportResponse:
+    """Tamaño en disco y scans de cada índice (incluye los HNSW parciales)."""
+    settings = get_settings()
+    pool = request.app.state.pool
+
+    async with acquire(pool, "admin_indexes") as conn:
+        report = await index_report(conn)
+
+    return IndexReportResponse(
+        indexes=[
+            IndexUsageItem(
+                table_name=i.table_name,
+                index_name=i.index_name,
+                size_bytes=i.size_bytes,
+                scans=i.scans,
+                tuples_read=i.tuples_read,
+                definition=i.definition,
+            )
+            for i in report
+        ],
+        total_size_bytes=sum(i.size_bytes for i in report),
+        partial_filters=[f"{col}={value}" for col, value in partial_filters(settings)],
+    )
+
+
+@router.get("/admin/pool", response_model=PoolStatsResponse)
+async def pool(request: Request) -> PoolStatsResponse:
+    """Conexiones en uso/libres y espera/retención medias y máximas por ``acquire``."""
+    db_pool = request.app.state.pool
+    stats = pool_stats()
+    n = stats.acquires or 1
+    return PoolStatsResponse(
+        size=db_pool.get_size(),
+        idle=db_pool.get_idle_size(),
+        max_size=db_pool.get_max_size(),
+        acquires=stats.acquires,
+        wait_ms_avg=round(stats.wait_ms_total / n, 2),
+        wait_ms_max=round(stats.wait_ms_max, 2),
+        hold_ms_avg=round(stats.hold_ms_total / n, 2),
+        hold_ms_max=round(stats.hold_ms_max, 2),
+        slow_acquires=stats.slow_acquires,
+        long_holds=stats.long_holds,
+    )
+
+
+@router.get("/admin/usage", response_model=UsageStatsResponse)
+async def usage() -> UsageStatsResponse:
+    """Tokens del LLM (prompt, completion y cacheados) por endpoint y comando."""
+    total = TokenUsage()
+    items: list[UsageSummaryItem] = []
+    for (endpoint, command), summary in sorted(
+        usage_summaries().items(), key=lambda kv: (kv[0][0], kv[0][1] or "")
+    ):
+        total.merge(summary)
+        items.append(
+            UsageSummaryItem(
+                endpoint=endpoint,
+                command=command,
+                requests=summary.requests,
+                calls=summary.calls,
+                prompt_tokens=summary.prompt_tokens,
+                completion_tokens=summary.completion_tokens,
+                cached_tokens=summary.cached_tokens,
+                cache_hit_rate=round(summary.cache_hit_rate, 4),
+            )
+        )
+    return UsageStatsResponse(items=items, total=usage_item(total))
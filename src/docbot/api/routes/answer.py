@@ -2,46 +2,208 @@
 
 from __future__ import annotations
 
+from typing import AsyncIterator
+
+import structlog
 from fastapi import APIRouter, Request
+from fastapi.responses import StreamingResponse
 
+from docbot.api.debug import debug_info, profile_request
 from docbot.api.schemas import (
+    AnswerCacheStatsResponse,
     AnswerRequest,
     AnswerResponse,
+    AnswerStreamDone,
+    AnswerStreamStart,
     CitationItem,
     UsedChunkItem,
 )
+from docbot.api.sse import sse_error, sse_event, sse_response
 from docbot.config import get_settings
-from docbot.rag.answerer import generate_answer
+from docbot.profiling import stage
+from docbot.rag.answerer import (
+    NO_EVIDENCE_ANSWER,
+    AnswerResult,
+    Citation,
+    UsedChunk,
+    extract_citations,
+    generate_answer,
+    remember_answer,
+    retrieve_context,
+    stream_answer,
+    used_chunks,
+)
+from docbot.rag.cache import get_answer_cache
+from docbot.usage import track_usage
+
+logger = structlog.get_logger(__name__)
 
 router = APIRouter()
 
 
+def _citation_items(citations: list[Citation]) -> list[CitationItem]:
+    return [CitationItem(repo=c.repo, path=c.path, heading=c.heading) for c in citations]
+
+
+def _used_chunk_items(used: list[UsedChunk]) -> list[UsedChunkItem]:
+    return [
+        UsedChunkItem(doc_id=u.doc_id, chunk_id=u.chunk_id, score=round(u.score, 4))
+        for u in used
+    ]
+
+
+def _filter_kwargs(body: AnswerRequest) -> dict[str, str | None]:
+    filters = body.filters
+    return {
+        "source": getattr(filters, "source", None) if filters else None,
+        "repo": getattr(filters, "repo", None) if filters else None,
+        "doc_type": getattr(filters, "doc_type", None) if filters else None,
+    }
+
+
 @router.post("/answer", response_model=AnswerResponse)
 async def answer(body: AnswerRequest, request: Request) -> AnswerResponse:
     """Responde una pregunta técnica con citas de la base de conocimiento."""
     settings = get_settings()
     pool = request.app.state.pool
+    profile = profile_request(request)
 
-    filters = body.filters
-
-    async with pool.acquire() as conn:
+    with track_usage("/answer"):
         result = await generate_answer(
             question=body.question,
-            conn=conn,
+            pool=pool,
             settings=settings,
-            source=getattr(filters, "source", None) if filters else None,
-            repo=getattr(filters, "repo", None) if filters else None,
-            doc_type=getattr(filters, "doc_type", None) if filters else None,
+            expand_graph=body.expand_graph,
+            multi_query=body.multi_query,
+            use_cache=not body.bypass_cache,
+            **_filter_kwargs(body),
+        )
+
+        return AnswerResponse(
+            answer=result.answer,
+            citations=_citation_items(result.citations),
+            used_chunks=_used_chunk_items(result.used_chunks),
+            context_tokens=result.context_tokens,
+            cached=result.cached,
+            debug=debug_info(profile),
         )
 
-    return AnswerResponse(
-        answer=result.answer,
-        citations=[
-            CitationItem(repo=c.repo, path=c.path, heading=c.heading)
-            for c in result.citations
-        ],
-        used_chunks=[
-            UsedChunkItem(doc_id=u.doc_id, chunk_id=u.chunk_id, score=round(u.score, 4))
-            for u in result.used_chunks
-        ],
+
+@router.post(
+    "/answer/stream",
+    response_class=StreamingResponse,
+    responses={200: {"content": {"text/event-stream": {}}}},
+)
+async def answer_stream(body: AnswerRequest, request: Request) -> StreamingResponse:
+    """Como ``/answer`` pero por Server-Sent Events, para mostrar la respuesta mientras se genera.
+
+    Eventos, en orden: ``chunks`` (``AnswerStreamStart``, apenas termina la
+    recuperación), ``token`` (``{"text": ...}``, uno por fragmento del
+    modelo) y ``done`` (``AnswerStreamDone``: respuesta completa, citas y
+    debug). Si algo falla a mitad de camino llega ``error`` en lugar de
+    ``done``. Una respuesta del cache semántico llega como un único
+    ``token`` con ``cached=True`` en ``done``.
+    """
+    settings = get_settings()
+    pool = request.app.state.pool
+    profile = profile_request(request)
+
+    async def events() -> AsyncIterator[str]:
+        with track_usage("/answer/stream"):
+            try:
+                retrieval = await retrieve_context(
+                    body.question,
+                    pool,
+                    settings,
+                    expand_graph=body.expand_graph,
+                    multi_query=body.multi_query,
+                    use_cache=not body.bypass_cache,
+                    **_filter_kwargs(body),
+                )
+                cached = retrieval.cached
+                if cached is not None:
+                    yield sse_event(
+                        "chunks",
+                        AnswerStreamStart(
+                            used_chunks=_used_chunk_items(cached.used_chunks),
+                            context_tokens=cached.context_tokens,
+                        ),
+                    )
+                    yield sse_event("token", {"text": cached.answer})
+                    yield sse_event(
+                        "done",
+                        AnswerStreamDone(
+                            answer=cached.answer,
+                            citations=_citation_items(cached.citations),
+                            cached=True,
+                            debug=debug_info(profile),
+                        ),
+                    )
+                    return
+
+                context = retrieval.context
+                used = used_chunks(context.chunks)
+                yield sse_event(
+                    "chunks",
+                    AnswerStreamStart(
+                        used_chunks=_used_chunk_items(used), context_tokens=context.tokens
+                    ),
+                )
+
+                if not context.blocks:
+                    parts = [NO_EVIDENCE_ANSWER]
+                    yield sse_event("token", {"text": NO_EVIDENCE_ANSWER})
+                else:
+                    parts = []
+                    with stage("llm"):
+                        async for token in stream_answer(body.question, context, settings):
+                            parts.append(token)
+                            yield sse_event("token", {"text": token})
+
+                answer_text = "".join(parts)
+                citations = extract_citations(answer_text)
+                if context.blocks:
+                    remember_answer(
+                        body.question,
+                        retrieval,
+                        AnswerResult(
+                            answer=answer_text,
+                            citations=citations,
+                            used_chunks=used,
+                            context_tokens=context.tokens,
+                        ),
+                    )
+                yield sse_event(
+                    "done",
+                    AnswerStreamDone(
+                        answer=answer_text,
+                        citations=_citation_items(citations),
+                        debug=debug_info(profile),
+                    ),
+                )
+            except Exception as exc:
+                logger.error("answer_stream_error", question=body.question[:80], error=str(exc))
+                yield sse_error()
+
+    return sse_response(events())
+
+
+@router.get("/answer/cache", response_model=AnswerCacheStatsResponse)
+async def answer_cache_stats() -> AnswerCacheStatsResponse:
+    """Métricas del cache semántico de respuestas (hit rate, invalidaciones)."""
+    cache = get_answer_cache()
+    if cache is None:
+        return AnswerCacheStatsResponse(enabled=False)
+
+    stats = cache.stats
+    return AnswerCacheStatsResponse(
+        enabled=True,
+        entries=len(cache),
+        max_entries=cache.max_entries,
+        threshold=cache.threshold,
+        hits=stats.hits,
+        misses=stats.misses,
+        evictions=stats.evictions,
+        invalidations=stats.invalidations,
+        hit_rate=round(stats.hit_rate, 4),
     )
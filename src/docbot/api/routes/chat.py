@@ -4,20 +4,28 @@ from __future__ import annotations
 
 import re
 import unicodedata
+from typing import TYPE_CHECKING, AsyncIterator
 
 import structlog
 from fastapi import APIRouter, Request
+from fastapi.responses import StreamingResponse
 
 from docbot.api.schemas import (
     ChatRequest,
     ChatResponse,
+    ChatToolEvent,
     CitationItem,
     ClarificationOption,
     ClarificationPayload,
     CommandInfo,
     CommandsResponse,
 )
+from docbot.api.sse import sse_error, sse_event, sse_response
 from docbot.commands import get_command, list_commands
+from docbot.usage import track_usage
+
+if TYPE_CHECKING:
+    from docbot.agent.graph import AgentResult
 
 router = APIRouter()
 logger = structlog.get_logger(__name__)
@@ -56,23 +64,17 @@ async def commands_list() -> CommandsResponse:
     )
 
 
-@router.post("/chat", response_model=ChatResponse)
-async def chat(body: ChatRequest, request: Request) -> ChatResponse:
-    """Chat multi-turno con agente LangGraph. Soporta comandos, tools y ask_user."""
-    from docbot.agent.graph import AgentClarification, invoke_agent
-
-    command = None
-    command_prompt = None
+def _command(body: ChatRequest) -> tuple[str | None, str | None]:
+    """(nombre, system prompt) del comando pedido, si existe."""
+    cmd = get_command(body.command) if body.command else None
+    if cmd is None:
+        return None, None
+    return cmd.name, cmd.system_prompt
 
-    if body.command:
-        cmd = get_command(body.command)
-        if cmd:
-            command = cmd.name
-            command_prompt = cmd.system_prompt
 
-    messages = [{"role": m.role, "content": m.content} for m in body.messages]
-
-    result = await invoke_agent(messages, command_prompt=command_prompt)
+def _chat_response(result: AgentResult, command: str | None) -> ChatResponse:
+    """Arma la respuesta final (igual con o sin streaming) y la loguea."""
+    from docbot.agent.graph import AgentClarification
 
     # El agente decidió pedir clarificación al usuario antes de buscar.
     if isinstance(result, AgentClarification):
@@ -122,3 +124,64 @@ async def chat(body: ChatRequest, request: Request) -> ChatResponse:
         command=command,
         clarification=None,
     )
+
+
+@router.post("/chat", response_model=ChatResponse)
+async def chat(body: ChatRequest, request: Request) -> ChatResponse:
+    """Chat multi-turno con agente LangGraph. Soporta comandos, tools y ask_user."""
+    from docbot.agent.graph import invoke_agent
+
+    command, command_prompt = _command(body)
+    messages = [{"role": m.role, "content": m.content} for m in body.messages]
+
+    with track_usage("/chat", command):
+        result = await invoke_agent(messages, command_prompt=command_prompt)
+    return _chat_response(result, command)
+
+
+@router.post(
+    "/chat/stream",
+    response_class=StreamingResponse,
+    responses={200: {"content": {"text/event-stream": {}}}},
+)
+async def chat_stream(body: ChatRequest, request: Request) -> StreamingResponse:
+    """Como ``/chat`` pero por Server-Sent Events, con el progreso del agente en vivo.
+
+    Eventos: ``tool_start`` / ``tool_end`` (``ChatToolEvent``) por cada tool
+    que el agente decide llamar y termina de ejecutar, ``token``
+    (``{"text": ...}``) con el texto de la respuesta final (concatenado es
+    ``reply``), ``thinking`` (``{"text": ...}``) con el texto de los turnos
+    que terminaron en tools, ``clarification`` (``ClarificationPayload``) si el agente pregunta con
+    ``ask_user`` y al final ``done`` con el mismo ``ChatResponse`` que
+    ``/chat``. Si algo falla llega ``error`` en lugar de ``done``.
+    """
+    from docbot.agent.graph import AgentStep, stream_agent
+
+    command, command_prompt = _command(body)
+    messages = [{"role": m.role, "content": m.content} for m in body.messages]
+
+    async def events() -> AsyncIterator[str]:
+        with track_usage("/chat/stream", command):
+            try:
+                async for event in stream_agent(messages, command_prompt=command_prompt):
+                    if not isinstance(event, AgentStep):
+                        response = _chat_response(event, command)
+                        if response.clarification is not None:
+                            yield sse_event("clarification", response.clarification)
+                        yield sse_event("done", response)
+                    elif event.kind in ("token", "thinking"):
+                        yield sse_event(event.kind, {"text": event.text})
+                    else:
+                        yield sse_event(
+                            event.kind,
+                            ChatToolEvent(
+                                tool=event.tool or "",
+                                args=event.args,
+                                result_preview=event.text if event.kind == "tool_end" else None,
+                            ),
+                        )
+            except Exception as exc:
+                logger.error("chat_stream_error", command=command, error=str(exc))
+                yield sse_error()
+
+    return sse_response(events())
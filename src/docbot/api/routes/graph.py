@@ -0,0 +1,163 @@
+"""Endpoints de traversal sobre el grafo de docs (dependencias, caminos, subgrafos)."""
+
+from __future__ import annotations
+
+from fastapi import APIRouter, HTTPException, Query, Request
+
+from docbot.api.schemas import (
+    GraphEdgeItem,
+    GraphNodeItem,
+    GraphPathResponse,
+    GraphResponse,
+    GraphSubgraphRequest,
+    ResolveResponse,
+    TitleMatchItem,
+)
+from docbot.profiling import acquire
+from docbot.search.graph import (
+    DependencyGraph,
+    GraphEdge,
+    GraphNode,
+    ImpactResult,
+    dependency_graph,
+    resolve_titles,
+)
+
+router = APIRouter()
+
+_DOC_HELP = "doc_id o parte del título"
+_RELATIONS_HELP = "Filtra por relation_type (ej: depends_on, related_service)"
+
+
+def _node_item(n: GraphNode) -> GraphNodeItem:
+    return GraphNodeItem(
+        doc_id=n.doc_id, title=n.title, doc_type=n.doc_type, criticality=n.criticality
+    )
+
+
+def _edge_item(e: GraphEdge) -> GraphEdgeItem:
+    return GraphEdgeItem(
+        from_doc_id=e.from_doc_id,
+        to_doc_id=e.to_doc_id,
+        from_title=e.from_title,
+        to_title=e.to_title,
+        relation_type=e.relation_type,
+        evidence=e.evidence,
+    )
+
+
+def _lookup(graph: DependencyGraph, ref: str) -> GraphNode:
+    node = graph.lookup(ref)
+    if node is None:
+        raise HTTPException(status_code=404, detail=f"No se encontró el doc '{ref}'.")
+    return node
+
+
+def _graph_response(root: GraphNode | None, result: ImpactResult) -> GraphResponse:
+    return GraphResponse(
+        root=_node_item(root) if root else None,
+        nodes=[_node_item(n) for n in result.nodes],
+        edges=[_edge_item(e) for e in result.edges],
+    )
+
+
+async def _walk(request: Request, doc: str, direction: str, depth: int, relation_types):
+    async with acquire(request.app.state.pool, f"graph_{direction}") as conn:
+        graph = await dependency_graph(conn)
+    root = _lookup(graph, doc)
+    result = graph.walk(
+        [root.doc_id], depth=depth, direction=direction, relation_types=relation_types
+    )
+    return _graph_response(root, result)
+
+
+@router.get("/graph/dependents", response_model=GraphResponse)
+async def dependents(
+    request: Request,
+    doc: str = Query(description=_DOC_HELP),
+    depth: int = Query(default=2, ge=1, le=5),
+    relation_types: list[str] | None = Query(default=None, description=_RELATIONS_HELP),
+) -> GraphResponse:
+    """Quién depende (directa o transitivamente) del doc."""
+    return await _walk(request, doc, "in", depth, relation_types)
+
+
+@router.get("/graph/dependencies", response_model=GraphResponse)
+async def dependencies(
+    request: Request,
+    doc: str = Query(description=_DOC_HELP),
+    depth: int = Query(default=2, ge=1, le=5),
+    relation_types: list[str] | None = Query(default=None, description=_RELATIONS_HELP),
+) -> GraphResponse:
+    """De qué depende (directa o transitivamente) el doc."""
+    return await _walk(request, doc, "out", depth, relation_types)
+
+
+@router.get("/graph/neighborhood", response_model=GraphResponse)
+async def neighborhood(
+    request: Request,
+    doc: str = Query(description=_DOC_HELP),
+    depth: int = Query(default=1, ge=1, le=3),
+    relation_types: list[str] | None = Query(default=None, description=_RELATIONS_HELP),
+) -> GraphResponse:
+    """Vecindario del doc en ambas direcciones."""
+    return await _walk(request, doc, "both", depth, relation_types)
+
+
+@router.get("/graph/path", response_model=GraphPathResponse)
+async def shortest_path(
+    request: Request,
+    source: str = Query(description=_DOC_HELP),
+    target: str = Query(description=_DOC_HELP),
+    max_depth: int = Query(default=6, ge=1, le=10),
+    directed: bool = Query(default=False, description="Solo aristas from → to"),
+    relation_types: list[str] | None = Query(default=None, description=_RELATIONS_HELP),
+) -> GraphPathResponse:
+    """Camino más corto entre dos docs."""
+    async with acquire(request.app.state.pool, "graph_path") as conn:
+        graph = await dependency_graph(conn)
+    start, end = _lookup(graph, source), _lookup(graph, target)
+
+    path = graph.shortest_path(
+        start.doc_id,
+        end.doc_id,
+        max_depth=max_depth,
+        relation_types=relation_types,
+        directed=directed,
+    )
+    if path is None:
+        return GraphPathResponse(found=False)
+    return GraphPathResponse(
+        found=True,
+        length=len(path.edges),
+        nodes=[_node_item(n) for n in path.nodes],
+        edges=[_edge_item(e) for e in path.edges],
+    )
+
+
+@router.post("/graph/subgraph", response_model=GraphResponse)
+async def subgraph(body: GraphSubgraphRequest, request: Request) -> GraphResponse:
+    """Subgrafo inducido por los docs pedidos (más su vecindario a ``depth``)."""
+    async with acquire(request.app.state.pool, "graph_subgraph") as conn:
+        graph = await dependency_graph(conn)
+    roots = [_lookup(graph, ref).doc_id for ref in body.docs]
+    result = graph.subgraph(roots, depth=body.depth, relation_types=body.relation_types)
+    return _graph_response(None, result)
+
+
+@router.get("/graph/resolve", response_model=ResolveResponse)
+async def resolve(
+    request: Request,
+    q: str = Query(min_length=1, description="Nombre aproximado (título, alias o archivo)"),
+    limit: int = Query(default=5, ge=1, le=20),
+) -> ResolveResponse:
+    """Candidatos rankeados para un nombre de doc, insensible a acentos y separadores."""
+    async with acquire(request.app.state.pool, "graph_resolve") as conn:
+        matches = await resolve_titles(conn, q, limit)
+    return ResolveResponse(
+        query=q,
+        candidates=[
+            TitleMatchItem(doc_id=m.doc_id, title=m.title, doc_type=m.doc_type, score=m.score)
+            for m in matches
+        ],
+    )
@@ -1,49 +1,179 @@
-"""Endpoint de búsqueda híbrida."""
+"""Endpoints de búsqueda híbrida (simple y batch)."""
 
 from __future__ import annotations
 
 from fastapi import APIRouter, Request
 
-from docbot.api.schemas import SearchRequest, SearchResponse, SearchResultItem
+from docbot.api.debug import debug_info, profile_request
+from docbot.api.schemas import (
+    SearchBatchItem,
+    SearchBatchRequest,
+    SearchBatchResponse,
+    SearchCacheStatsResponse,
+    SearchFilters,
+    SearchPlanItem,
+    SearchRequest,
+    SearchResponse,
+    SearchResultItem,
+)
 from docbot.config import get_settings
-from docbot.embeddings import embed_text
-from docbot.search.hybrid import hybrid_search
+from docbot.embeddings import embed_text, embed_texts
+from docbot.profiling import acquire, stage
+from docbot.search.cache import get_cache
+from docbot.search.centrality import prior_for
+from docbot.search.diversify import diversity_for
+from docbot.search.hybrid import SearchResult, fusion_for, hybrid_search, hybrid_search_many
+from docbot.search.planner import SearchPlan, plan_search
 
 router = APIRouter()
 
 
+def _filter_kwargs(filters: SearchFilters | None) -> dict[str, str | None]:
+    return {
+        "source": getattr(filters, "source", None),
+        "repo": getattr(filters, "repo", None),
+        "doc_type": getattr(filters, "doc_type", None),
+        "path_prefix": getattr(filters, "path_prefix", None),
+    }
+
+
+def _result_item(r: SearchResult) -> SearchResultItem:
+    return SearchResultItem(
+        doc_id=r.doc_id,
+        chunk_id=r.chunk_id,
+        repo=r.repo,
+        path=r.path,
+        heading=r.heading,
+        score=round(r.score, 4),
+        snippet=r.snippet[:500],
+        vector_rank=r.vector_rank,
+        lexical_rank=r.lexical_rank,
+        fused_score=round(r.fused_score, 6) if r.fused_score is not None else None,
+        centrality=round(r.centrality, 4) if r.centrality is not None else None,
+        prior_score=round(r.prior_score, 4) if r.prior_score is not None else None,
+    )
+
+
+def _plan_item(plan: SearchPlan) -> SearchPlanItem:
+    return SearchPlanItem(
+        strategy=plan.strategy,
+        estimated_rows=plan.estimated_rows,
+        total_rows=plan.total_rows,
+        ef_search=plan.ef_search,
+        vector_index=plan.vector_index,
+        rerank_factor=plan.rerank_factor,
+        partial_index="=".join(plan.partial_filter) if plan.partial_filter else None,
+    )
+
+
 @router.post("/search", response_model=SearchResponse)
 async def search(body: SearchRequest, request: Request) -> SearchResponse:
-    """Búsqueda híbrida: filtros de metadata + similitud vectorial."""
+    """Búsqueda híbrida: filtros de metadata + similitud vectorial.
+
+    Con ``X-Docbot-Debug: 1`` (o ``?debug=1``) la respuesta incluye el
+    desglose de tiempos por etapa; con ``explain`` además el ``EXPLAIN
+    (ANALYZE, BUFFERS)`` de la query.
+    """
     settings = get_settings()
     pool = request.app.state.pool
+    profile = profile_request(request)
+
+    with stage("embed"):
+        query_embedding = await embed_text(body.query, settings)
+
+    filter_kwargs = _filter_kwargs(body.filters)
 
-    query_embedding = await embed_text(body.query, settings)
+    async with acquire(pool, "search") as conn:
+        # Si la búsqueda sale del cache no se planifica.
+        plan = SearchPlan(strategy="cache")
 
-    filters = body.filters or type(body.filters)()  # type: ignore[arg-type]
+        async def planner() -> SearchPlan:
+            nonlocal plan
+            with stage("plan"):
+                plan = await plan_search(conn, settings, top_k=body.top_k, **filter_kwargs)
+            return plan
 
-    async with pool.acquire() as conn:
         results = await hybrid_search(
             conn,
             query_embedding,
             top_k=body.top_k,
-            source=getattr(filters, "source", None),
-            repo=getattr(filters, "repo", None),
-            doc_type=getattr(filters, "doc_type", None),
-            path_prefix=getattr(filters, "path_prefix", None),
+            query_text=body.query,
+            fusion=fusion_for(settings, body.mode),
+            planner=planner,
+            diversity=diversity_for(settings, body.diversify, max_per_doc=body.max_per_doc),
+            prior=prior_for(settings, body.centrality_weight),
+            use_cache=not body.bypass_cache,
+            **filter_kwargs,
         )
 
-    items = [
-        SearchResultItem(
-            doc_id=r.doc_id,
-            chunk_id=r.chunk_id,
-            repo=r.repo,
-            path=r.path,
-            heading=r.heading,
-            score=round(r.score, 4),
-            snippet=r.snippet[:500],
+    items = [_result_item(r) for r in results]
+    return SearchResponse(
+        results=items,
+        total=len(items),
+        plan=_plan_item(plan),
+        debug=debug_info(profile),
+    )
+
+
+@router.post("/search/batch", response_model=SearchBatchResponse)
+async def search_batch(body: SearchBatchRequest, request: Request) -> SearchBatchResponse:
+    """Búsqueda de muchas queries con un solo request de embeddings y un round trip SQL."""
+    settings = get_settings()
+    pool = request.app.state.pool
+
+    query_embeddings = await embed_texts(body.queries, settings)
+
+    filter_kwargs = _filter_kwargs(body.filters)
+
+    async with acquire(pool, "search_batch") as conn:
+        # Si todas las queries salen del cache no se planifica.
+        plan = SearchPlan(strategy="cache")
+
+        async def planner() -> SearchPlan:
+            nonlocal plan
+            plan = await plan_search(conn, settings, top_k=body.top_k, **filter_kwargs)
+            return plan
+
+        batches = await hybrid_search_many(
+            conn,
+            query_embeddings,
+            query_texts=body.queries,
+            top_k=body.top_k,
+            fusion=fusion_for(settings, body.mode),
+            planner=planner,
+            prior=prior_for(settings, body.centrality_weight),
+            use_cache=not body.bypass_cache,
+            **filter_kwargs,
         )
-        for r in results
-    ]
 
-    return SearchResponse(results=items, total=len(items))
+    return SearchBatchResponse(
+        results=[
+            SearchBatchItem(
+                query=query,
+                results=[_result_item(r) for r in results],
+                total=len(results),
+            )
+            for query, results in zip(body.queries, batches)
+        ],
+        plan=_plan_item(plan),
+    )
+
+
+@router.get("/search/cache", response_model=SearchCacheStatsResponse)
+async def search_cache_stats() -> SearchCacheStatsResponse:
+    """Métricas del cache de resultados de búsqueda (hit rate, evictions)."""
+    cache = get_cache()
+    if cache is None:
+        return SearchCacheStatsResponse(enabled=False)
+
+    stats = cache.stats
+    return SearchCacheStatsResponse(
+        enabled=True,
+        entries=len(cache),
+        max_entries=cache.max_entries,
+        hits=stats.hits,
+        misses=stats.misses,
+        evictions=stats.evictions,
+        invalidations=stats.invalidations,
+        hit_rate=round(stats.hit_rate, 4),
+    )
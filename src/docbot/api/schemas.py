@@ -22,6 +22,11 @@ class SearchRequest(BaseModel):
     query: str
     filters: SearchFilters | None = None
     top_k: int = Field(default=10, ge=1, le=50)
+    mode: Literal["vector", "hybrid"] | None = None  # None = DOCBOT_SEARCH_MODE
+    diversify: bool = False  # MMR + tope de chunks por doc
+    max_per_doc: int | None = Field(default=None, ge=1)
+    centrality_weight: float | None = Field(default=None, ge=0, le=1)  # None = settings
+    bypass_cache: bool = False
 
 
 class SearchResultItem(BaseModel):
@@ -32,11 +37,77 @@ class SearchResultItem(BaseModel):
     heading: str | None
     score: float
     snippet: str
+    vector_rank: int | None = None
+    lexical_rank: int | None = None
+    fused_score: float | None = None
+    centrality: float | None = None
+    prior_score: float | None = None  # relevancia mezclada con la centralidad
+
+
+class SearchPlanItem(BaseModel):
+    strategy: str  # 'hnsw' | 'hnsw_ef' | 'iterative' | 'exact' | 'replica' | 'cache'
+    estimated_rows: int
+    total_rows: int
+    ef_search: int | None = None
+    vector_index: str = "full"  # 'full' | 'halfvec' | 'binary'
+    rerank_factor: int = 1
+    partial_index: str | None = None  # filtro del HNSW parcial usado, ej: 'doc_type=runbook'
+
+
+class TokenUsageItem(BaseModel):
+    """Tokens del LLM; ``cached_tokens`` es la parte del prompt servida por el prompt cache."""
+
+    calls: int
+    prompt_tokens: int
+    completion_tokens: int
+    cached_tokens: int
+
+
+class DebugInfo(BaseModel):
+    """Desglose de tiempos (X-Docbot-Debug); ``query_plans`` solo con ``explain``."""
+
+    timings_ms: dict[str, float]
+    total_ms: float
+    query_plans: list[str] = []
+    llm_usage: TokenUsageItem | None = None
 
 
 class SearchResponse(BaseModel):
     results: list[SearchResultItem]
     total: int
+    plan: SearchPlanItem | None = None
+    debug: DebugInfo | None = None
+
+
+class SearchBatchRequest(BaseModel):
+    queries: list[str] = Field(min_length=1, max_length=50)
+    filters: SearchFilters | None = None
+    top_k: int = Field(default=10, ge=1, le=50)
+    mode: Literal["vector", "hybrid"] | None = None
+    centrality_weight: float | None = Field(default=None, ge=0, le=1)
+    bypass_cache: bool = False
+
+
+class SearchBatchItem(BaseModel):
+    query: str
+    results: list[SearchResultItem]
+    total: int
+
+
+class SearchBatchResponse(BaseModel):
+    results: list[SearchBatchItem]
+    plan: SearchPlanItem | None = None
+
+
+class SearchCacheStatsResponse(BaseModel):
+    enabled: bool
+    entries: int = 0
+    max_entries: int = 0
+    hits: int = 0
+    misses: int = 0
+    evictions: int = 0
+    invalidations: int = 0
+    hit_rate: float = 0.0
 
 
 # ---------- /answer ----------
@@ -44,6 +115,9 @@ class SearchResponse(BaseModel):
 class AnswerRequest(BaseModel):
     question: str = Field(min_length=5)
     filters: SearchFilters | None = None
+    expand_graph: bool | None = None  # None = DOCBOT_RAG_GRAPH_EXPANSION
+    multi_query: bool | None = None  # None = DOCBOT_RAG_MULTI_QUERY
+    bypass_cache: bool = False  # ignora el cache semántico de respuestas
 
 
 class CitationItem(BaseModel):
@@ -62,6 +136,37 @@ class AnswerResponse(BaseModel):
     answer: str
     citations: list[CitationItem]
     used_chunks: list[UsedChunkItem]
+    context_tokens: int = 0  # tokens del contexto armado para el prompt
+    cached: bool = False  # respuesta reutilizada de una pregunta equivalente
+    debug: DebugInfo | None = None
+
+
+class AnswerStreamStart(BaseModel):
+    """Evento ``chunks`` de ``/answer/stream``: contexto recuperado, antes del primer token."""
+
+    used_chunks: list[UsedChunkItem]
+    context_tokens: int = 0
+
+
+class AnswerStreamDone(BaseModel):
+    """Evento ``done`` de ``/answer/stream``."""
+
+    answer: str
+    citations: list[CitationItem]
+    cached: bool = False
+    debug: DebugInfo | None = None
+
+
+class AnswerCacheStatsResponse(BaseModel):
+    enabled: bool
+    entries: int = 0
+    max_entries: int = 0
+    threshold: float = 0.0
+    hits: int = 0
+    misses: int = 0
+    evictions: int = 0
+    invalidations: int = 0
+    hit_rate: float = 0.0
 
 
 # ---------- /sync ----------
@@ -126,6 +231,14 @@ class ChatResponse(BaseModel):
     clarification: ClarificationPayload | None = None
 
 
+class ChatToolEvent(BaseModel):
+    """Evento ``tool_start`` / ``tool_end`` de ``/chat/stream``."""
+
+    tool: str
+    args: dict | None = None  # solo en tool_start
+    result_preview: str | None = None  # solo en tool_end
+
+
 # ---------- /commands ----------
 
 class CommandInfo(BaseModel):
@@ -137,6 +250,101 @@ class CommandsResponse(BaseModel):
     commands: list[CommandInfo]
 
 
+# ---------- /graph ----------
+
+class GraphNodeItem(BaseModel):
+    doc_id: str
+    title: str
+    doc_type: str | None
+    criticality: str | None
+
+
+class GraphEdgeItem(BaseModel):
+    from_doc_id: str | None
+    to_doc_id: str | None
+    from_title: str
+    to_title: str
+    relation_type: str
+    evidence: str | None
+
+
+class GraphResponse(BaseModel):
+    root: GraphNodeItem | None = None
+    nodes: list[GraphNodeItem]
+    edges: list[GraphEdgeItem]
+
+
+class GraphPathResponse(BaseModel):
+    found: bool
+    length: int | None = None  # cantidad de aristas del camino
+    nodes: list[GraphNodeItem] = []
+    edges: list[GraphEdgeItem] = []
+
+
+class TitleMatchItem(BaseModel):
+    doc_id: str
+    title: str
+    doc_type: str | None
+    score: float
+
+
+class ResolveResponse(BaseModel):
+    query: str
+    candidates: list[TitleMatchItem]
+
+
+class GraphSubgraphRequest(BaseModel):
+    docs: list[str] = Field(min_length=1, max_length=50)  # doc_id o título
+    depth: int = Field(default=0, ge=0, le=3)
+    relation_types: list[str] | None = None
+
+
+# ---------- /admin ----------
+
+class IndexUsageItem(BaseModel):
+    table_name: str
+    index_name: str
+    size_bytes: int
+    scans: int
+    tuples_read: int
+    definition: str
+
+
+class IndexReportResponse(BaseModel):
+    indexes: list[IndexUsageItem]
+    total_size_bytes: int
+    partial_filters: list[str]
+
+
+class PoolStatsResponse(BaseModel):
+    """Estado del pool de DB y uso acumulado desde el arranque (``acquire``)."""
+
+    size: int
+    idle: int
+    max_size: int
+    acquires: int
+    wait_ms_avg: float
+    wait_ms_max: float
+    hold_ms_avg: float
+    hold_ms_max: float
+    slow_acquires: int
+    long_holds: int
+
+
+class UsageSummaryItem(TokenUsageItem):
+    endpoint: str
+    command: str | None = None
+    requests: int
+    cache_hit_rate: float
+
+
+class UsageStatsResponse(BaseModel):
+    """Tokens del LLM acumulados por endpoint y comando desde el arranque."""
+
+    items: list[UsageSummaryItem]
+    total: TokenUsageItem
+
+
 # ---------- /health ----------
 
 class HealthResponse(BaseModel):
@@ -0,0 +1,35 @@
+"""Respuestas Server-Sent Events para los endpoints con streaming."""
+
+from __future__ import annotations
+
+import json
+from typing import Any, AsyncIterator
+
+import structlog
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel
+
+# Evita que proxies (nginx) acumulen la respuesta antes de enviarla.
+_SSE_HEADERS = {"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+
+
+def sse_event(event: str, data: BaseModel | dict[str, Any]) -> str:
+    """Serializa un evento SSE (``event:`` + ``data:`` en JSON de una línea)."""
+    payload = data.model_dump_json() if isinstance(data, BaseModel) else json.dumps(
+        data, ensure_ascii=False
+    )
+    return f"event: {event}\ndata: {payload}\n\n"
+
+
+def sse_error() -> str:
+    """Evento ``error`` genérico para el cliente.
+
+    El detalle de la excepción (SQL, hosts, ids de OpenAI) queda solo en el
+    log; el cliente recibe el ``request_id`` para correlacionarlo.
+    """
+    request_id = structlog.contextvars.get_contextvars().get("request_id")
+    return sse_event("error", {"detail": "internal error", "request_id": request_id})
+
+
+def sse_response(events: AsyncIterator[str]) -> StreamingResponse:
+    return StreamingResponse(events, media_type="text/event-stream", headers=_SSE_HEADERS)
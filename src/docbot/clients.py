@@ -0,0 +1,96 @@
+"""Cliente HTTP compartido para todas las llamadas a OpenAI.
+
+Embeddings, RAG y el agente usan el mismo ``httpx.AsyncClient``, con
+keep-alive y límites de conexiones configurables (y HTTP/2 opcional), en
+lugar de un cliente por request o por módulo. Se crea en el lifespan de la
+app (``create_clients``) y se cierra al apagar (``close_clients``); los
+scripts que no pasan por el lifespan lo crean perezosamente en el primer uso.
+"""
+
+from __future__ import annotations
+
+import httpx
+import structlog
+from openai import AsyncOpenAI
+
+from docbot.config import Settings
+
+logger = structlog.get_logger(__name__)
+
+_http: httpx.AsyncClient | None = None
+_openai: AsyncOpenAI | None = None
+
+
+def _http2_available() -> bool:
+    try:
+        import h2  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+def create_clients(settings: Settings) -> AsyncOpenAI:
+    """Crea el pool HTTP y el cliente de OpenAI compartidos."""
+    global _http, _openai
+
+    http2 = settings.openai_http2
+    if http2 and not _http2_available():
+        logger.warning("http2_unavailable", hint="pip install 'zeroq-docbot[http2]'")
+        http2 = False
+
+    _http = httpx.AsyncClient(
+        http2=http2,
+        limits=httpx.Limits(
+            max_connections=settings.openai_max_connections,
+            max_keepalive_connections=settings.openai_max_keepalive_connections,
+            keepalive_expiry=settings.openai_keepalive_expiry_seconds,
+        ),
+        timeout=httpx.Timeout(
+            settings.openai_timeout_seconds,
+            connect=settings.openai_connect_timeout_seconds,
+        ),
+    )
+    _openai = AsyncOpenAI(api_key=settings.openai_api_key, http_client=_http)
+    logger.info(
+        "http_client_created",
+        http2=http2,
+        max_connections=settings.openai_max_connections,
+    )
+    return _openai
+
+
+def get_http_client(settings: Settings) -> httpx.AsyncClient:
+    """Pool HTTP compartido (para clientes de terceros, ej. ``ChatOpenAI``)."""
+    if _http is None:
+        create_clients(settings)
+    assert _http is not None
+    return _http
+
+
+def get_openai(settings: Settings) -> AsyncOpenAI:
+    """Cliente de OpenAI compartido; lo crea si todavía no existe."""
+    if _openai is None:
+        return create_clients(settings)
+    return _openai
+
+
+def prompt_cache_kwargs(settings: Settings, scope: str) -> dict[str, str]:
+    """``prompt_cache_key`` para las llamadas que comparten el prompt estático de ``scope``.
+
+    El prompt caching del proveedor reutiliza prefijos idénticos; la key
+    ayuda a que requests con el mismo prefijo (RAG, agente) caigan en la
+    misma caché.
+    """
+    if not settings.openai_prompt_cache_key:
+        return {}
+    return {"prompt_cache_key": f"{settings.openai_prompt_cache_key}:{scope}"}
+
+
+async def close_clients() -> None:
+    """Cierra el pool HTTP compartido."""
+    global _http, _openai
+    if _http is not None:
+        await _http.aclose()
+        _http = None
+        _openai = None
+        logger.info("http_client_closed")
@@ -9,10 +9,27 @@ class Settings(BaseSettings):
     # --- Neon Postgres ---
     database_url: str
 
+    db_pool_min_size: int = 2
+    db_pool_max_size: int = 10
+    db_pooler_mode: str = "auto"  # 'auto' | 'direct' | 'pgbouncer' (auto: host '-pooler')
+    db_statement_cache_size: int = 256
+    db_prepare_hot_statements: bool = True
+    db_slow_acquire_ms: float = 100.0  # espera por una conexión del pool → warning (0 = off)
+    db_long_hold_ms: float = 2000.0  # conexión retenida más que esto → warning (0 = off)
+
     # --- OpenAI ---
     openai_api_key: str
     embedding_model: str = "text-embedding-3-small"
     embedding_dimensions: int = 1536
+    # Cliente HTTP compartido (embeddings, RAG y agente), ver docbot.clients
+    openai_http2: bool = False  # requiere el extra 'http2' (paquete h2)
+    openai_max_connections: int = 50
+    openai_max_keepalive_connections: int = 20
+    openai_keepalive_expiry_seconds: float = 30.0
+    openai_timeout_seconds: float = 60.0
+    openai_connect_timeout_seconds: float = 5.0
+    # Prefijo de prompt_cache_key: agrupa requests con el mismo prompt estático ("" = no enviar)
+    openai_prompt_cache_key: str = "docbot"
 
     # --- Chunking ---
     chunk_target_tokens: int = 750
@@ -22,11 +39,66 @@ class Settings(BaseSettings):
     # --- Search ---
     search_top_k: int = 10
     similarity_threshold: float = 0.7
+    search_mode: str = "hybrid"  # 'vector' | 'hybrid' (vector + full-text con RRF)
+    search_vector_weight: float = 1.0
+    search_lexical_weight: float = 1.0
+    search_rrf_k: int = 60
+    search_candidates: int = 50
+    search_planner_enabled: bool = True
+    search_exact_max_rows: int = 2000  # subconjuntos filtrados menores → distancia exacta
+    search_hnsw_min_selectivity: float = 0.3  # por debajo → ef_search alto / iterative scan
+    search_ef_search_max: int = 400
+    search_stats_ttl_seconds: int = 300
+    search_mmr_lambda: float = 0.7
+    search_mmr_fetch_k: int = 30
+    search_max_chunks_per_doc: int = 2
+    search_cache_enabled: bool = True
+    search_cache_max_entries: int = 1024
+    search_cache_generation_ttl_seconds: float = 30.0
+    search_vector_index: str = "full"  # 'full' | 'halfvec' | 'binary' (índice HNSW de la 1ª pasada)
+    search_rerank_factor: int = 4  # candidatos del índice compacto = top * factor, re-rank exacto
+    search_keep_full_index: bool = True  # False → se elimina el HNSW float32 si hay índice compacto
+    search_partial_indexes: str = ""  # HNSW parciales, ej: 'doc_type=runbook,source=gitlab'
+    search_centrality_weight: float = 0.0  # >0 mezcla la centralidad del doc en el ranking
+    search_centrality_fetch_k: int = 30  # candidatos que se re-rankean con el prior
+
+    # --- Réplica vectorial en proceso ---
+    # Sirve la rama vectorial desde memoria; en search_mode=hybrid la full-text
+    # sigue yendo a Postgres (una query más liviana, sin HNSW).
+    replica_enabled: bool = False
+    replica_dir: str = "/tmp/docbot-replica"
+    replica_dtype: str = "float32"  # 'float32' | 'float16'
+    replica_refresh_seconds: int = 300
+
+    # --- Grafo de dependencias ---
+    graph_cache_enabled: bool = True  # grafo en memoria para analyze_impact (False → CTE en SQL)
 
     # --- RAG ---
     rag_model: str = "gpt-5.2"
     rag_max_context_chunks: int = 8
     rag_temperature: float = 0.1
+    rag_diversify: bool = True  # MMR + tope por doc sobre el contexto recuperado
+    rag_graph_expansion: bool = False  # agrega chunks de docs vecinos (edges) a los top hits
+    rag_context_token_budget: int = 5000  # tope de tokens del contexto (0 = sin tope)
+    rag_context_dedup_threshold: float = 0.85  # Jaccard para descartar chunks casi duplicados
+    rag_context_merge_adjacent: bool = True  # fusiona chunks consecutivos del mismo doc
+    rag_multi_query: bool = False  # busca también variantes de la pregunta (docbot.rag.multiquery)
+    rag_multi_query_variants: int = 3  # variantes por reglas (títulos + vocabulario de doc_type)
+    rag_multi_query_llm_rewrites: int = 0  # reformulaciones extra del LLM (0 = sin LLM)
+    graph_expansion_seed_docs: int = 3
+    graph_expansion_chunks_per_neighbor: int = 1
+    graph_expansion_max_chunks: int = 4
+    graph_expansion_token_budget: int = 1500
+    answer_cache_enabled: bool = False  # cache semántico de respuestas (docbot.rag.cache)
+    answer_cache_threshold: float = 0.95  # similitud coseno mínima entre preguntas
+    answer_cache_max_entries: int = 512
+    answer_cache_ttl_seconds: float = 3600.0
+
+    # --- Profiling ---
+    debug_profiling_enabled: bool = False  # permite X-Docbot-Debug / ?debug= por request
+    debug_explain_enabled: bool = False  # permite ?debug=explain (re-ejecuta con ANALYZE)
+    slow_query_ms: float = 500.0  # 0 = no loguear slow queries
+    slow_query_explain: bool = True  # adjunta EXPLAIN al log de slow_query
 
     # --- CORS ---
     cors_origins: str = "*"
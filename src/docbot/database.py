@@ -2,11 +2,13 @@
 
 from __future__ import annotations
 
+import json
 import pathlib
 import ssl as _ssl
 from urllib.parse import parse_qs, urlencode, urlparse, urlunparse
 
 import asyncpg
+import numpy as np
 import structlog
 
 from docbot.config import Settings
@@ -41,25 +43,128 @@ def _clean_dsn(dsn: str) -> str:
     return urlunparse(parsed._replace(query=new_query))
 
 
+def _uses_pgbouncer(settings: Settings) -> bool:
+    """Modo pooler: explícito por settings o inferido del host ``-pooler`` de Neon."""
+    if settings.db_pooler_mode != "auto":
+        return settings.db_pooler_mode == "pgbouncer"
+    return "-pooler." in settings.database_url
+
+
+def _encode_jsonb(value: object) -> str:
+    # El indexer ya serializa el frontmatter (fechas incluidas); se respeta tal cual.
+    if isinstance(value, str):
+        return value
+    return json.dumps(value, ensure_ascii=False, default=str)
+
+
+def _decode_vector(data: bytes) -> np.ndarray:
+    from pgvector import Vector
+
+    return Vector.from_binary(data).to_numpy().astype(np.float32, copy=False)
+
+
+def _encode_vector(value: object) -> bytes:
+    from pgvector import Vector
+
+    return (value if isinstance(value, Vector) else Vector(value)).to_binary()
+
+
+async def _register_codecs(conn: asyncpg.Connection) -> None:
+    """Codecs de ``vector`` (⇄ numpy float32) y ``jsonb`` (⇄ dict)."""
+    from pgvector.asyncpg import register_vector
+
+    # halfvec/sparsevec quedan con los codecs de pgvector; vector decodifica a numpy.
+    await register_vector(conn)
+    await conn.set_type_codec(
+        "vector",
+        encoder=_encode_vector,
+        decoder=_decode_vector,
+        format="binary",
+    )
+    await conn.set_type_codec(
+        "jsonb",
+        encoder=_encode_jsonb,
+        decoder=json.loads,
+        schema="pg_catalog",
+    )
+
+
+def _hot_statements(settings: Settings) -> list[str]:
+    """SQL de los caminos calientes (búsqueda y grafo) a preparar por conexión."""
+    from docbot.search import graph, hybrid
+
+    return [*hybrid.hot_queries(settings), *graph.HOT_QUERIES]
+
+
+async def _prepare_hot_statements(conn: asyncpg.Connection, settings: Settings) -> None:
+    """Prepara los statements calientes y los deja en el cache de la conexión.
+
+    Si el schema todavía no existe (primer arranque, antes de migraciones)
+    se omite: asyncpg los preparará en su primer uso.
+    """
+    prepared = 0
+    for query in _hot_statements(settings):
+        try:
+            conn.hot_statements[query] = await conn.prepare(query)
+            prepared += 1
+        except asyncpg.PostgresError as exc:
+            logger.debug("hot_statement_skipped", error=str(exc))
+            break
+    logger.debug("hot_statements_prepared", count=prepared)
+
+
+class DocbotConnection(asyncpg.Connection):
+    """Conexión del pool con statements calientes preparados en el init."""
+
+    def __init__(self, *args, **kwargs) -> None:
+        super().__init__(*args, **kwargs)
+        self.hot_statements: dict[str, asyncpg.prepared_stmt.PreparedStatement] = {}
+
+
+async def fetch(conn: asyncpg.Connection, query: str, *args: object) -> list[asyncpg.Record]:
+    """``conn.fetch`` que reutiliza el statement preparado en el init si existe."""
+    stmt = getattr(conn, "hot_statements", {}).get(query)
+    if stmt is not None:
+        return await stmt.fetch(*args)
+    return await conn.fetch(query, *args)
+
+
 async def create_pool(settings: Settings) -> asyncpg.Pool:
-    """Crea y devuelve el pool global de conexiones."""
+    """Crea y devuelve el pool global de conexiones.
+
+    Cada conexión registra los codecs de ``vector``/``jsonb`` una sola vez
+    al abrirse. En modo directo además prepara los statements calientes de
+    búsqueda y grafo; detrás del pooler de Neon (pgbouncer en modo
+    transacción) los statements preparados no sobreviven entre
+    transacciones, así que se desactiva el cache de statements de asyncpg
+    y no se preparan.
+    """
     global _pool
 
     raw_dsn = settings.database_url
     use_ssl = _needs_ssl(raw_dsn)
     dsn = _clean_dsn(raw_dsn)
+    pgbouncer = _uses_pgbouncer(settings)
 
     ssl: _ssl.SSLContext | bool = False
     if use_ssl:
         ssl = _ssl.create_default_context()
 
+    async def _init_connection(conn: asyncpg.Connection) -> None:
+        await _register_codecs(conn)
+        if not pgbouncer and settings.db_prepare_hot_statements:
+            await _prepare_hot_statements(conn, settings)
+
     _pool = await asyncpg.create_pool(
         dsn=dsn,
-        min_size=2,
-        max_size=10,
+        min_size=settings.db_pool_min_size,
+        max_size=settings.db_pool_max_size,
         ssl=ssl,
+        init=_init_connection,
+        connection_class=DocbotConnection,
+        statement_cache_size=0 if pgbouncer else settings.db_statement_cache_size,
     )
-    logger.info("pool_created", dsn=dsn[:50] + "…")
+    logger.info("pool_created", dsn=dsn[:50] + "…", pgbouncer=pgbouncer)
     return _pool
 
 
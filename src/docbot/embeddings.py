@@ -5,21 +5,12 @@ from __future__ import annotations
 import asyncio
 
 import structlog
-from openai import AsyncOpenAI
 
+from docbot.clients import get_openai
 from docbot.config import Settings
 
 logger = structlog.get_logger(__name__)
 
-_client: AsyncOpenAI | None = None
-
-
-def _get_client(settings: Settings) -> AsyncOpenAI:
-    global _client
-    if _client is None:
-        _client = AsyncOpenAI(api_key=settings.openai_api_key)
-    return _client
-
 
 async def embed_texts(
     texts: list[str],
@@ -33,7 +24,7 @@ async def embed_texts(
     Divide la lista en lotes de ``batch_size`` para respetar los limites
     de la API y reintentar ante errores transitorios.
     """
-    client = _get_client(settings)
+    client = get_openai(settings)
     all_embeddings: list[list[float]] = []
 
     for start in range(0, len(texts), batch_size):
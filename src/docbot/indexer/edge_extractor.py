@@ -14,19 +14,73 @@ logger = structlog.get_logger(__name__)
 _WIKILINK_RE = re.compile(r"\[\[([^\]|]+)(?:\|[^\]]*)?\]\]")
 
 
-async def _resolve_target(conn: asyncpg.Connection, title: str, repo: str) -> str | None:
-    """Busca un doc por título (case-insensitive) dentro del mismo repo o global."""
-    row = await conn.fetchrow(
-        """
-        SELECT id::text FROM docs
-        WHERE lower(title) = lower($1)
-        ORDER BY (repo = $2)::int DESC
-        LIMIT 1
-        """,
-        title.strip(),
-        repo,
+_RESOLVE_TARGETS_QUERY = """
+    SELECT DISTINCT ON (lower(t.title)) lower(t.title) AS title, d.id::text AS id
+    FROM unnest($1::text[]) AS t(title)
+    JOIN docs d ON lower(d.title) = lower(t.title)
+    ORDER BY lower(t.title), (d.repo = $2)::int DESC
+"""
+
+# Diff set-based de las aristas salientes de un doc: borra las que ya no
+# están, inserta las nuevas y actualiza evidencia/confianza solo si cambió.
+_UPSERT_EDGES_QUERY = """
+    WITH incoming AS (
+        SELECT *
+        FROM unnest($2::uuid[], $3::text[], $4::text[], $5::real[])
+            AS t(to_doc_id, relation_type, evidence, confidence)
+    ),
+    removed AS (
+        DELETE FROM edges e
+        WHERE e.from_doc_id = $1::uuid
+          AND NOT EXISTS (
+              SELECT 1 FROM incoming i
+              WHERE i.to_doc_id = e.to_doc_id AND i.relation_type = e.relation_type
+          )
     )
-    return row["id"] if row else None
+    INSERT INTO edges (from_doc_id, to_doc_id, relation_type, evidence, confidence)
+    SELECT $1::uuid, to_doc_id, relation_type, evidence, confidence
+    FROM incoming
+    ON CONFLICT (from_doc_id, to_doc_id, relation_type) DO UPDATE
+    SET evidence = EXCLUDED.evidence,
+        confidence = EXCLUDED.confidence,
+        updated_at = now()
+    WHERE (edges.evidence, edges.confidence)
+        IS DISTINCT FROM (EXCLUDED.evidence, EXCLUDED.confidence)
+"""
+
+
+async def _resolve_targets(
+    conn: asyncpg.Connection, titles: list[str], repo: str
+) -> dict[str, str]:
+    """Resuelve títulos (case-insensitive) a doc ids en una query, prefiriendo el mismo repo.
+
+    Retorna ``{título en minúsculas: doc_id}``; los títulos sin doc no aparecen.
+    """
+    rows = await conn.fetch(_RESOLVE_TARGETS_QUERY, sorted({t.strip() for t in titles}), repo)
+    return {r["title"]: r["id"] for r in rows}
+
+
+def _merge_edges(resolved: list[tuple[str, Edge]]) -> list[tuple[str, str, str, float]]:
+    """Colapsa las aristas con el mismo (destino, relation_type).
+
+    Un mismo destino puede aparecer por frontmatter y por wikilink (o por
+    dos títulos que resuelven al mismo doc): se guarda una sola arista con
+    la evidencia de todas las menciones y la confianza más alta.
+
+    Retorna tuplas ``(to_doc_id, relation_type, evidence, confidence)``.
+    """
+    merged: dict[tuple[str, str], tuple[list[str], float]] = {}
+    for target_id, edge in resolved:
+        key = (target_id, edge.relation_type)
+        evidence, confidence = merged.get(key, ([], 0.0))
+        if edge.evidence not in evidence:
+            evidence.append(edge.evidence)
+        merged[key] = (evidence, max(confidence, edge.confidence))
+
+    return [
+        (target_id, relation_type, "; ".join(evidence), confidence)
+        for (target_id, relation_type), (evidence, confidence) in merged.items()
+    ]
 
 
 def _extract_from_frontmatter(doc: ParsedDoc) -> list[Edge]:
@@ -91,18 +145,18 @@ async def extract_and_persist_edges(
 ) -> int:
     """Extrae edges de un documento y los persiste en la DB.
 
-    Retorna la cantidad de edges creados.
+    Retorna la cantidad de edges del doc tras deduplicar.
     """
     raw_edges = _extract_from_frontmatter(doc) + _extract_from_wikilinks(doc)
 
-    if not raw_edges:
-        return 0
-
-    await conn.execute("DELETE FROM edges WHERE from_doc_id = $1::uuid", doc_id)
-
-    created = 0
+    targets = (
+        await _resolve_targets(conn, [e.to_doc_title for e in raw_edges], repo)
+        if raw_edges
+        else {}
+    )
+    resolved: list[tuple[str, Edge]] = []
     for edge in raw_edges:
-        target_id = await _resolve_target(conn, edge.to_doc_title, repo)
+        target_id = targets.get(edge.to_doc_title.strip().lower())
         if target_id is None:
             logger.warning(
                 "edge_target_not_found",
@@ -111,18 +165,16 @@ async def extract_and_persist_edges(
                 relation=edge.relation_type,
             )
             continue
-
-        await conn.execute(
-            """
-            INSERT INTO edges (from_doc_id, to_doc_id, relation_type, evidence, confidence)
-            VALUES ($1::uuid, $2::uuid, $3, $4, $5)
-            """,
-            doc_id,
-            target_id,
-            edge.relation_type,
-            edge.evidence,
-            edge.confidence,
-        )
-        created += 1
-
-    return created
+        resolved.append((target_id, edge))
+
+    # Sin aristas también se ejecuta: borra las que el doc ya no declara.
+    edges = _merge_edges(resolved)
+    await conn.execute(
+        _UPSERT_EDGES_QUERY,
+        doc_id,
+        [e[0] for e in edges],
+        [e[1] for e in edges],
+        [e[2] for e in edges],
+        [e[3] for e in edges],
+    )
+    return len(edges)
@@ -17,6 +17,16 @@ from docbot.indexer.chunker import chunk_document
 from docbot.indexer.edge_extractor import extract_and_persist_edges
 from docbot.indexer.parser import parse_file
 from docbot.models import ParsedDoc, SyncResult
+from docbot.profiling import acquire
+from docbot.search.cache import bump_generation
+from docbot.search.centrality import refresh_centrality
+from docbot.search.blast_radius import blast_radius_is_current, materialize_blast_radius
+from docbot.search.graph import (
+    dependency_graph,
+    get_dependency_graph,
+    refresh_dependency_graph,
+)
+from docbot.search.planner import invalidate_filter_stats
 
 logger = structlog.get_logger(__name__)
 
@@ -69,7 +79,9 @@ async def _upsert_doc(
     """Inserta o actualiza un doc. Retorna (doc_id, changed).
 
     ``changed=True`` indica que el body cambió y por lo tanto hay que
-    re-embedar. Si el body es idéntico pero cambian metadatos derivados
+    re-embedar; en ese caso ``updated_at`` no se toca acá sino en
+    ``_persist_chunks``, recién cuando los chunks nuevos están escritos.
+    Si el body es idéntico pero cambian metadatos derivados
     (``doc_type`` o ``title``, ej. tras refactor del parser), se actualizan
     sin re-embedar y se retorna ``changed=False``.
     """
@@ -110,7 +122,7 @@ async def _upsert_doc(
             """
             UPDATE docs
             SET title = $1, doc_type = $2, frontmatter = $3::jsonb,
-                content_hash = $4, updated_at = now()
+                content_hash = $4
             WHERE id = $5::uuid
             """,
             parsed.title,
@@ -145,26 +157,34 @@ async def _persist_chunks(
     chunks: list,
     embeddings: list[list[float]],
 ) -> int:
-    """Borra chunks previos del doc y los reinserta con embeddings."""
-    import numpy as np
-    from pgvector.asyncpg import register_vector
+    """Reemplaza los chunks del doc y recién entonces marca ``docs.updated_at``.
 
-    await register_vector(conn)
-    await conn.execute("DELETE FROM doc_chunks WHERE doc_id = $1::uuid", doc_id)
+    Todo en una transacción: quien lea a la vez (la réplica, el cache de
+    respuestas) ve el doc entero con sus chunks viejos o con los nuevos,
+    nunca a medias.
+    """
+    import numpy as np
 
-    for chunk, emb in zip(chunks, embeddings):
-        await conn.execute(
+    async with conn.transaction():
+        await conn.execute("DELETE FROM doc_chunks WHERE doc_id = $1::uuid", doc_id)
+        await conn.executemany(
             """
             INSERT INTO doc_chunks (doc_id, chunk_index, heading, content, token_count, embedding)
             VALUES ($1::uuid, $2, $3, $4, $5, $6)
             """,
-            doc_id,
-            chunk.chunk_index,
-            chunk.heading,
-            chunk.content,
-            chunk.token_count,
-            np.array(emb, dtype=np.float32),
+            [
+                (
+                    doc_id,
+                    chunk.chunk_index,
+                    chunk.heading,
+                    chunk.content,
+                    chunk.token_count,
+                    np.array(emb, dtype=np.float32),
+                )
+                for chunk, emb in zip(chunks, embeddings)
+            ],
         )
+        await conn.execute("UPDATE docs SET updated_at = now() WHERE id = $1::uuid", doc_id)
 
     return len(chunks)
 
@@ -221,28 +241,29 @@ async def sync_repo(
                 result.errors.append(f"parse:{rel_path}: {exc}")
                 continue
 
-            async with pool.acquire() as conn:
+            async with acquire(pool, "sync_upsert") as conn:
                 doc_id, changed = await _upsert_doc(conn, source, repo, parsed)
 
-                if not changed:
-                    result.docs_unchanged += 1
-                    continue
+            if not changed:
+                result.docs_unchanged += 1
+                continue
 
-                result.docs_indexed += 1
+            result.docs_indexed += 1
 
-                chunks = chunk_document(parsed.body, settings)
-                if not chunks:
-                    continue
+            chunks = chunk_document(parsed.body, settings)
 
-                try:
-                    embeddings = await embed_texts(
-                        [c.content for c in chunks], settings
-                    )
-                except Exception as exc:
-                    logger.error("embedding_error", path=rel_path, error=str(exc))
-                    result.errors.append(f"embed:{rel_path}: {exc}")
-                    continue
+            # Sin conexión tomada: el embedding puede tardar segundos y el API
+            # comparte el pool durante el sync.
+            try:
+                embeddings = (
+                    await embed_texts([c.content for c in chunks], settings) if chunks else []
+                )
+            except Exception as exc:
+                logger.error("embedding_error", path=rel_path, error=str(exc))
+                result.errors.append(f"embed:{rel_path}: {exc}")
+                continue
 
+            async with acquire(pool, "sync_persist") as conn:
                 created = await _persist_chunks(conn, doc_id, chunks, embeddings)
                 result.chunks_created += created
 
@@ -251,11 +272,31 @@ async def sync_repo(
 
         async with pool.acquire() as conn:
             result.docs_deleted = await _delete_orphans(conn, source, repo, known_paths)
+            if result.docs_indexed or result.docs_deleted:
+                # Antes de la nueva generación, para que caches y grafo la vean ya.
+                await refresh_centrality(conn)
+                await bump_generation(conn)
+                if settings.replica_enabled:
+                    # Enseguida: hasta que refleje la nueva generación sus
+                    # resultados no se cachean (ver ``hybrid_search``).
+                    from docbot.search.replica import refresh_replica
+
+                    await refresh_replica(conn, settings)
 
     finally:
         if not is_local and repo_root.exists():
             shutil.rmtree(repo_root, ignore_errors=True)
 
+    invalidate_filter_stats()
+
+    async with pool.acquire() as conn:
+        if get_dependency_graph() is not None:
+            graph = await refresh_dependency_graph(conn)
+        else:
+            graph = await dependency_graph(conn)
+        if result.docs_indexed or result.docs_deleted or not await blast_radius_is_current(conn):
+            await materialize_blast_radius(conn, graph)
+
     result.duration_seconds = round(time.time() - t0, 2)
     logger.info(
         "sync_complete",
@@ -0,0 +1,206 @@
+"""Profiling opcional por request: tiempos por etapa y planes de las queries.
+
+Se activa por request con el header ``X-Docbot-Debug`` o el query param
+``debug`` (``1``/``true`` = tiempos, ``explain`` = tiempos + ``EXPLAIN
+(ANALYZE, BUFFERS)`` de la query de búsqueda). Ambos están apagados por
+default: cualquier cliente puede mandar el header, y ``explain`` vuelve a
+ejecutar la query; se habilitan con ``debug_profiling_enabled`` y
+``debug_explain_enabled``. El perfil vive en un
+``ContextVar``, así que ``stage()`` se puede llamar desde cualquier capa
+sin pasarlo explícitamente y no cuesta nada si el request no lo pidió.
+
+Independiente del modo debug, las queries de búsqueda que superan
+``slow_query_ms`` se loguean como ``slow_query`` con su plan.
+"""
+
+from __future__ import annotations
+
+import time
+from contextlib import asynccontextmanager, contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from typing import AsyncIterator, Iterator
+
+import asyncpg
+import structlog
+
+from docbot.config import Settings
+
+logger = structlog.get_logger(__name__)
+
+DEBUG_HEADER = "X-Docbot-Debug"
+
+_TRUTHY = {"1", "true", "yes", "on"}
+
+
+@dataclass
+class Profile:
+    """Tiempos acumulados por etapa (ms) y planes capturados de un request."""
+
+    explain: bool = False
+    timings: dict[str, float] = field(default_factory=dict)
+    query_plans: list[str] = field(default_factory=list)
+    started_at: float = field(default_factory=time.perf_counter)
+
+    def record(self, name: str, elapsed_ms: float) -> None:
+        self.timings[name] = self.timings.get(name, 0.0) + elapsed_ms
+
+    @property
+    def total_ms(self) -> float:
+        return (time.perf_counter() - self.started_at) * 1000
+
+
+@dataclass
+class PoolStats:
+    """Uso acumulado del pool vía ``acquire``: espera por una conexión y tiempo retenida."""
+
+    acquires: int = 0
+    wait_ms_total: float = 0.0
+    wait_ms_max: float = 0.0
+    hold_ms_total: float = 0.0
+    hold_ms_max: float = 0.0
+    slow_acquires: int = 0
+    long_holds: int = 0
+
+
+_current: ContextVar[Profile | None] = ContextVar("docbot_profile", default=None)
+
+_enabled: bool = False
+_explain_enabled: bool = False
+_slow_query_ms: float = 0.0
+_slow_query_explain: bool = True
+_slow_acquire_ms: float = 0.0
+_long_hold_ms: float = 0.0
+_pool_stats = PoolStats()
+
+
+def configure_profiling(settings: Settings) -> None:
+    """Aplica los settings de profiling y slow queries (llamar en el lifespan)."""
+    global _enabled, _explain_enabled, _slow_query_ms, _slow_query_explain
+    global _slow_acquire_ms, _long_hold_ms
+    _enabled = settings.debug_profiling_enabled
+    _explain_enabled = settings.debug_explain_enabled
+    _slow_query_ms = settings.slow_query_ms
+    _slow_query_explain = settings.slow_query_explain
+    _slow_acquire_ms = settings.db_slow_acquire_ms
+    _long_hold_ms = settings.db_long_hold_ms
+
+
+def start_profile(flag: str | None) -> Profile | None:
+    """Abre un perfil para el request actual según el flag de debug recibido."""
+    if not _enabled or not flag:
+        return None
+    flag = flag.strip().lower()
+    if flag != "explain" and flag not in _TRUTHY:
+        return None
+    # Sin debug_explain_enabled, ``explain`` degrada a solo tiempos.
+    profile = Profile(explain=flag == "explain" and _explain_enabled)
+    _current.set(profile)
+    return profile
+
+
+def get_profile() -> Profile | None:
+    """Perfil activo del request o None."""
+    return _current.get()
+
+
+@contextmanager
+def stage(name: str) -> Iterator[None]:
+    """Mide el bloque y lo suma a la etapa ``name`` del perfil activo."""
+    profile = _current.get()
+    if profile is None:
+        yield
+        return
+    t0 = time.perf_counter()
+    try:
+        yield
+    finally:
+        profile.record(name, (time.perf_counter() - t0) * 1000)
+
+
+def pool_stats() -> PoolStats:
+    """Métricas acumuladas del pool desde que arrancó el proceso."""
+    return _pool_stats
+
+
+@asynccontextmanager
+async def acquire(pool: asyncpg.Pool, label: str = "") -> AsyncIterator[asyncpg.Connection]:
+    """``pool.acquire()`` midiendo la espera (etapa ``pool_acquire``) y la retención.
+
+    Ambas se acumulan en ``pool_stats()``; una espera mayor a
+    ``db_slow_acquire_ms`` (pool saturado) o una retención mayor a
+    ``db_long_hold_ms`` (alguien hace I/O lento con la conexión tomada) se
+    loguean con ``label`` para encontrar al culpable.
+    """
+    t0 = time.perf_counter()
+    with stage("pool_acquire"):
+        conn = await pool.acquire()
+    t1 = time.perf_counter()
+    wait_ms = (t1 - t0) * 1000
+    try:
+        yield conn
+    finally:
+        await pool.release(conn)
+        hold_ms = (time.perf_counter() - t1) * 1000
+        _record_pool_use(pool, label, wait_ms, hold_ms)
+
+
+def _record_pool_use(pool: asyncpg.Pool, label: str, wait_ms: float, hold_ms: float) -> None:
+    stats = _pool_stats
+    stats.acquires += 1
+    stats.wait_ms_total += wait_ms
+    stats.wait_ms_max = max(stats.wait_ms_max, wait_ms)
+    stats.hold_ms_total += hold_ms
+    stats.hold_ms_max = max(stats.hold_ms_max, hold_ms)
+
+    profile = _current.get()
+    if profile is not None:
+        profile.record("pool_hold", hold_ms)
+
+    if _slow_acquire_ms and wait_ms >= _slow_acquire_ms:
+        stats.slow_acquires += 1
+        logger.warning(
+            "pool_acquire_slow",
+            label=label,
+            wait_ms=round(wait_ms, 1),
+            pool_size=pool.get_size(),
+            pool_idle=pool.get_idle_size(),
+        )
+    if _long_hold_ms and hold_ms >= _long_hold_ms:
+        stats.long_holds += 1
+        logger.warning("pool_hold_long", label=label, hold_ms=round(hold_ms, 1))
+
+
+async def _explain(conn: asyncpg.Connection, query: str, args: tuple, *, analyze: bool) -> str:
+    options = "ANALYZE, BUFFERS" if analyze else "COSTS"
+    rows = await conn.fetch(f"EXPLAIN ({options}) {query}", *args)
+    return "\n".join(r[0] for r in rows)
+
+
+async def observe_query(
+    conn: asyncpg.Connection,
+    label: str,
+    query: str,
+    args: tuple,
+    elapsed_ms: float,
+) -> None:
+    """Captura el plan si el request lo pidió y loguea la query si fue lenta.
+
+    Debe llamarse dentro del mismo scope (transacción + ``SET LOCAL``) en el
+    que corrió la query para que el plan refleje los mismos GUC.
+    """
+    profile = _current.get()
+    plan: str | None = None
+    if profile is not None and profile.explain:
+        with stage("explain"):
+            plan = await _explain(conn, query, args, analyze=True)
+        profile.query_plans.append(plan)
+
+    if not _slow_query_ms or elapsed_ms < _slow_query_ms:
+        return
+    if plan is None and _slow_query_explain:
+        try:
+            plan = await _explain(conn, query, args, analyze=False)
+        except asyncpg.PostgresError as exc:
+            plan = f"<explain failed: {exc}>"
+    logger.warning("slow_query", query=label, duration_ms=round(elapsed_ms, 1), plan=plan)
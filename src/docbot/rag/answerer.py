@@ -3,21 +3,42 @@
 from __future__ import annotations
 
 import re
-from dataclasses import dataclass, field
+import time
+from dataclasses import dataclass, field, replace
+from typing import AsyncIterator
 
 import asyncpg
 import structlog
-from openai import AsyncOpenAI
 
+from docbot.clients import get_openai, prompt_cache_kwargs
 from docbot.config import Settings
 from docbot.embeddings import embed_text
+from docbot.profiling import acquire, stage
+from docbot.rag.cache import doc_versions, get_answer_cache, lookup_answer
+from docbot.rag.multiquery import embed_queries, fuse_results, multi_query_for
+from docbot.rag.packing import (
+    ContextBlock,
+    PackedContext,
+    pack_context,
+    packing_for,
+)
 from docbot.rag.prompts import ANSWER_SYSTEM_PROMPT, ANSWER_USER_TEMPLATE
-from docbot.search.hybrid import SearchResult, hybrid_search
+from docbot.search.cache import current_generation
+from docbot.search.centrality import prior_for
+from docbot.search.diversify import diversity_for
+from docbot.search.expand import expand_with_neighbors, expansion_for
+from docbot.search.hybrid import SearchResult, fusion_for, hybrid_search, hybrid_search_many
+from docbot.search.planner import plan_search
+from docbot.usage import record_openai_usage
 
 logger = structlog.get_logger(__name__)
 
 _CITATION_RE = re.compile(r"\[(?:\d+\]\s*)?([^\]\[:]+):([^\]#]+)#([^\]]+)\]")
 
+NO_EVIDENCE_ANSWER = (
+    "No encontré evidencia en la base de conocimiento para responder esta pregunta."
+)
+
 
 @dataclass
 class Citation:
@@ -44,18 +65,50 @@ class AnswerResult:
     answer: str
     citations: list[Citation] = field(default_factory=list)
     used_chunks: list[UsedChunk] = field(default_factory=list)
+    cached: bool = False  # servida por el cache semántico (docbot.rag.cache)
+    context_tokens: int = 0
+
+
+@dataclass
+class Retrieval:
+    """Salida de ``retrieve_context``: el contexto o una respuesta ya cacheada."""
+
+    context: PackedContext = field(default_factory=PackedContext)
+    cached: AnswerResult | None = None
+    # Lo necesario para guardar la respuesta en el cache al terminar.
+    query_embedding: list[float] | None = None
+    scope: tuple = ()
+    doc_versions: dict[str, str] = field(default_factory=dict)
+    generation: int = 0
 
+    @property
+    def chunks(self) -> list[SearchResult]:
+        return self.context.chunks
 
-def _format_chunks(chunks: list[SearchResult]) -> str:
-    """Formatea chunks como contexto numerado para el prompt."""
+
+def _format_chunks(blocks: list[ContextBlock]) -> str:
+    """Formatea los bloques como contexto numerado para el prompt.
+
+    En un bloque con chunks consecutivos del mismo doc, cada cambio de
+    heading se anota con su referencia para que el LLM pueda citarlo.
+    """
     parts: list[str] = []
-    for i, c in enumerate(chunks, 1):
+    for i, block in enumerate(blocks, 1):
+        c = block.first
         heading_part = f"#{c.heading}" if c.heading else ""
-        parts.append(f"[{i}] {c.repo}:{c.path}{heading_part}\n{c.snippet}")
+        via = ""
+        if c.expanded_from:
+            via = f" (relacionado: {c.relation_type} con {c.expanded_from})"
+        lines = [f"[{i}] {c.repo}:{c.path}{heading_part}{via}", c.snippet]
+        for prev, nxt in zip(block.chunks, block.chunks[1:]):
+            if nxt.heading != prev.heading:
+                lines.append(f"({nxt.repo}:{nxt.path}#{nxt.heading})")
+            lines.append(nxt.snippet)
+        parts.append("\n".join(lines))
     return "\n\n".join(parts)
 
 
-def _extract_citations(text: str) -> list[Citation]:
+def extract_citations(text: str) -> list[Citation]:
     """Extrae citas del texto de respuesta con regex."""
     citations: list[Citation] = []
     seen: set[str] = set()
@@ -73,65 +126,272 @@ def _extract_citations(text: str) -> list[Citation]:
     return citations
 
 
+def _messages(question: str, context: PackedContext) -> list[dict[str, str]]:
+    """Mensajes del RAG: todo lo que cambia por request va después del prompt estático.
+
+    El system prompt es idéntico byte a byte en cada llamada y todo lo
+    variable (contexto y pregunta) va en el mensaje del usuario, así el
+    prefijo largo aprovecha el prompt caching del proveedor.
+    """
+    user_message = ANSWER_USER_TEMPLATE.format(
+        chunks_formatted=_format_chunks(context.blocks),
+        question=question,
+    )
+    return [
+        {"role": "system", "content": ANSWER_SYSTEM_PROMPT},
+        {"role": "user", "content": user_message},
+    ]
+
+
+def used_chunks(chunks: list[SearchResult]) -> list[UsedChunk]:
+    """Referencias a los chunks que van al contexto del LLM."""
+    return [UsedChunk(doc_id=c.doc_id, chunk_id=c.chunk_id, score=c.score) for c in chunks]
+
+
+async def retrieve_context(
+    question: str,
+    pool: asyncpg.Pool,
+    settings: Settings,
+    *,
+    source: str | None = None,
+    repo: str | None = None,
+    doc_type: str | None = None,
+    expand_graph: bool | None = None,
+    multi_query: bool | None = None,
+    use_cache: bool = True,
+) -> Retrieval:
+    """Etapa de recuperación del RAG: embed pregunta → search → (vecinos en el grafo).
+
+    Solo toma una conexión del pool para los pasos que van a la DB; el
+    embedding (y después el LLM) corren sin retener ninguna.
+
+    ``expand_graph`` (None = ``rag_graph_expansion``) agrega al contexto
+    chunks de los docs enlazados a los top hits (``docbot.search.expand``).
+
+    ``multi_query`` (None = ``rag_multi_query``) busca también variantes de
+    la pregunta en un solo round trip y fusiona los rankings
+    (``docbot.rag.multiquery``).
+
+    Los chunks recuperados se arman en ``Retrieval.context`` dentro de
+    ``rag_context_token_budget`` (``docbot.rag.packing``): sin casi
+    duplicados y con los chunks consecutivos de un doc fusionados.
+
+    Con el cache semántico activo y ``use_cache``, una pregunta equivalente
+    ya respondida con los mismos filtros vuelve en ``Retrieval.cached`` sin
+    buscar; si no, se anotan las versiones de los docs recuperados para
+    poder guardar la respuesta (``remember_answer``).
+    """
+    multi = multi_query_for(settings, multi_query)
+    with stage("embed"):
+        if multi is None:
+            queries, embeddings = [question], [await embed_text(question, settings)]
+        else:
+            queries, embeddings = await embed_queries(question, multi, settings)
+    query_embedding = embeddings[0]
+
+    expansion = expansion_for(settings, expand_graph)
+    cache = get_answer_cache() if use_cache else None
+    retrieval = Retrieval(
+        query_embedding=query_embedding,
+        scope=(source, repo, doc_type, expansion is not None, multi is not None),
+    )
+    async with acquire(pool, "answer") as conn:
+        if cache is not None:
+            with stage("answer_cache"):
+                retrieval.cached = await lookup_answer(
+                    conn, cache, question, query_embedding, retrieval.scope
+                )
+            if retrieval.cached is not None:
+                return retrieval
+            retrieval.generation = await current_generation(conn)
+
+        with stage("plan"):
+            plan = await plan_search(
+                conn,
+                settings,
+                top_k=settings.rag_max_context_chunks,
+                source=source,
+                repo=repo,
+                doc_type=doc_type,
+            )
+        diversity = diversity_for(settings, settings.rag_diversify)
+        if multi is None:
+            chunks = await hybrid_search(
+                conn,
+                query_embedding,
+                top_k=settings.rag_max_context_chunks,
+                source=source,
+                repo=repo,
+                doc_type=doc_type,
+                query_text=question,
+                fusion=fusion_for(settings),
+                plan=plan,
+                diversity=diversity,
+                prior=prior_for(settings),
+            )
+        else:
+            # Sin embeddings por resultado no hay MMR; queda el tope por doc.
+            rankings = await hybrid_search_many(
+                conn,
+                embeddings,
+                query_texts=queries,
+                top_k=settings.rag_max_context_chunks,
+                source=source,
+                repo=repo,
+                doc_type=doc_type,
+                fusion=fusion_for(settings),
+                plan=plan,
+                prior=prior_for(settings),
+            )
+            chunks = fuse_results(
+                rankings,
+                multi,
+                top_k=settings.rag_max_context_chunks,
+                max_per_doc=diversity.max_per_doc if diversity else None,
+            )
+
+        if chunks and expansion is not None:
+            with stage("expand"):
+                chunks = chunks + await expand_with_neighbors(
+                    conn, query_embedding, chunks, expansion
+                )
+
+        retrieval.context = pack_context(chunks, packing_for(settings))
+        if cache is not None and chunks:
+            retrieval.doc_versions = await doc_versions(
+                conn, [c.doc_id for c in retrieval.chunks]
+            )
+
+    return retrieval
+
+
+def remember_answer(question: str, retrieval: Retrieval, result: AnswerResult) -> None:
+    """Guarda una respuesta generada en el cache semántico (si está activo)."""
+    cache = get_answer_cache()
+    if cache is None or not retrieval.doc_versions or retrieval.query_embedding is None:
+        return
+    cache.put(
+        question,
+        retrieval.query_embedding,
+        retrieval.scope,
+        result,
+        doc_versions=retrieval.doc_versions,
+        generation=retrieval.generation,
+    )
+
+
 async def generate_answer(
     question: str,
-    conn: asyncpg.Connection,
+    pool: asyncpg.Pool,
     settings: Settings,
     *,
     source: str | None = None,
     repo: str | None = None,
     doc_type: str | None = None,
+    expand_graph: bool | None = None,
+    multi_query: bool | None = None,
+    use_cache: bool = True,
 ) -> AnswerResult:
-    """Pipeline completo: embed pregunta → search → LLM → citas."""
-    query_embedding = await embed_text(question, settings)
+    """Pipeline completo: ``retrieve_context`` → LLM → citas.
 
-    chunks = await hybrid_search(
-        conn,
-        query_embedding,
-        top_k=settings.rag_max_context_chunks,
+    La conexión del pool se devuelve antes de la llamada al LLM. Una
+    respuesta del cache semántico vuelve con ``cached=True``.
+    """
+    retrieval = await retrieve_context(
+        question,
+        pool,
+        settings,
         source=source,
         repo=repo,
         doc_type=doc_type,
+        expand_graph=expand_graph,
+        multi_query=multi_query,
+        use_cache=use_cache,
     )
+    if retrieval.cached is not None:
+        return replace(retrieval.cached, cached=True)
 
-    if not chunks:
-        return AnswerResult(
-            answer="No encontré evidencia en la base de conocimiento para responder esta pregunta."
-        )
-
-    used = [
-        UsedChunk(doc_id=c.doc_id, chunk_id=c.chunk_id, score=c.score)
-        for c in chunks
-    ]
-
-    chunks_formatted = _format_chunks(chunks)
-    user_message = ANSWER_USER_TEMPLATE.format(
-        chunks_formatted=chunks_formatted,
-        question=question,
-    )
+    context = retrieval.context
+    if not context.blocks:
+        return AnswerResult(answer=NO_EVIDENCE_ANSWER)
 
-    client = AsyncOpenAI(api_key=settings.openai_api_key)
-    response = await client.chat.completions.create(
-        model=settings.rag_model,
-        temperature=settings.rag_temperature,
-        messages=[
-            {"role": "system", "content": ANSWER_SYSTEM_PROMPT},
-            {"role": "user", "content": user_message},
-        ],
-    )
+    client = get_openai(settings)
+    with stage("llm"):
+        response = await client.chat.completions.create(
+            model=settings.rag_model,
+            temperature=settings.rag_temperature,
+            messages=_messages(question, context),
+            **prompt_cache_kwargs(settings, "answer"),
+        )
+    record_openai_usage(response.usage)
 
     answer_text = response.choices[0].message.content or ""
-    citations = _extract_citations(answer_text)
+    citations = extract_citations(answer_text)
 
     logger.info(
         "answer_generated",
         question=question[:80],
-        chunks_used=len(chunks),
+        chunks_used=len(context.chunks),
+        context_tokens=context.tokens,
+        prompt_tokens=response.usage.prompt_tokens if response.usage else None,
         citations=len(citations),
     )
 
-    return AnswerResult(
+    result = AnswerResult(
         answer=answer_text,
         citations=citations,
-        used_chunks=used,
+        used_chunks=used_chunks(context.chunks),
+        context_tokens=context.tokens,
+    )
+    remember_answer(question, retrieval, result)
+    return result
+
+
+async def stream_answer(
+    question: str,
+    context: PackedContext,
+    settings: Settings,
+) -> AsyncIterator[str]:
+    """Genera la respuesta sobre el contexto ya recuperado, token a token.
+
+    Cada item es el fragmento de texto que el modelo acaba de producir;
+    las citas se extraen del texto completo al terminar
+    (``extract_citations``). El ``usage`` llega en el último evento del
+    stream (``include_usage``) y se registra en ``docbot.usage``.
+    """
+    t0 = time.perf_counter()
+    first_token_ms: float | None = None
+    length = 0
+
+    client = get_openai(settings)
+    stream = await client.chat.completions.create(
+        model=settings.rag_model,
+        temperature=settings.rag_temperature,
+        messages=_messages(question, context),
+        stream=True,
+        stream_options={"include_usage": True},
+        **prompt_cache_kwargs(settings, "answer"),
+    )
+    usage = None
+    async for event in stream:
+        if event.usage is not None:
+            usage = event.usage
+        delta = event.choices[0].delta.content if event.choices else None
+        if not delta:
+            continue
+        if first_token_ms is None:
+            first_token_ms = (time.perf_counter() - t0) * 1000
+        length += len(delta)
+        yield delta
+    record_openai_usage(usage)
+
+    logger.info(
+        "answer_streamed",
+        question=question[:80],
+        chunks_used=len(context.chunks),
+        context_tokens=context.tokens,
+        prompt_tokens=usage.prompt_tokens if usage else None,
+        chars=length,
+        first_token_ms=round(first_token_ms, 1) if first_token_ms is not None else None,
+        total_ms=round((time.perf_counter() - t0) * 1000, 1),
     )
@@ -0,0 +1,189 @@
+"""Cache semántico de respuestas del RAG.
+
+Muchas preguntas a ``/answer`` son reformulaciones de las mismas FAQs. El
+cache guarda cada respuesta (texto, citas y chunks usados) junto al
+embedding normalizado de la pregunta; una pregunta nueva con similitud
+coseno >= ``answer_cache_threshold`` contra una guardada, con los mismos
+filtros, reutiliza la respuesta sin búsqueda ni LLM.
+
+Cada entrada recuerda la versión (``docs.updated_at``) de los docs que
+usó. Mientras la generación del índice no cambie se sirve tal cual; si
+cambió (hubo un sync), el primer hit revalida esas versiones con una query
+y descarta la entrada si algún doc citado se modificó o se borró. Las
+entradas además expiran por TTL y el tamaño está acotado (LRU).
+"""
+
+from __future__ import annotations
+
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import TYPE_CHECKING
+
+import asyncpg
+import numpy as np
+import structlog
+
+from docbot.config import Settings
+from docbot.search.cache import CacheStats, current_generation
+
+if TYPE_CHECKING:
+    from docbot.rag.answerer import AnswerResult
+
+logger = structlog.get_logger(__name__)
+
+_VERSIONS_QUERY = """
+    SELECT id::text, updated_at::text
+    FROM docs
+    WHERE id = ANY($1::uuid[])
+"""
+
+
+@dataclass
+class CachedAnswer:
+    """Una respuesta guardada con lo necesario para revalidarla."""
+
+    question: str
+    embedding: np.ndarray  # normalizado
+    scope: tuple
+    answer: AnswerResult
+    doc_versions: dict[str, str]
+    generation: int
+    expires_at: float
+
+
+class AnswerCache:
+    """LRU acotado de respuestas, buscado por similitud del embedding de la pregunta."""
+
+    def __init__(self, max_entries: int, threshold: float, ttl_seconds: float) -> None:
+        self.max_entries = max_entries
+        self.threshold = threshold
+        self.ttl_seconds = ttl_seconds
+        self.stats = CacheStats()
+        self._entries: OrderedDict[int, CachedAnswer] = OrderedDict()
+        self._next_id = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def find(self, embedding: list[float], scope: tuple) -> tuple[CachedAnswer, float] | None:
+        """Entrada vigente más parecida dentro de ``scope`` y su similitud, o None."""
+        now = time.monotonic()
+        for key in [k for k, e in self._entries.items() if e.expires_at <= now]:
+            del self._entries[key]
+            self.stats.evictions += 1
+
+        keys = [k for k, e in self._entries.items() if e.scope == scope]
+        if not keys:
+            self.stats.misses += 1
+            return None
+
+        q = _normalize(embedding)
+        similarity = np.stack([self._entries[k].embedding for k in keys]) @ q
+        best = int(np.argmax(similarity))
+        if similarity[best] < self.threshold:
+            self.stats.misses += 1
+            return None
+
+        self._entries.move_to_end(keys[best])
+        self.stats.hits += 1
+        return self._entries[keys[best]], float(similarity[best])
+
+    def put(
+        self,
+        question: str,
+        embedding: list[float],
+        scope: tuple,
+        answer: AnswerResult,
+        *,
+        doc_versions: dict[str, str],
+        generation: int,
+    ) -> None:
+        self._entries[self._next_id] = CachedAnswer(
+            question=question,
+            embedding=_normalize(embedding),
+            scope=scope,
+            answer=answer,
+            doc_versions=doc_versions,
+            generation=generation,
+            expires_at=time.monotonic() + self.ttl_seconds,
+        )
+        self._next_id += 1
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.stats.evictions += 1
+
+    def drop(self, entry: CachedAnswer) -> None:
+        for key, e in list(self._entries.items()):
+            if e is entry:
+                del self._entries[key]
+                self.stats.invalidations += 1
+                return
+
+    def clear(self) -> None:
+        if self._entries:
+            self.stats.invalidations += 1
+        self._entries.clear()
+
+
+def _normalize(embedding: list[float]) -> np.ndarray:
+    v = np.asarray(embedding, dtype=np.float32)
+    return v / (np.linalg.norm(v) or 1.0)
+
+
+_cache: AnswerCache | None = None
+
+
+def configure_answer_cache(settings: Settings) -> None:
+    """Crea el cache de respuestas según settings (llamar en el lifespan)."""
+    global _cache
+    _cache = None
+    if settings.answer_cache_enabled:
+        _cache = AnswerCache(
+            settings.answer_cache_max_entries,
+            settings.answer_cache_threshold,
+            settings.answer_cache_ttl_seconds,
+        )
+
+
+def get_answer_cache() -> AnswerCache | None:
+    """Devuelve el cache activo o None si está deshabilitado."""
+    return _cache
+
+
+async def doc_versions(conn: asyncpg.Connection, doc_ids: list[str]) -> dict[str, str]:
+    """``{doc_id: updated_at}`` de los docs que siguen existiendo."""
+    rows = await conn.fetch(_VERSIONS_QUERY, sorted(set(doc_ids)))
+    return {r["id"]: r["updated_at"] for r in rows}
+
+
+async def lookup_answer(
+    conn: asyncpg.Connection,
+    cache: AnswerCache,
+    question: str,
+    embedding: list[float],
+    scope: tuple,
+) -> AnswerResult | None:
+    """Respuesta cacheada para una pregunta equivalente, revalidada si hubo un sync."""
+    found = cache.find(embedding, scope)
+    if found is None:
+        return None
+    entry, similarity = found
+
+    generation = await current_generation(conn)
+    if entry.generation != generation:
+        if await doc_versions(conn, list(entry.doc_versions)) != entry.doc_versions:
+            cache.drop(entry)
+            cache.stats.hits -= 1
+            cache.stats.misses += 1
+            logger.info("answer_cache_stale", cached_question=entry.question[:80])
+            return None
+        entry.generation = generation
+
+    logger.info(
+        "answer_cache_hit",
+        question=question[:80],
+        cached_question=entry.question[:80],
+        similarity=round(similarity, 4),
+    )
+    return entry.answer
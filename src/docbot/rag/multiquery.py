@@ -0,0 +1,234 @@
+"""Recuperación multi-query para el RAG.
+
+Con un solo embedding, las preguntas cortas o ambiguas ("¿cómo escala
+tom?") recuperan mal. En este modo la pregunta se acompaña de algunas
+variantes:
+
+- por el índice de títulos del grafo en memoria: cada mención que resuelve
+  con confianza a un doc ("tom" → "Turn-O-Matic") agrega una variante con
+  el título canónico;
+- por el vocabulario de ``doc_type``: palabras como "caído" o "licitación"
+  agregan una variante orientada a ese tipo de doc ("Runbook de
+  incidente: ...");
+- opcionalmente, reformulaciones del LLM (``rag_multi_query_llm_rewrites``).
+
+Todas se embeben en un solo batch, se buscan en un solo round trip con
+``hybrid_search_many`` y los rankings se fusionan con RRF, dando más peso
+a la pregunta original. La latencia queda cerca de la de una búsqueda.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import re
+from dataclasses import dataclass, replace
+
+import structlog
+
+from docbot.clients import get_openai, prompt_cache_kwargs
+from docbot.config import Settings
+from docbot.embeddings import embed_texts
+from docbot.profiling import stage
+from docbot.rag.prompts import QUERY_REWRITE_PROMPT
+from docbot.search.graph import get_dependency_graph
+from docbot.search.hybrid import SearchResult
+from docbot.search.resolver import normalize
+from docbot.usage import record_openai_usage
+
+logger = structlog.get_logger(__name__)
+
+# doc_type → (prefijo de la variante, términos normalizados que lo sugieren).
+# Los tipos son los que infiere ``docbot.indexer.parser``.
+DOC_TYPE_VOCABULARY: dict[str, tuple[str, tuple[str, ...]]] = {
+    "runbook": (
+        "Runbook de incidente",
+        ("runbook", "incidente", "caido", "caida", "alerta", "falla", "502", "503", "timeout"),
+    ),
+    "service": ("Servicio", ("servicio", "endpoint", "endpoints", "microservicio")),
+    "infra": (
+        "Infraestructura",
+        ("infra", "infraestructura", "cluster", "kubernetes", "k8s", "servidor", "despliegue"),
+    ),
+    "policy": ("Política", ("politica", "norma", "permisos", "acceso", "compliance")),
+    "rfp": ("Respuesta RFP", ("rfp", "licitacion", "licitaciones", "requisito", "pliego")),
+    "integration": ("Integración", ("integracion", "webhook", "conector", "sftp")),
+    "module": ("Módulo de producto", ("modulo", "producto", "funcionalidad", "comercial")),
+    "procedure": ("Procedimiento", ("procedimiento", "paso a paso", "checklist")),
+    "data_flow": ("Flujo de datos", ("flujo de datos", "data flow", "pipeline")),
+}
+
+_BULLET_RE = re.compile(r"^\s*(?:[-*•]|\d+[.)])\s*")
+_MAX_MENTION_WORDS = 3
+_MIN_MENTION_CHARS = 3
+# Palabras sueltas que no se intentan resolver como nombres de doc.
+_STOPWORDS = frozenset(
+    "como que cual cuales donde cuando quien para por los las del una uno con sin hay "
+    "esta este estos son sus cuanto cuantos hace hago tiene".split()
+)
+
+
+@dataclass
+class MultiQuery:
+    """Parámetros del modo multi-query."""
+
+    max_variants: int = 3  # variantes por reglas (títulos + vocabulario)
+    llm_rewrites: int = 0  # reformulaciones extra del LLM
+    variant_weight: float = 0.7  # peso RRF de cada variante (la original pesa 1)
+    rrf_k: int = 60
+    min_title_score: float = 0.8
+
+
+def multi_query_for(settings: Settings, enabled: bool | None) -> MultiQuery | None:
+    """Parámetros de settings o None si el modo está apagado.
+
+    ``enabled=None`` usa el default de ``rag_multi_query``.
+    """
+    if enabled is None:
+        enabled = settings.rag_multi_query
+    if not enabled:
+        return None
+    return MultiQuery(
+        max_variants=settings.rag_multi_query_variants,
+        llm_rewrites=settings.rag_multi_query_llm_rewrites,
+    )
+
+
+def _mentions(text: str) -> list[str]:
+    """N-gramas de hasta ``_MAX_MENTION_WORDS`` palabras, los más largos primero."""
+    words = text.split()
+    grams = [
+        " ".join(words[i : i + n])
+        for n in range(min(_MAX_MENTION_WORDS, len(words)), 0, -1)
+        for i in range(len(words) - n + 1)
+    ]
+    return [
+        g for g in grams if len(g.replace(" ", "")) >= _MIN_MENTION_CHARS and g not in _STOPWORDS
+    ]
+
+
+def _title_variants(question: str, text: str, multi: MultiQuery) -> list[str]:
+    graph = get_dependency_graph()
+    if graph is None:
+        return []
+
+    variants: list[str] = []
+    seen: set[str] = set()
+    for mention in _mentions(text):
+        match = graph.titles.best(mention)
+        if match is None or match.score < multi.min_title_score or match.doc_id in seen:
+            continue
+        seen.add(match.doc_id)
+        if normalize(match.title) in text:
+            continue  # la pregunta ya usa el nombre canónico
+        variants.append(f"{match.title}: {question}")
+    return variants
+
+
+def _doc_type_variants(question: str, text: str) -> list[str]:
+    padded = f" {text} "
+    return [
+        f"{label}: {question}"
+        for label, terms in DOC_TYPE_VOCABULARY.values()
+        if any(f" {term} " in padded for term in terms)
+    ]
+
+
+def query_variants(question: str, multi: MultiQuery) -> list[str]:
+    """Variantes por reglas de ``question`` (sin la original), a lo sumo ``max_variants``."""
+    text = normalize(question)
+    variants = _title_variants(question, text, multi) + _doc_type_variants(question, text)
+    return list(dict.fromkeys(variants))[: multi.max_variants]
+
+
+async def rewrite_queries(question: str, n: int, settings: Settings) -> list[str]:
+    """Hasta ``n`` reformulaciones del LLM; ante cualquier error, ninguna."""
+    client = get_openai(settings)
+    try:
+        with stage("rewrite"):
+            response = await client.chat.completions.create(
+                model=settings.rag_model,
+                temperature=0.3,
+                messages=[
+                    {"role": "system", "content": QUERY_REWRITE_PROMPT},
+                    {"role": "user", "content": f"Cantidad: {n}\nPregunta: {question}"},
+                ],
+                **prompt_cache_kwargs(settings, "rewrite"),
+            )
+    except Exception as exc:
+        logger.warning("query_rewrite_failed", error=str(exc))
+        return []
+    record_openai_usage(response.usage)
+
+    lines = (response.choices[0].message.content or "").splitlines()
+    rewrites = [_BULLET_RE.sub("", line).strip() for line in lines]
+    return [r for r in dict.fromkeys(rewrites) if r and r != question][:n]
+
+
+async def embed_queries(
+    question: str,
+    multi: MultiQuery,
+    settings: Settings,
+) -> tuple[list[str], list[list[float]]]:
+    """Pregunta + variantes y sus embeddings; la pregunta original va primero.
+
+    Las variantes por reglas se embeben en el mismo batch que la pregunta,
+    en paralelo con las reformulaciones del LLM (si están activas).
+    """
+    queries = [question, *query_variants(question, multi)]
+    if multi.llm_rewrites <= 0:
+        return queries, await embed_texts(queries, settings)
+
+    embeddings, rewrites = await asyncio.gather(
+        embed_texts(queries, settings),
+        rewrite_queries(question, multi.llm_rewrites, settings),
+    )
+    rewrites = [r for r in rewrites if r not in queries]
+    if rewrites:
+        embeddings = embeddings + await embed_texts(rewrites, settings)
+    return queries + rewrites, embeddings
+
+
+def fuse_results(
+    rankings: list[list[SearchResult]],
+    multi: MultiQuery,
+    *,
+    top_k: int,
+    max_per_doc: int | None = None,
+) -> list[SearchResult]:
+    """Fusiona los rankings de cada query con RRF ponderado.
+
+    ``rankings[0]`` es el de la pregunta original (peso 1); el resto pesa
+    ``variant_weight``. El puntaje queda en ``fused_score`` y ``score``
+    pasa a ser la mejor similitud coseno del chunk entre las queries.
+    """
+    fused: dict[str, float] = {}
+    score: dict[str, float] = {}
+    first: dict[str, SearchResult] = {}
+    for i, ranking in enumerate(rankings):
+        weight = 1.0 if i == 0 else multi.variant_weight
+        for rank, result in enumerate(ranking, 1):
+            key = result.chunk_id
+            fused[key] = fused.get(key, 0.0) + weight / (multi.rrf_k + rank)
+            score[key] = max(score.get(key, result.score), result.score)
+            first.setdefault(key, result)
+
+    ordered = sorted(first, key=lambda key: (fused[key], score[key]), reverse=True)
+    results: list[SearchResult] = []
+    per_doc: dict[str, int] = {}
+    for key in ordered:
+        doc_id = first[key].doc_id
+        if max_per_doc and per_doc.get(doc_id, 0) >= max_per_doc:
+            continue
+        per_doc[doc_id] = per_doc.get(doc_id, 0) + 1
+        # Copias: los resultados pueden venir del cache de búsqueda.
+        results.append(replace(first[key], score=score[key], fused_score=fused[key]))
+        if len(results) >= top_k:
+            break
+
+    logger.debug(
+        "multi_query_fused",
+        queries=len(rankings),
+        candidates=len(first),
+        results=len(results),
+    )
+    return results
@@ -0,0 +1,168 @@
+"""Armado del contexto del RAG dentro de un presupuesto de tokens.
+
+``hybrid_search`` devuelve hasta ``rag_max_context_chunks`` chunks, pero un
+chunk puede tener de 200 a 900+ tokens, así que el tamaño del prompt (y con
+él la latencia y el costo del LLM) variaba mucho entre preguntas. Acá se
+recorren los chunks en el orden del ranking y:
+
+1. se descartan los casi duplicados de uno ya elegido (Jaccard sobre
+   shingles de palabras), típicamente secciones copiadas entre docs;
+2. se agregan mientras quepan en ``rag_context_token_budget`` (el primero
+   entra siempre, para no quedarse sin contexto);
+3. los chunks consecutivos (``chunk_index``) de un mismo doc se fusionan
+   en un solo bloque, en orden de lectura y en la posición del mejor.
+
+Los tokens salen de ``doc_chunks.token_count`` (tiktoken al indexar); si
+un resultado no lo trae (réplica en memoria) se estiman por largo.
+"""
+
+from __future__ import annotations
+
+import re
+from dataclasses import dataclass, field
+
+import structlog
+
+from docbot.config import Settings
+from docbot.search.hybrid import SearchResult
+
+logger = structlog.get_logger(__name__)
+
+_WORD_RE = re.compile(r"\w+")
+_SHINGLE_SIZE = 3
+_CHARS_PER_TOKEN = 4
+
+
+@dataclass
+class ContextPacking:
+    """Parámetros del armado del contexto."""
+
+    token_budget: int = 5000  # 0 = sin tope
+    dedup_threshold: float = 0.85  # Jaccard mínimo para considerar duplicado
+    merge_adjacent: bool = True
+
+
+def packing_for(settings: Settings) -> ContextPacking:
+    return ContextPacking(
+        token_budget=settings.rag_context_token_budget,
+        dedup_threshold=settings.rag_context_dedup_threshold,
+        merge_adjacent=settings.rag_context_merge_adjacent,
+    )
+
+
+@dataclass
+class ContextBlock:
+    """Uno o más chunks consecutivos de un mismo doc, presentados juntos al LLM."""
+
+    chunks: list[SearchResult]
+    tokens: int
+
+    @property
+    def first(self) -> SearchResult:
+        return self.chunks[0]
+
+
+@dataclass
+class PackedContext:
+    """Contexto final para el prompt y cuánto se recortó para llegar a él."""
+
+    blocks: list[ContextBlock] = field(default_factory=list)
+    tokens: int = 0
+    duplicates: int = 0  # descartados por casi duplicados
+    over_budget: int = 0  # descartados por no caber en el presupuesto
+
+    @property
+    def chunks(self) -> list[SearchResult]:
+        return [c for block in self.blocks for c in block.chunks]
+
+
+def estimate_tokens(text: str) -> int:
+    """Estimación barata (~4 caracteres por token) cuando no hay conteo de tiktoken."""
+    return max(1, len(text) // _CHARS_PER_TOKEN)
+
+
+def _tokens(chunk: SearchResult) -> int:
+    if chunk.token_count is not None:
+        return chunk.token_count
+    return estimate_tokens(chunk.snippet)
+
+
+def _shingles(text: str) -> set[tuple[str, ...]]:
+    words = _WORD_RE.findall(text.lower())
+    if len(words) < _SHINGLE_SIZE:
+        return {tuple(words)}
+    return {tuple(words[i : i + _SHINGLE_SIZE]) for i in range(len(words) - _SHINGLE_SIZE + 1)}
+
+
+def _jaccard(a: set, b: set) -> float:
+    if not a or not b:
+        return 0.0
+    return len(a & b) / len(a | b)
+
+
+def _adjacent(block: ContextBlock, chunk: SearchResult) -> bool:
+    if chunk.chunk_index is None or block.first.doc_id != chunk.doc_id:
+        return False
+    indexes = [c.chunk_index for c in block.chunks]
+    if None in indexes:
+        return False
+    return chunk.chunk_index in (min(indexes) - 1, max(indexes) + 1)
+
+
+def _extend(block: ContextBlock, chunks: list[SearchResult], tokens: int) -> None:
+    block.chunks.extend(chunks)
+    block.chunks.sort(key=lambda c: c.chunk_index)
+    block.tokens += tokens
+
+
+def pack_context(chunks: list[SearchResult], packing: ContextPacking) -> PackedContext:
+    """Elige y agrupa ``chunks`` (en orden de ranking) dentro del presupuesto."""
+    packed = PackedContext()
+    seen_ids: set[str] = set()
+    kept_shingles: list[set[tuple[str, ...]]] = []
+
+    for chunk in chunks:
+        if chunk.chunk_id in seen_ids:
+            packed.duplicates += 1
+            continue
+        shingles = _shingles(chunk.snippet)
+        if any(_jaccard(shingles, s) >= packing.dedup_threshold for s in kept_shingles):
+            packed.duplicates += 1
+            continue
+
+        tokens = _tokens(chunk)
+        if (
+            packed.blocks
+            and packing.token_budget > 0
+            and packed.tokens + tokens > packing.token_budget
+        ):
+            packed.over_budget += 1
+            continue
+
+        seen_ids.add(chunk.chunk_id)
+        kept_shingles.append(shingles)
+        packed.tokens += tokens
+
+        block = None
+        if packing.merge_adjacent:
+            block = next((b for b in packed.blocks if _adjacent(b, chunk)), None)
+        if block is None:
+            packed.blocks.append(ContextBlock(chunks=[chunk], tokens=tokens))
+        else:
+            _extend(block, [chunk], tokens)
+            # El chunk puede haber cerrado el hueco con otro bloque del mismo doc.
+            for other in [b for b in packed.blocks if b is not block]:
+                if any(_adjacent(block, c) for c in other.chunks):
+                    _extend(block, other.chunks, other.tokens)
+                    packed.blocks.remove(other)
+
+    logger.debug(
+        "context_packed",
+        candidates=len(chunks),
+        chunks=len(packed.chunks),
+        blocks=len(packed.blocks),
+        tokens=packed.tokens,
+        duplicates=packed.duplicates,
+        over_budget=packed.over_budget,
+    )
+    return packed
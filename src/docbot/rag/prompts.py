@@ -86,6 +86,9 @@ Todos los documentos llevan frontmatter YAML. Los campos más útiles para respo
 |---|---|---|
 | "qué hace el servicio X / endpoints / stack" | `get_service_detail` + `knowledge_search` | `doc_type="service"` |
 | "qué pasa si cae X" / blast radius / dependientes | `analyze_impact` | (servicio o infra) |
+| "de qué depende X" / qué usa X | `get_dependencies` | (servicio) |
+| "cómo se relaciona X con Y" | `find_connection` | (dos servicios o docs) |
+| "cómo se relacionan X, Y y Z" / vecindario de X | `explore_graph` | `relation_types` opcional |
 | "lista de servicios / cuántos docs hay" | `list_services` | filtrar por `doc_type` |
 | "cómo manejo el incidente X" / "se cayó webapi" | `knowledge_search` | `doc_type="runbook"` |
 | "cómo respondemos en RFP sobre cifrado/SSO/HA" | `knowledge_search` | `doc_type="rfp"` |
@@ -250,3 +253,11 @@ Pregunta: {question}
 
 Responde usando el contexto. Cita inline con [repo:path#Heading] exacto. No agregues sección de fuentes al final.\
 """
+
+QUERY_REWRITE_PROMPT = """\
+Reformula la pregunta del usuario como consultas de búsqueda para una base de conocimiento \
+técnica interna (servicios, infraestructura, runbooks, políticas, RFPs, módulos de producto).
+Cada consulta debe cubrir una interpretación o formulación distinta, usar los términos que \
+probablemente aparecen en la documentación y no inventar nombres que la pregunta no sugiere.
+Responde solo con las consultas, una por línea, sin numerar ni agregar texto.\
+"""
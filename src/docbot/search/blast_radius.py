@@ -0,0 +1,197 @@
+"""Blast radius precalculado por doc, materializado en cada sync.
+
+El grafo solo cambia durante un sync, así que en lugar de recorrerlo en
+cada ``analyze_impact`` el sync calcula para cada doc sus dependientes
+transitivos hasta ``MAX_DEPTH`` saltos (con salto, camino hacia el doc y
+las aristas por nivel) y los guarda en ``blast_radius``. La lectura es un
+único lookup por PK que además trae la generación vigente: si la tabla
+quedó atrás de la generación actual se responde en vivo desde el grafo.
+"""
+
+from __future__ import annotations
+
+import time
+from collections import Counter
+from typing import Any
+
+import asyncpg
+import structlog
+
+from docbot.search.graph import DependencyGraph, GraphEdge, GraphNode, ImpactResult
+
+logger = structlog.get_logger(__name__)
+
+# Debe cubrir el máximo que acepta analyze_impact.
+MAX_DEPTH = 3
+
+_READ_QUERY = """
+    SELECT
+        s.generation,
+        s.blast_radius_generation,
+        b.max_depth,
+        b.nodes,
+        b.edges
+    FROM index_state s
+    LEFT JOIN blast_radius b ON b.doc_id = $1::uuid
+"""
+
+_INSERT_QUERY = """
+    INSERT INTO blast_radius
+        (doc_id, max_depth, dependents_count, criticality_counts, nodes, edges, generation)
+    VALUES ($1::uuid, $2, $3, $4, $5, $6, $7)
+"""
+
+
+def compute_blast_radius(
+    graph: DependencyGraph, doc_id: str, max_depth: int = MAX_DEPTH
+) -> dict[str, Any] | None:
+    """BFS sobre aristas entrantes guardando salto, camino y nivel de cada arista.
+
+    Retorna None si el doc no tiene dependientes.
+    """
+    depth_of = {doc_id: 0}
+    parent: dict[str, str] = {}
+    edges: list[dict[str, Any]] = []
+    frontier = [doc_id]
+
+    for level in range(1, max_depth + 1):
+        next_frontier: list[str] = []
+        for target in frontier:
+            for from_id, to_id, relation, evidence in graph.incoming(target):
+                edges.append(
+                    {
+                        "from_doc_id": from_id,
+                        "to_doc_id": to_id,
+                        "relation_type": relation,
+                        "evidence": evidence,
+                        "level": level,
+                    }
+                )
+                if from_id not in depth_of:
+                    depth_of[from_id] = level
+                    parent[from_id] = target
+                    next_frontier.append(from_id)
+        if not next_frontier:
+            break
+        frontier = next_frontier
+
+    if not edges:
+        return None
+
+    nodes = []
+    for node_id, depth in depth_of.items():
+        path = [node_id]
+        while path[-1] in parent:
+            path.append(parent[path[-1]])
+        node = graph.nodes[node_id]
+        nodes.append(
+            {
+                "doc_id": node_id,
+                "title": node.title,
+                "doc_type": node.doc_type,
+                "criticality": node.criticality,
+                "depth": depth,
+                "path": path,
+            }
+        )
+    return {"nodes": nodes, "edges": edges}
+
+
+def _criticality_counts(nodes: list[dict[str, Any]]) -> dict[str, int]:
+    return dict(Counter(n["criticality"] or "unknown" for n in nodes if n["depth"] > 0))
+
+
+async def materialize_blast_radius(conn: asyncpg.Connection, graph: DependencyGraph) -> int:
+    """Reescribe ``blast_radius`` para todos los docs con dependientes."""
+    t0 = time.time()
+    records = []
+    for doc_id in graph.nodes:
+        radius = compute_blast_radius(graph, doc_id)
+        if radius is None:
+            continue
+        nodes = radius["nodes"]
+        records.append(
+            (
+                doc_id,
+                MAX_DEPTH,
+                len(nodes) - 1,
+                _criticality_counts(nodes),
+                nodes,
+                radius["edges"],
+                graph.generation,
+            )
+        )
+
+    async with conn.transaction():
+        await conn.execute("DELETE FROM blast_radius")
+        await conn.executemany(_INSERT_QUERY, records)
+        await conn.execute(
+            "UPDATE index_state SET blast_radius_generation = $1", graph.generation
+        )
+
+    logger.info(
+        "blast_radius_materialized",
+        docs=len(records),
+        generation=graph.generation,
+        duration=round(time.time() - t0, 2),
+    )
+    return len(records)
+
+
+async def blast_radius_is_current(conn: asyncpg.Connection) -> bool:
+    """True si la tabla refleja la generación actual del índice."""
+    return bool(
+        await conn.fetchval(
+            "SELECT blast_radius_generation IS NOT DISTINCT FROM generation FROM index_state"
+        )
+    )
+
+
+async def read_blast_radius(
+    conn: asyncpg.Connection, doc_id: str, depth: int
+) -> ImpactResult | None:
+    """Blast radius precalculado hasta ``depth`` o None si está desactualizado."""
+    row = await conn.fetchrow(_READ_QUERY, doc_id)
+    if row is None or row["blast_radius_generation"] != row["generation"]:
+        return None
+    if row["nodes"] is None:
+        return ImpactResult(nodes=[], edges=[])
+    if depth > row["max_depth"]:
+        return None
+
+    return to_impact_result({"nodes": row["nodes"], "edges": row["edges"]}, depth)
+
+
+def to_impact_result(radius: dict[str, Any] | None, depth: int) -> ImpactResult:
+    """Convierte un blast radius (precalculado o en vivo) recortándolo a ``depth``."""
+    if radius is None:
+        return ImpactResult(nodes=[], edges=[])
+
+    nodes = [n for n in radius["nodes"] if n["depth"] <= depth]
+    titles = {n["doc_id"]: n["title"] for n in radius["nodes"]}
+    return ImpactResult(
+        nodes=[
+            GraphNode(
+                doc_id=n["doc_id"],
+                title=n["title"],
+                doc_type=n["doc_type"],
+                criticality=n["criticality"],
+            )
+            for n in nodes
+        ],
+        edges=[
+            GraphEdge(
+                from_title=titles[e["from_doc_id"]],
+                to_title=titles[e["to_doc_id"]],
+                relation_type=e["relation_type"],
+                evidence=e["evidence"],
+                from_doc_id=e["from_doc_id"],
+                to_doc_id=e["to_doc_id"],
+            )
+            for e in radius["edges"]
+            if e["level"] <= depth
+        ],
+        depths={n["doc_id"]: n["depth"] for n in nodes},
+        paths={n["doc_id"]: [titles[i] for i in n["path"]] for n in nodes},
+        criticality_counts=_criticality_counts(nodes),
+    )
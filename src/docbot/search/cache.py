@@ -0,0 +1,132 @@
+"""Cache de resultados de búsqueda con clave por generación del índice.
+
+La generación vive en ``index_state`` y la incrementa cada sync que cambia
+docs o chunks. Cada proceso la relee como mucho cada
+``search_cache_generation_ttl_seconds``, así que un sync hecho por otra
+réplica del API invalida este cache sin coordinación adicional.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+
+import asyncpg
+import numpy as np
+import structlog
+
+from docbot.config import Settings
+
+logger = structlog.get_logger(__name__)
+
+
+@dataclass
+class CacheStats:
+    """Contadores del cache para métricas."""
+
+    hits: int = 0
+    misses: int = 0
+    evictions: int = 0
+    invalidations: int = 0
+
+    @property
+    def hit_rate(self) -> float:
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+
+class SearchCache:
+    """LRU acotado de resultados de búsqueda."""
+
+    def __init__(self, max_entries: int) -> None:
+        self.max_entries = max_entries
+        self.stats = CacheStats()
+        self._entries: OrderedDict[tuple, list] = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: tuple) -> list | None:
+        entry = self._entries.get(key)
+        if entry is None:
+            self.stats.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.stats.hits += 1
+        return list(entry)
+
+    def put(self, key: tuple, value: list) -> None:
+        self._entries[key] = list(value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.stats.evictions += 1
+
+    def clear(self) -> None:
+        if self._entries:
+            self.stats.invalidations += 1
+        self._entries.clear()
+
+
+def make_key(generation: int, query_embedding: list[float], **params: object) -> tuple:
+    """Clave estable: generación + hash del embedding + parámetros de la búsqueda."""
+    digest = hashlib.blake2b(
+        np.asarray(query_embedding, dtype=np.float32).tobytes(), digest_size=16
+    ).hexdigest()
+    return (generation, digest, *sorted(params.items()))
+
+
+# ---------- Generación del índice ----------
+
+_generation: int = 0
+_generation_checked_at: float = float("-inf")
+_generation_ttl: float = 30.0
+
+_cache: SearchCache | None = None
+
+
+def configure_cache(settings: Settings) -> None:
+    """Crea el cache de búsqueda según settings (llamar en el lifespan)."""
+    global _cache, _generation_ttl
+    _generation_ttl = settings.search_cache_generation_ttl_seconds
+    _cache = None
+    if settings.search_cache_enabled:
+        _cache = SearchCache(settings.search_cache_max_entries)
+
+
+def get_cache() -> SearchCache | None:
+    """Devuelve el cache activo o None si está deshabilitado."""
+    return _cache
+
+
+def _set_generation(generation: int) -> None:
+    global _generation, _generation_checked_at
+    if generation != _generation and _cache is not None:
+        _cache.clear()
+        logger.info("search_cache_invalidated", generation=generation)
+    _generation = generation
+    _generation_checked_at = time.monotonic()
+
+
+async def current_generation(conn: asyncpg.Connection) -> int:
+    """Generación vigente del índice; consulta la DB solo si expiró el TTL."""
+    if time.monotonic() - _generation_checked_at < _generation_ttl:
+        return _generation
+    generation = await conn.fetchval("SELECT generation FROM index_state") or 0
+    _set_generation(generation)
+    return generation
+
+
+async def bump_generation(conn: asyncpg.Connection) -> int:
+    """Incrementa la generación tras un sync con cambios e invalida el cache local."""
+    generation = await conn.fetchval(
+        """
+        UPDATE index_state
+        SET generation = generation + 1, updated_at = now()
+        RETURNING generation
+        """
+    )
+    _set_generation(generation)
+    return generation
@@ -0,0 +1,144 @@
+"""Centralidad de los docs en el grafo como prior del ranking de búsqueda.
+
+Los docs "hub" (servicios core, infra compartida) son los que más se
+buscan, pero el ranking es puramente por similitud. El sync calcula un
+PageRank sobre ``edges`` (ponderado por ``confidence``, cada arista vota
+por su destino) y lo guarda normalizado a ``[0, 1]`` en
+``docs.centrality``. La búsqueda lo trae como una columna más del
+resultado y, si se pide, re-rankea mezclando relevancia y centralidad en
+memoria, sin round trips extra.
+"""
+
+from __future__ import annotations
+
+import time
+from dataclasses import dataclass
+from typing import TYPE_CHECKING
+
+import asyncpg
+import numpy as np
+import structlog
+
+from docbot.config import Settings
+from docbot.search.diversify import relevance
+
+if TYPE_CHECKING:
+    from docbot.search.hybrid import SearchResult
+
+logger = structlog.get_logger(__name__)
+
+_DOCS_QUERY = "SELECT id::text FROM docs"
+
+_EDGES_QUERY = """
+    SELECT from_doc_id::text, to_doc_id::text, coalesce(confidence, 1.0) AS confidence
+    FROM edges
+    WHERE from_doc_id <> to_doc_id
+"""
+
+_STORE_QUERY = """
+    UPDATE docs d
+    SET centrality = c.score
+    FROM unnest($1::uuid[], $2::real[]) AS c(id, score)
+    WHERE d.id = c.id
+      AND d.centrality IS DISTINCT FROM c.score
+"""
+
+
+@dataclass
+class CentralityPrior:
+    """Mezcla del ranking: ``(1 - weight) * relevancia + weight * centralidad``.
+
+    Se re-rankean ``fetch_k`` candidatos para que un hub que quedó justo
+    fuera del top-k pueda subir.
+    """
+
+    weight: float = 0.15
+    fetch_k: int = 30
+
+
+def prior_for(settings: Settings, weight: float | None = None) -> CentralityPrior | None:
+    """Prior de settings (o con ``weight`` explícito); None si el peso es 0."""
+    weight = settings.search_centrality_weight if weight is None else weight
+    if weight <= 0:
+        return None
+    return CentralityPrior(
+        weight=min(weight, 1.0),
+        fetch_k=settings.search_centrality_fetch_k,
+    )
+
+
+def pagerank(
+    doc_ids: list[str],
+    edges: list[tuple[str, str, float]],
+    *,
+    damping: float = 0.85,
+    iterations: int = 50,
+    tol: float = 1e-6,
+) -> dict[str, float]:
+    """PageRank ponderado por confianza, normalizado para que el máximo sea 1.
+
+    Los docs sin aristas salientes reparten su masa uniformemente.
+    """
+    n = len(doc_ids)
+    if n == 0:
+        return {}
+
+    index = {doc_id: i for i, doc_id in enumerate(doc_ids)}
+    pairs = [(index[s], index[t], w) for s, t, w in edges if s in index and t in index and w > 0]
+    src = np.array([p[0] for p in pairs], dtype=np.int64)
+    dst = np.array([p[1] for p in pairs], dtype=np.int64)
+    weight = np.array([p[2] for p in pairs], dtype=np.float64)
+
+    out_weight = np.bincount(src, weights=weight, minlength=n)
+    dangling = out_weight == 0
+    share = weight / out_weight[src]
+
+    rank = np.full(n, 1.0 / n)
+    for _ in range(iterations):
+        spread = np.bincount(dst, weights=rank[src] * share, minlength=n)
+        updated = (1 - damping) / n + damping * (spread + rank[dangling].sum() / n)
+        delta = np.abs(updated - rank).sum()
+        rank = updated
+        if delta < tol:
+            break
+
+    rank /= rank.max()
+    return {doc_id: float(rank[i]) for doc_id, i in index.items()}
+
+
+async def refresh_centrality(conn: asyncpg.Connection) -> int:
+    """Recalcula la centralidad de todos los docs y guarda solo las que cambiaron."""
+    t0 = time.time()
+    doc_ids = [r["id"] for r in await conn.fetch(_DOCS_QUERY)]
+    edges = [
+        (r["from_doc_id"], r["to_doc_id"], float(r["confidence"]))
+        for r in await conn.fetch(_EDGES_QUERY)
+    ]
+
+    scores = pagerank(doc_ids, edges)
+    status = await conn.execute(_STORE_QUERY, list(scores), list(scores.values()))
+    updated = int(status.split()[-1])
+
+    logger.info(
+        "centrality_refreshed",
+        docs=len(doc_ids),
+        edges=len(edges),
+        updated=updated,
+        duration=round(time.time() - t0, 2),
+    )
+    return updated
+
+
+def apply_prior(results: list[SearchResult], prior: CentralityPrior) -> list[SearchResult]:
+    """Ordena por la mezcla de relevancia y centralidad y la deja en ``prior_score``.
+
+    La relevancia es la misma que usa MMR (RRF normalizado o similitud
+    coseno), así que con ``diversity`` el MMR parte del ranking mezclado.
+    """
+    if not results:
+        return results
+
+    rel = relevance(results, with_prior=False)
+    for r, value in zip(results, rel):
+        r.prior_score = float((1 - prior.weight) * value + prior.weight * (r.centrality or 0.0))
+    return sorted(results, key=lambda r: (r.prior_score or 0.0, r.score), reverse=True)
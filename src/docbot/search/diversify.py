@@ -0,0 +1,108 @@
+"""Diversificación de resultados: Maximal Marginal Relevance + tope de chunks por doc.
+
+Se aplica sobre un conjunto de candidatos sobre-pedido (``fetch_k``) que
+trae sus embeddings, para que el contexto del RAG no se gaste en varios
+chunks casi idénticos del mismo documento.
+"""
+
+from __future__ import annotations
+
+from dataclasses import dataclass
+from typing import TYPE_CHECKING
+
+import numpy as np
+
+from docbot.config import Settings
+
+if TYPE_CHECKING:
+    from docbot.search.hybrid import SearchResult
+
+
+@dataclass
+class Diversity:
+    """Parámetros de MMR.
+
+    ``lambda_mult=1`` es ranking puro por relevancia; valores menores
+    penalizan más la similitud con lo ya seleccionado.
+    """
+
+    lambda_mult: float = 0.7
+    fetch_k: int = 30
+    max_per_doc: int | None = 2
+
+
+def diversity_for(
+    settings: Settings,
+    enabled: bool,
+    *,
+    max_per_doc: int | None = None,
+) -> Diversity | None:
+    """Devuelve los parámetros de MMR de settings o None si está deshabilitado."""
+    if not enabled:
+        return None
+    return Diversity(
+        lambda_mult=settings.search_mmr_lambda,
+        fetch_k=settings.search_mmr_fetch_k,
+        max_per_doc=max_per_doc or settings.search_max_chunks_per_doc or None,
+    )
+
+
+def relevance(candidates: list[SearchResult], *, with_prior: bool = True) -> np.ndarray:
+    """Relevancia en [0, 1]: RRF normalizado si hubo fusión, si no similitud coseno.
+
+    Si los candidatos ya pasaron por el prior de centralidad
+    (``docbot.search.centrality``) y ``with_prior``, usa esa mezcla.
+    """
+    if with_prior and any(c.prior_score is not None for c in candidates):
+        return np.array([c.prior_score or 0.0 for c in candidates], dtype=np.float32)
+    if any(c.fused_score is not None for c in candidates):
+        fused = np.array([c.fused_score or 0.0 for c in candidates], dtype=np.float32)
+        top = fused.max()
+        return fused / top if top > 0 else fused
+    return np.array([c.score for c in candidates], dtype=np.float32)
+
+
+def mmr_select(
+    candidates: list[SearchResult],
+    embeddings: np.ndarray,
+    *,
+    top_k: int,
+    diversity: Diversity,
+) -> list[SearchResult]:
+    """Selecciona ``top_k`` candidatos maximizando relevancia y novedad.
+
+    ``embeddings`` es una matriz ``(len(candidates), dim)`` alineada con
+    ``candidates``. Los candidatos de un doc que ya alcanzó
+    ``max_per_doc`` se descartan.
+    """
+    if not candidates:
+        return []
+
+    emb = np.asarray(embeddings, dtype=np.float32)
+    norms = np.linalg.norm(emb, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    emb = emb / norms
+    similarity = emb @ emb.T
+
+    rel = relevance(candidates)
+    lam = diversity.lambda_mult
+    max_sim = np.zeros(len(candidates), dtype=np.float32)
+    available = np.ones(len(candidates), dtype=bool)
+    per_doc: dict[str, int] = {}
+    selected: list[int] = []
+
+    while len(selected) < top_k and available.any():
+        mmr = lam * rel - (1.0 - lam) * max_sim
+        mmr[~available] = -np.inf
+        best = int(np.argmax(mmr))
+        available[best] = False
+
+        doc_id = candidates[best].doc_id
+        if diversity.max_per_doc and per_doc.get(doc_id, 0) >= diversity.max_per_doc:
+            continue
+
+        per_doc[doc_id] = per_doc.get(doc_id, 0) + 1
+        selected.append(best)
+        np.maximum(max_sim, similarity[best], out=max_sim)
+
+    return [candidates[i] for i in selected]
@@ -0,0 +1,164 @@
+"""Expansión de resultados por el grafo: vecinos a un salto de los top hits.
+
+Después de ``hybrid_search`` se toman los docs de los mejores resultados,
+se buscan sus vecinos directos en ``edges`` (en ambas direcciones) y de
+cada vecino se trae su chunk más cercano a la query. Todo en una sola
+query; el recorte al presupuesto de tokens se hace en Python.
+"""
+
+from __future__ import annotations
+
+from dataclasses import dataclass
+
+import asyncpg
+import numpy as np
+import structlog
+
+from docbot.config import Settings
+from docbot.database import fetch
+from docbot.search.hybrid import SearchResult
+
+logger = structlog.get_logger(__name__)
+
+# $1 = embedding de la query, $2 = doc_ids semilla, $3 = chunks por vecino,
+# $4 = tope de filas (antes del recorte por tokens), $5 = doc_ids de todos
+# los hits (no se vuelven a traer aunque no sean semilla).
+_EXPAND_QUERY = """
+    WITH neighbors AS (
+        SELECT DISTINCT ON (n.doc_id) n.doc_id, n.seed_id, n.relation_type
+        FROM (
+            SELECT e.to_doc_id AS doc_id, e.from_doc_id AS seed_id, e.relation_type
+            FROM edges e
+            WHERE e.from_doc_id = ANY($2::uuid[])
+            UNION ALL
+            SELECT e.from_doc_id, e.to_doc_id, e.relation_type
+            FROM edges e
+            WHERE e.to_doc_id = ANY($2::uuid[])
+        ) n
+        WHERE n.doc_id <> ALL($5::uuid[])
+        ORDER BY n.doc_id, array_position($2::uuid[], n.seed_id)
+    ),
+    ranked AS (
+        SELECT
+            c.id,
+            c.doc_id,
+            c.heading,
+            c.content,
+            c.token_count,
+            1 - (c.embedding <=> $1) AS score,
+            nb.seed_id,
+            nb.relation_type,
+            row_number() OVER (PARTITION BY c.doc_id ORDER BY c.embedding <=> $1) AS rn
+        FROM neighbors nb
+        JOIN doc_chunks c ON c.doc_id = nb.doc_id
+    )
+    SELECT
+        d.id::text   AS doc_id,
+        r.id::text   AS chunk_id,
+        d.repo,
+        d.path,
+        r.heading,
+        r.score,
+        r.content    AS snippet,
+        d.doc_type,
+        r.token_count,
+        r.seed_id::text AS seed_id,
+        r.relation_type
+    FROM ranked r
+    JOIN docs d ON d.id = r.doc_id
+    WHERE r.rn <= $3
+    ORDER BY r.score DESC
+    LIMIT $4
+"""
+
+
+@dataclass
+class GraphExpansion:
+    """Parámetros de la expansión por vecinos."""
+
+    seed_docs: int = 3
+    chunks_per_neighbor: int = 1
+    max_chunks: int = 4
+    token_budget: int = 1500
+
+
+def expansion_for(settings: Settings, enabled: bool | None) -> GraphExpansion | None:
+    """Parámetros de settings o None si la expansión está apagada.
+
+    ``enabled=None`` usa el default de ``rag_graph_expansion``.
+    """
+    if enabled is None:
+        enabled = settings.rag_graph_expansion
+    if not enabled:
+        return None
+    return GraphExpansion(
+        seed_docs=settings.graph_expansion_seed_docs,
+        chunks_per_neighbor=settings.graph_expansion_chunks_per_neighbor,
+        max_chunks=settings.graph_expansion_max_chunks,
+        token_budget=settings.graph_expansion_token_budget,
+    )
+
+
+async def expand_with_neighbors(
+    conn: asyncpg.Connection,
+    query_embedding: list[float],
+    hits: list[SearchResult],
+    expansion: GraphExpansion,
+) -> list[SearchResult]:
+    """Chunks de los vecinos a un salto de los docs de ``hits``, dentro del presupuesto.
+
+    Devuelve solo los chunks agregados (sin repetir docs ni chunks de ``hits``),
+    ordenados por similitud y con ``expanded_from``/``relation_type``
+    indicando por qué arista llegaron.
+    """
+    hit_docs = list(dict.fromkeys(h.doc_id for h in hits))
+    seeds = hit_docs[: expansion.seed_docs]
+    if not seeds or expansion.max_chunks <= 0:
+        return []
+
+    rows = await fetch(
+        conn,
+        _EXPAND_QUERY,
+        np.array(query_embedding, dtype=np.float32),
+        seeds,
+        expansion.chunks_per_neighbor,
+        expansion.max_chunks * 4,
+        hit_docs,
+    )
+
+    seed_paths = {h.doc_id: h.path for h in hits}
+    returned = {h.chunk_id for h in hits}
+    added: list[SearchResult] = []
+    spent = 0
+    for row in rows:
+        if len(added) >= expansion.max_chunks:
+            break
+        if row["chunk_id"] in returned:
+            continue
+        if spent + row["token_count"] > expansion.token_budget:
+            continue
+        spent += row["token_count"]
+        added.append(
+            SearchResult(
+                doc_id=row["doc_id"],
+                chunk_id=row["chunk_id"],
+                repo=row["repo"],
+                path=row["path"],
+                heading=row["heading"],
+                score=float(row["score"]),
+                snippet=row["snippet"],
+                doc_type=row["doc_type"],
+                expanded_from=seed_paths.get(row["seed_id"], row["seed_id"]),
+                relation_type=row["relation_type"],
+                token_count=row["token_count"],
+            )
+        )
+
+    logger.debug(
+        "graph_expansion",
+        seeds=len(seeds),
+        candidates=len(rows),
+        added=len(added),
+        tokens=spent,
+    )
+    return added
@@ -1,14 +1,115 @@
-"""Consultas de grafo sobre la tabla edges con CTE recursivos."""
+"""Consultas de grafo sobre la tabla edges.
+
+El camino caliente es ``DependencyGraph``: listas de adyacencia en memoria
+cargadas desde ``docs``/``edges`` y recorridas por BFS con visited set, así
+que los ciclos de ``related_service`` no multiplican el trabajo. Se marca
+con la generación del índice (``docbot.search.cache``) y se recarga cuando
+un sync la incrementa. Si el grafo no está cargado (``graph_cache_enabled``
+en False) se usa el CTE recursivo contra Postgres.
+"""
 
 from __future__ import annotations
 
-from dataclasses import dataclass
+import asyncio
+import time
+from collections import defaultdict
+from dataclasses import dataclass, field
+from typing import Iterable, Iterator
 
 import asyncpg
 import structlog
 
+from docbot.database import fetch
+from docbot.search.resolver import TitleIndex, TitleMatch
+
 logger = structlog.get_logger(__name__)
 
+_DEPENDENTS_QUERY = """
+    WITH RECURSIVE graph AS (
+        SELECT
+            e.from_doc_id,
+            e.to_doc_id,
+            e.relation_type,
+            e.evidence,
+            1 AS depth,
+            ARRAY[e.to_doc_id, e.from_doc_id] AS path
+        FROM edges e
+        WHERE e.to_doc_id = $1::uuid
+
+        UNION ALL
+
+        SELECT
+            e.from_doc_id,
+            e.to_doc_id,
+            e.relation_type,
+            e.evidence,
+            g.depth + 1,
+            g.path || e.from_doc_id
+        FROM edges e
+        JOIN graph g ON e.to_doc_id = g.from_doc_id
+        WHERE g.depth < $2
+          AND NOT e.from_doc_id = ANY(g.path)
+    )
+    SELECT DISTINCT
+        g.from_doc_id::text,
+        g.to_doc_id::text,
+        g.relation_type,
+        g.evidence,
+        df.title   AS from_title,
+        df.doc_type AS from_doc_type,
+        df.frontmatter->>'criticality' AS from_criticality,
+        dt.title   AS to_title,
+        dt.doc_type AS to_doc_type,
+        dt.frontmatter->>'criticality' AS to_criticality
+    FROM graph g
+    JOIN docs df ON df.id = g.from_doc_id
+    JOIN docs dt ON dt.id = g.to_doc_id
+"""
+
+# Respaldo en SQL del resolver en memoria: candidatos por trigramas sobre
+# el título normalizado (índice idx_docs_title_trgm), con el mismo orden de
+# preferencia que ``TitleIndex.search``.
+_RESOLVE_SERVICE_QUERY = """
+    WITH q AS (SELECT docbot_normalize($1) AS t)
+    SELECT
+        d.id::text,
+        d.title,
+        d.doc_type,
+        d.frontmatter->>'criticality' AS criticality,
+        CASE
+            WHEN replace(docbot_normalize(d.title), ' ', '') = replace(q.t, ' ', '') THEN 1.0
+            ELSE greatest(
+                similarity(docbot_normalize(d.title), q.t),
+                CASE WHEN docbot_normalize(d.title) LIKE '%' || q.t || '%' THEN 0.6 ELSE 0 END
+            )
+        END AS score
+    FROM docs d, q
+    WHERE docbot_normalize(d.title) % q.t
+       OR docbot_normalize(d.title) LIKE '%' || q.t || '%'
+    ORDER BY score DESC, (d.doc_type = 'service') DESC, length(d.title)
+    LIMIT $2
+"""
+
+_GRAPH_NODES_QUERY = """
+    SELECT
+        id::text,
+        title,
+        doc_type,
+        path,
+        frontmatter->>'criticality' AS criticality,
+        frontmatter->'aliases'      AS aliases,
+        centrality
+    FROM docs
+"""
+
+_GRAPH_EDGES_QUERY = """
+    SELECT DISTINCT from_doc_id::text, to_doc_id::text, relation_type, evidence
+    FROM edges
+"""
+
+# Se preparan al abrir cada conexión del pool (ver docbot.database).
+HOT_QUERIES = [_DEPENDENTS_QUERY, _RESOLVE_SERVICE_QUERY]
+
 
 @dataclass
 class GraphNode:
@@ -28,14 +129,346 @@ class GraphEdge:
     to_title: str
     relation_type: str
     evidence: str | None
+    from_doc_id: str | None = None
+    to_doc_id: str | None = None
 
 
 @dataclass
 class ImpactResult:
-    """Resultado de un análisis de impacto."""
+    """Resultado de un análisis de impacto.
+
+    ``depths``, ``paths`` (títulos desde el dependiente hasta el doc
+    analizado) y ``criticality_counts`` solo se completan cuando el
+    resultado viene del blast radius (``docbot.search.blast_radius``).
+    """
 
     nodes: list[GraphNode]
     edges: list[GraphEdge]
+    depths: dict[str, int] = field(default_factory=dict)
+    paths: dict[str, list[str]] = field(default_factory=dict)
+    criticality_counts: dict[str, int] = field(default_factory=dict)
+
+
+GRAPH_DIRECTIONS = ("in", "out", "both")
+
+# (from_doc_id, to_doc_id, relation_type, evidence)
+_Edge = tuple[str, str, str, str | None]
+
+
+class DependencyGraph:
+    """Grafo de dependencias en memoria con listas de adyacencia por dirección."""
+
+    def __init__(
+        self,
+        nodes: list[GraphNode],
+        edges: list[_Edge],
+        generation: int = 0,
+        titles: TitleIndex | None = None,
+        centrality: dict[str, float] | None = None,
+    ) -> None:
+        self.nodes = {n.doc_id: n for n in nodes}
+        self.centrality = centrality or {}
+        self.generation = generation
+        if titles is None:
+            titles = TitleIndex()
+            for n in nodes:
+                titles.add(n.doc_id, n.title, n.doc_type)
+        self.titles = titles
+        self.loaded_at = time.monotonic()
+        self.edge_count = 0
+        self._incoming: dict[str, list[_Edge]] = defaultdict(list)
+        self._outgoing: dict[str, list[_Edge]] = defaultdict(list)
+        for edge in edges:
+            if edge[0] not in self.nodes or edge[1] not in self.nodes:
+                continue
+            self._incoming[edge[1]].append(edge)
+            self._outgoing[edge[0]].append(edge)
+            self.edge_count += 1
+
+    def __len__(self) -> int:
+        return len(self.nodes)
+
+    def resolve(self, service_query: str) -> GraphNode | None:
+        """Mejor candidato difuso por título, alias o nombre de archivo."""
+        match = self.titles.best(service_query)
+        return self.nodes.get(match.doc_id) if match else None
+
+    def incoming(self, doc_id: str) -> list[_Edge]:
+        """Aristas que apuntan a ``doc_id`` (sus dependientes directos)."""
+        return self._incoming.get(doc_id, [])
+
+    def lookup(self, ref: str) -> GraphNode | None:
+        """Nodo por doc_id exacto o, si no, por título (ver ``resolve``)."""
+        return self.nodes.get(ref) or self.resolve(ref)
+
+    def _edge(self, edge: _Edge) -> GraphEdge:
+        from_id, to_id, relation, evidence = edge
+        return GraphEdge(
+            from_title=self.nodes[from_id].title,
+            to_title=self.nodes[to_id].title,
+            relation_type=relation,
+            evidence=evidence,
+            from_doc_id=from_id,
+            to_doc_id=to_id,
+        )
+
+    def _adjacent(
+        self, doc_id: str, direction: str, relation_types: set[str] | None
+    ) -> Iterator[tuple[_Edge, str]]:
+        """Aristas de ``doc_id`` en la dirección pedida junto al vecino del otro extremo."""
+        if direction in ("in", "both"):
+            for edge in self._incoming.get(doc_id, ()):
+                if relation_types is None or edge[2] in relation_types:
+                    yield edge, edge[0]
+        if direction in ("out", "both"):
+            for edge in self._outgoing.get(doc_id, ()):
+                if relation_types is None or edge[2] in relation_types:
+                    yield edge, edge[1]
+
+    def walk(
+        self,
+        roots: Iterable[str],
+        *,
+        depth: int = 2,
+        direction: str = "in",
+        relation_types: Iterable[str] | None = None,
+    ) -> ImpactResult:
+        """BFS desde ``roots`` hasta ``depth`` saltos.
+
+        ``direction``: ``in`` = quién depende de los roots, ``out`` = de qué
+        dependen, ``both`` = vecindario. Devuelve toda arista (que pase el
+        filtro de ``relation_types``) incidente a un nodo alcanzado a menos
+        de ``depth`` saltos; cada nodo se expande una sola vez.
+        """
+        if direction not in GRAPH_DIRECTIONS:
+            raise ValueError(f"direction inválida: {direction!r} (usar {GRAPH_DIRECTIONS})")
+        relations = set(relation_types) if relation_types else None
+
+        frontier = [r for r in dict.fromkeys(roots) if r in self.nodes]
+        visited = set(frontier)
+        nodes: dict[str, GraphNode] = {r: self.nodes[r] for r in frontier}
+        seen_edges: set[_Edge] = set()
+        edges: list[GraphEdge] = []
+
+        for _ in range(depth):
+            next_frontier: list[str] = []
+            for current in frontier:
+                for edge, neighbor in self._adjacent(current, direction, relations):
+                    if edge in seen_edges:
+                        continue
+                    seen_edges.add(edge)
+                    edges.append(self._edge(edge))
+                    if neighbor not in visited:
+                        visited.add(neighbor)
+                        nodes[neighbor] = self.nodes[neighbor]
+                        next_frontier.append(neighbor)
+            if not next_frontier:
+                break
+            frontier = next_frontier
+
+        return ImpactResult(nodes=list(nodes.values()), edges=edges)
+
+    def dependents(self, doc_id: str, depth: int = 2) -> ImpactResult:
+        """Docs que dependen (directa o transitivamente) de ``doc_id``.
+
+        Mismas aristas que el CTE de ``get_dependents``. El root solo
+        aparece si tiene dependientes.
+        """
+        result = self.walk([doc_id], depth=depth, direction="in")
+        if not result.edges:
+            return ImpactResult(nodes=[], edges=[])
+        return result
+
+    def dependencies(
+        self, doc_id: str, depth: int = 2, relation_types: Iterable[str] | None = None
+    ) -> ImpactResult:
+        """Docs de los que ``doc_id`` depende (directa o transitivamente)."""
+        return self.walk([doc_id], depth=depth, direction="out", relation_types=relation_types)
+
+    def neighborhood(
+        self, doc_id: str, depth: int = 1, relation_types: Iterable[str] | None = None
+    ) -> ImpactResult:
+        """Vecindario en ambas direcciones hasta ``depth`` saltos."""
+        return self.walk([doc_id], depth=depth, direction="both", relation_types=relation_types)
+
+    def shortest_path(
+        self,
+        source_id: str,
+        target_id: str,
+        *,
+        max_depth: int = 6,
+        relation_types: Iterable[str] | None = None,
+        directed: bool = False,
+    ) -> ImpactResult | None:
+        """Camino más corto (en saltos) entre dos docs o None si no hay.
+
+        Sin ``directed`` las aristas se recorren en ambos sentidos (cómo se
+        conectan X e Y); con ``directed`` solo ``from → to`` (X depende de Y).
+        """
+        if source_id not in self.nodes or target_id not in self.nodes:
+            return None
+        if source_id == target_id:
+            return ImpactResult(nodes=[self.nodes[source_id]], edges=[])
+
+        relations = set(relation_types) if relation_types else None
+        direction = "out" if directed else "both"
+        parents: dict[str, tuple[str, _Edge] | None] = {source_id: None}
+        frontier = [source_id]
+
+        for _ in range(max_depth):
+            next_frontier: list[str] = []
+            for current in frontier:
+                for edge, neighbor in self._adjacent(current, direction, relations):
+                    if neighbor in parents:
+                        continue
+                    parents[neighbor] = (current, edge)
+                    if neighbor == target_id:
+                        return self._path_result(parents, target_id)
+                    next_frontier.append(neighbor)
+            if not next_frontier:
+                break
+            frontier = next_frontier
+        return None
+
+    def _path_result(
+        self, parents: dict[str, tuple[str, _Edge] | None], target_id: str
+    ) -> ImpactResult:
+        node_ids = [target_id]
+        edges: list[GraphEdge] = []
+        step = parents[target_id]
+        while step is not None:
+            previous, edge = step
+            edges.append(self._edge(edge))
+            node_ids.append(previous)
+            step = parents[previous]
+        node_ids.reverse()
+        edges.reverse()
+        return ImpactResult(nodes=[self.nodes[i] for i in node_ids], edges=edges)
+
+    def subgraph(
+        self,
+        doc_ids: Iterable[str],
+        *,
+        depth: int = 0,
+        relation_types: Iterable[str] | None = None,
+    ) -> ImpactResult:
+        """Subgrafo inducido por ``doc_ids`` más su vecindario a ``depth`` saltos.
+
+        Incluye todas las aristas (filtradas por ``relation_types``) cuyos
+        dos extremos quedaron dentro del conjunto.
+        """
+        relations = set(relation_types) if relation_types else None
+        members = self.walk(doc_ids, depth=depth, direction="both", relation_types=relations).nodes
+        ids = {n.doc_id for n in members}
+        edges = [
+            self._edge(edge)
+            for doc_id in ids
+            for edge in self._outgoing.get(doc_id, ())
+            if edge[1] in ids and (relations is None or edge[2] in relations)
+        ]
+        return ImpactResult(nodes=members, edges=edges)
+
+
+_graph: DependencyGraph | None = None
+_graph_lock = asyncio.Lock()
+
+
+def get_dependency_graph() -> DependencyGraph | None:
+    """Devuelve el grafo cargado o None si está deshabilitado / sin cargar."""
+    return _graph
+
+
+async def _load_graph(conn: asyncpg.Connection) -> DependencyGraph:
+    from docbot.search.cache import current_generation
+
+    generation = await current_generation(conn)
+    node_rows = await conn.fetch(_GRAPH_NODES_QUERY)
+    edge_rows = await conn.fetch(_GRAPH_EDGES_QUERY)
+
+    titles = TitleIndex()
+    for r in node_rows:
+        aliases = r["aliases"] or []
+        if isinstance(aliases, str):
+            aliases = [aliases]
+        titles.add(r["id"], r["title"], r["doc_type"], path=r["path"], aliases=aliases)
+
+    return DependencyGraph(
+        [
+            GraphNode(
+                doc_id=r["id"],
+                title=r["title"],
+                doc_type=r["doc_type"],
+                criticality=r["criticality"],
+            )
+            for r in node_rows
+        ],
+        [tuple(r) for r in edge_rows],
+        generation,
+        titles,
+        {r["id"]: r["centrality"] for r in node_rows},
+    )
+
+
+async def refresh_dependency_graph(conn: asyncpg.Connection) -> DependencyGraph:
+    """Recarga el grafo completo desde ``docs``/``edges``."""
+    global _graph
+    async with _graph_lock:
+        t0 = time.time()
+        _graph = await _load_graph(conn)
+        logger.info(
+            "dependency_graph_loaded",
+            nodes=len(_graph),
+            edges=_graph.edge_count,
+            generation=_graph.generation,
+            duration=round(time.time() - t0, 2),
+        )
+        return _graph
+
+
+async def _current_graph(conn: asyncpg.Connection) -> DependencyGraph | None:
+    """Grafo vigente; lo recarga si otro sync incrementó la generación."""
+    from docbot.search.cache import current_generation
+
+    if _graph is None:
+        return None
+    if await current_generation(conn) != _graph.generation:
+        return await refresh_dependency_graph(conn)
+    return _graph
+
+
+async def dependency_graph(conn: asyncpg.Connection) -> DependencyGraph:
+    """Grafo para las consultas de traversal.
+
+    Usa el grafo cacheado si está habilitado; si no, carga uno efímero
+    para esta consulta (dos SELECT planos, sin CTE recursivo).
+    """
+    graph = await _current_graph(conn)
+    if graph is None:
+        graph = await _load_graph(conn)
+    return graph
+
+
+async def resolve_titles(
+    conn: asyncpg.Connection,
+    query: str,
+    limit: int = 5,
+) -> list[TitleMatch]:
+    """Candidatos rankeados para un nombre de doc (en memoria o por trigramas en SQL)."""
+    graph = await _current_graph(conn)
+    if graph is not None:
+        return graph.titles.search(query, limit=limit)
+
+    rows = await fetch(conn, _RESOLVE_SERVICE_QUERY, query, limit)
+    return [
+        TitleMatch(
+            doc_id=r["id"],
+            title=r["title"],
+            doc_type=r["doc_type"],
+            score=round(float(r["score"]), 4),
+            matched=r["title"],
+        )
+        for r in rows
+    ]
 
 
 async def get_dependents(
@@ -44,48 +477,7 @@ async def get_dependents(
     depth: int = 2,
 ) -> ImpactResult:
     """Obtiene todos los docs que dependen (directa o transitivamente) de doc_id."""
-    rows = await conn.fetch(
-        """
-        WITH RECURSIVE graph AS (
-            SELECT
-                e.from_doc_id,
-                e.to_doc_id,
-                e.relation_type,
-                e.evidence,
-                1 AS depth
-            FROM edges e
-            WHERE e.to_doc_id = $1::uuid
-
-            UNION ALL
-
-            SELECT
-                e.from_doc_id,
-                e.to_doc_id,
-                e.relation_type,
-                e.evidence,
-                g.depth + 1
-            FROM edges e
-            JOIN graph g ON e.to_doc_id = g.from_doc_id
-            WHERE g.depth < $2
-        )
-        SELECT DISTINCT
-            g.from_doc_id::text,
-            g.to_doc_id::text,
-            g.relation_type,
-            g.evidence,
-            df.title   AS from_title,
-            df.doc_type AS from_doc_type,
-            df.frontmatter->>'criticality' AS from_criticality,
-            dt.title   AS to_title,
-            dt.doc_type AS to_doc_type,
-            dt.frontmatter->>'criticality' AS to_criticality
-        FROM graph g
-        JOIN docs df ON df.id = g.from_doc_id
-        JOIN docs dt ON dt.id = g.to_doc_id
-        """,
-        doc_id,
-        depth,
-    )
+    rows = await fetch(conn, _DEPENDENTS_QUERY, doc_id, depth)
 
     nodes_map: dict[str, GraphNode] = {}
     graph_edges: list[GraphEdge] = []
@@ -126,30 +518,43 @@ async def impact_analysis(
     service_query: str,
     depth: int = 2,
 ) -> ImpactResult:
-    """Analiza impacto: busca un servicio por nombre y obtiene quién depende de él."""
-    row = await conn.fetchrow(
-        """
-        SELECT id::text, title, doc_type, frontmatter->>'criticality' AS criticality
-        FROM docs
-        WHERE lower(title) LIKE '%' || lower($1) || '%'
-        ORDER BY (doc_type = 'service')::int DESC
-        LIMIT 1
-        """,
-        service_query,
+    """Analiza impacto: busca un servicio por nombre y obtiene quién depende de él.
+
+    Lee el blast radius materializado en el último sync; si está
+    desactualizado lo calcula en vivo (grafo en memoria o CTE).
+    """
+    from docbot.search.blast_radius import (
+        compute_blast_radius,
+        read_blast_radius,
+        to_impact_result,
     )
 
-    if row is None:
+    graph = await _current_graph(conn)
+    if graph is not None:
+        root = graph.resolve(service_query)
+    else:
+        rows = await fetch(conn, _RESOLVE_SERVICE_QUERY, service_query, 1)
+        root = (
+            GraphNode(
+                doc_id=rows[0]["id"],
+                title=rows[0]["title"],
+                doc_type=rows[0]["doc_type"],
+                criticality=rows[0]["criticality"],
+            )
+            if rows
+            else None
+        )
+
+    if root is None:
         logger.warning("impact_service_not_found", query=service_query)
         return ImpactResult(nodes=[], edges=[])
 
-    result = await get_dependents(conn, row["id"], depth)
+    result = await read_blast_radius(conn, root.doc_id, depth)
+    if result is None and graph is not None:
+        result = to_impact_result(compute_blast_radius(graph, root.doc_id, depth), depth)
+    elif result is None:
+        result = await get_dependents(conn, root.doc_id, depth)
 
-    root = GraphNode(
-        doc_id=row["id"],
-        title=row["title"],
-        doc_type=row["doc_type"],
-        criticality=row["criticality"],
-    )
     if root.doc_id not in {n.doc_id for n in result.nodes}:
         result.nodes.insert(0, root)
 
@@ -1,14 +1,302 @@
-"""Búsqueda híbrida: filtros de metadata + similitud vectorial con pgvector."""
+"""Búsqueda híbrida: filtros de metadata + similitud vectorial + full-text con pgvector."""
 
 from __future__ import annotations
 
-from dataclasses import dataclass
+import functools
+import time
+from contextlib import asynccontextmanager
+from dataclasses import astuple, dataclass
+from typing import AsyncIterator, Awaitable, Callable
 
 import asyncpg
+import numpy as np
 import structlog
 
+from docbot.config import Settings
+from docbot.database import fetch
+from docbot.profiling import observe_query, stage
+from docbot.search.centrality import CentralityPrior, apply_prior
+from docbot.search.diversify import Diversity, mmr_select
+from docbot.search.indexes import EMBEDDING_DIM, partial_filters, vector_order_for
+from docbot.search.planner import SearchPlan
+
 logger = structlog.get_logger(__name__)
 
+# Filtros de metadata compartidos por las ramas vectorial y léxica.
+# $2 = source, $3 = repo, $4 = doc_type, $5 = path_prefix.
+_FILTER_SQL = """
+          ($2::text IS NULL OR d.source = $2)
+          AND ($3::text IS NULL OR d.repo = $3)
+          AND ($4::text IS NULL OR d.doc_type = $4)
+          AND ($5::text IS NULL OR d.path LIKE $5 || '%')
+"""
+
+# Candidatos de la rama vectorial: ids y distancia coseno a ``{qvec}``,
+# ordenados por distancia y limitados a $6. Variantes según el plan
+# (``vector_order``):
+# - ann: índice HNSW float32.
+# - exact: suma 0 para que Postgres no pueda usar HNSW y calcule la
+#   distancia real sobre todo el subconjunto filtrado.
+# - halfvec / binary: primera pasada gruesa sobre el índice HNSW compacto
+#   (``docbot.search.indexes``) por ``$6 * rerank`` candidatos y re-rank
+#   exacto contra el embedding float32.
+# ``{partial}`` repite como literal el predicado de un HNSW parcial
+# (``c.doc_type = 'runbook'``) para que Postgres pueda probar que el índice
+# aplica también con planes genéricos de statements preparados.
+_CANDIDATES_SQL = {
+    "ann": """
+            SELECT c.id, c.embedding <=> {qvec} AS distance
+            FROM doc_chunks c
+            JOIN docs d ON c.doc_id = d.id
+            WHERE {filters}{partial}
+            ORDER BY c.embedding <=> {qvec}
+            LIMIT $6""",
+    "exact": """
+            SELECT c.id, c.embedding <=> {qvec} AS distance
+            FROM doc_chunks c
+            JOIN docs d ON c.doc_id = d.id
+            WHERE {filters}
+            ORDER BY (c.embedding <=> {qvec}) + 0
+            LIMIT $6""",
+    "halfvec": """
+            SELECT r.id, r.embedding <=> {qvec} AS distance
+            FROM (
+                SELECT c.id, c.embedding
+                FROM doc_chunks c
+                JOIN docs d ON c.doc_id = d.id
+                WHERE {filters}{partial}
+                ORDER BY c.embedding::halfvec({dim}) <=> {qvec}::halfvec({dim})
+                LIMIT $6 * {rerank}
+            ) r
+            ORDER BY r.embedding <=> {qvec}
+            LIMIT $6""",
+    "binary": """
+            SELECT r.id, r.embedding <=> {qvec} AS distance
+            FROM (
+                SELECT c.id, c.embedding
+                FROM doc_chunks c
+                JOIN docs d ON c.doc_id = d.id
+                WHERE {filters}{partial}
+                ORDER BY binary_quantize(c.embedding)::bit({dim}) <~> binary_quantize({qvec})
+                LIMIT $6 * {rerank}
+            ) r
+            ORDER BY r.embedding <=> {qvec}
+            LIMIT $6""",
+}
+
+_RESULT_COLUMNS = """
+        d.id::text   AS doc_id,
+        c.id::text   AS chunk_id,
+        d.repo,
+        d.path,
+        c.heading,
+        1 - (c.embedding <=> {qvec}) AS score,
+        c.content    AS snippet,
+        d.doc_type,
+        d.centrality,
+        c.token_count,
+        c.chunk_index"""
+
+# Los ranks se numeran con ORDER BY explícito: el orden de un subquery no
+# está garantizado al llegar a la función de ventana.
+_VECTOR_QUERY = """
+    WITH vec AS (
+        SELECT id, row_number() OVER (ORDER BY distance, id) AS rank
+        FROM ({candidates}
+        ) v
+    )
+    SELECT{columns},
+        vec.rank     AS vector_rank{extra}
+    FROM vec
+    JOIN doc_chunks c ON c.id = vec.id
+    JOIN docs d ON c.doc_id = d.id
+    ORDER BY vec.rank
+"""
+
+# Rama full-text: ids rankeados por ``ts_rank_cd`` contra $7, limitados a $6.
+_LEXICAL_CTE = """
+    lex AS (
+        SELECT id, row_number() OVER (ORDER BY lex_rank DESC, id) AS rank
+        FROM (
+            SELECT c.id, ts_rank_cd(c.search_tsv, q) AS lex_rank
+            FROM doc_chunks c
+            JOIN docs d ON c.doc_id = d.id,
+                 websearch_to_tsquery('docbot_es', $7) q
+            WHERE c.search_tsv @@ q
+              AND {filters}
+            ORDER BY lex_rank DESC
+            LIMIT $6
+        ) l
+    )"""
+
+# Ambas ramas se ejecutan en un solo round trip: cada CTE devuelve sus
+# candidatos ya rankeados y la fusión (RRF) se calcula en Python.
+_HYBRID_QUERY = """
+    WITH vec AS (
+        SELECT id, row_number() OVER (ORDER BY distance, id) AS rank
+        FROM ({candidates}
+        ) v
+    ),""" + _LEXICAL_CTE + """
+    SELECT{columns},
+        vec.rank     AS vector_rank,
+        lex.rank     AS lexical_rank{extra}
+    FROM doc_chunks c
+    JOIN docs d ON c.doc_id = d.id
+    LEFT JOIN vec ON vec.id = c.id
+    LEFT JOIN lex ON lex.id = c.id
+    WHERE c.id IN (SELECT id FROM vec UNION SELECT id FROM lex)
+"""
+
+# Solo la rama full-text, cuando la vectorial la responde la réplica en
+# memoria. $1 (embedding) se usa únicamente para el ``score`` coseno.
+_LEXICAL_QUERY = """
+    WITH""" + _LEXICAL_CTE + """
+    SELECT{columns},
+        lex.rank     AS lexical_rank{extra}
+    FROM lex
+    JOIN doc_chunks c ON c.id = lex.id
+    JOIN docs d ON c.doc_id = d.id
+    ORDER BY lex.rank
+"""
+
+# Búsqueda en batch: todas las queries viajan como arrays y cada una se
+# resuelve con un LATERAL, así N búsquedas cuestan un solo round trip.
+# $1 = embeddings (text[] en formato pgvector), $6 = límite por query,
+# $7 = textos de las queries (text[], solo rama léxica).
+_BATCH_VECTOR_BRANCH = """
+        SELECT q.idx, v.id, v.rank, 'vector' AS branch
+        FROM q
+        CROSS JOIN LATERAL (
+            SELECT id, row_number() OVER (ORDER BY distance, id) AS rank
+            FROM ({candidates}
+            ) s
+        ) v
+"""
+
+_BATCH_LEXICAL_BRANCH = """
+        UNION ALL
+        SELECT q.idx, l.id, l.rank, 'lexical' AS branch
+        FROM q
+        CROSS JOIN LATERAL (
+            SELECT id, row_number() OVER (ORDER BY lex_rank DESC, id) AS rank
+            FROM (
+                SELECT c.id, ts_rank_cd(c.search_tsv, tsq) AS lex_rank
+                FROM doc_chunks c
+                JOIN docs d ON c.doc_id = d.id,
+                     websearch_to_tsquery('docbot_es', q.query_text) tsq
+                WHERE c.search_tsv @@ tsq
+                  AND {filters}
+                ORDER BY lex_rank DESC
+                LIMIT $6
+            ) s
+        ) l
+"""
+
+_BATCH_QUERY = """
+    WITH q AS (
+        SELECT embedding::vector AS embedding, query_text, idx
+        FROM unnest($1::text[], $7::text[]) WITH ORDINALITY AS u(embedding, query_text, idx)
+    ),
+    hits AS (
+        {branches}
+    )
+    SELECT
+        h.idx,{columns},
+        h.vector_rank,
+        h.lexical_rank
+    FROM (
+        SELECT
+            idx,
+            id,
+            min(rank) FILTER (WHERE branch = 'vector')  AS vector_rank,
+            min(rank) FILTER (WHERE branch = 'lexical') AS lexical_rank
+        FROM hits
+        GROUP BY idx, id
+    ) h
+    JOIN q ON q.idx = h.idx
+    JOIN doc_chunks c ON c.id = h.id
+    JOIN docs d ON c.doc_id = d.id
+    ORDER BY h.idx, h.vector_rank NULLS LAST
+"""
+
+
+def _candidates(
+    order: str, qvec: str, rerank: int, partial: tuple[str, str] | None
+) -> str:
+    # Los valores vienen de settings ya validados por ``partial_filters``.
+    predicate = f"\n              AND c.{partial[0]} = '{partial[1]}'" if partial else ""
+    return _CANDIDATES_SQL[order].format(
+        filters=_FILTER_SQL, partial=predicate, qvec=qvec, dim=EMBEDDING_DIM, rerank=rerank
+    )
+
+
+@functools.lru_cache(maxsize=64)
+def _build_query(
+    lexical: bool,
+    order: str,
+    with_embeddings: bool,
+    rerank: int,
+    partial: tuple[str, str] | None = None,
+) -> str:
+    """SQL de ``hybrid_search`` para (rama léxica, orden vectorial, embeddings, re-rank, parcial)."""
+    template = _HYBRID_QUERY if lexical else _VECTOR_QUERY
+    return template.format(
+        candidates=_candidates(order, "$1", rerank, partial),
+        columns=_RESULT_COLUMNS.format(qvec="$1"),
+        filters=_FILTER_SQL,
+        extra=",\n        c.embedding" if with_embeddings else "",
+    )
+
+
+@functools.lru_cache(maxsize=2)
+def _build_lexical_query(with_embeddings: bool) -> str:
+    """SQL de la rama full-text sola (búsqueda híbrida con la réplica)."""
+    return _LEXICAL_QUERY.format(
+        columns=_RESULT_COLUMNS.format(qvec="$1"),
+        filters=_FILTER_SQL,
+        extra=",\n        c.embedding" if with_embeddings else "",
+    )
+
+
+@functools.lru_cache(maxsize=32)
+def _build_batch_query(
+    lexical: bool, order: str, rerank: int, partial: tuple[str, str] | None = None
+) -> str:
+    """SQL de ``hybrid_search_many``: un LATERAL por query."""
+    branches = _BATCH_VECTOR_BRANCH.format(
+        candidates=_candidates(order, "q.embedding", rerank, partial)
+    )
+    if lexical:
+        branches += _BATCH_LEXICAL_BRANCH.format(filters=_FILTER_SQL)
+    return _BATCH_QUERY.format(
+        branches=branches,
+        columns=_RESULT_COLUMNS.format(qvec="q.embedding"),
+    )
+
+
+def hot_queries(settings: Settings) -> list[str]:
+    """Variantes de ``hybrid_search`` que se preparan al abrir cada conexión del pool.
+
+    Incluye el SQL de ``hybrid_search_many`` sin índice parcial, que usa el
+    multi-query del RAG en cada pregunta.
+    """
+    order = vector_order_for(settings)
+    rerank = settings.search_rerank_factor
+    variants = [(order, None), ("exact", None)] + [
+        (order, partial) for partial in partial_filters(settings)
+    ]
+    single = [
+        _build_query(lexical, o, with_embeddings, rerank, partial)
+        for lexical in (False, True)
+        for o, partial in dict.fromkeys(variants)
+        for with_embeddings in (False, True)
+    ]
+    batch = [_build_batch_query(lexical, order, rerank) for lexical in (False, True)]
+    lexical_only = (
+        [_build_lexical_query(e) for e in (False, True)] if settings.replica_enabled else []
+    )
+    return single + batch + lexical_only
+
 
 @dataclass
 class SearchResult:
@@ -22,6 +310,300 @@ class SearchResult:
     score: float
     snippet: str
     doc_type: str | None = None
+    vector_rank: int | None = None
+    lexical_rank: int | None = None
+    fused_score: float | None = None
+    expanded_from: str | None = None  # path del hit por el que llegó vía el grafo
+    relation_type: str | None = None
+    centrality: float | None = None  # prior del grafo (docbot.search.centrality)
+    prior_score: float | None = None
+    token_count: int | None = None  # para el armado del contexto (docbot.rag.packing)
+    chunk_index: int | None = None
+
+
+@dataclass
+class FusionWeights:
+    """Pesos de la fusión Reciprocal Rank Fusion entre rama vectorial y léxica."""
+
+    vector: float = 1.0
+    lexical: float = 1.0
+    k: int = 60
+    candidates: int = 50
+
+
+def fusion_for(settings: Settings, mode: str | None = None) -> FusionWeights | None:
+    """Devuelve los pesos de fusión para ``mode`` o None si la búsqueda es solo vectorial.
+
+    ``mode=None`` usa ``settings.search_mode``.
+    """
+    mode = mode or settings.search_mode
+    if mode != "hybrid":
+        return None
+    return FusionWeights(
+        vector=settings.search_vector_weight,
+        lexical=settings.search_lexical_weight,
+        k=settings.search_rrf_k,
+        candidates=settings.search_candidates,
+    )
+
+
+def reciprocal_rank_fusion(
+    results: list[SearchResult],
+    fusion: FusionWeights,
+) -> list[SearchResult]:
+    """Ordena resultados por RRF ponderado: ``sum(w / (k + rank))`` sobre cada rama.
+
+    Un resultado ausente de una rama no suma nada por ella. Empates se
+    resuelven por similitud coseno.
+    """
+    for r in results:
+        fused = 0.0
+        if r.vector_rank is not None:
+            fused += fusion.vector / (fusion.k + r.vector_rank)
+        if r.lexical_rank is not None:
+            fused += fusion.lexical / (fusion.k + r.lexical_rank)
+        r.fused_score = fused
+    return sorted(results, key=lambda r: (r.fused_score or 0.0, r.score), reverse=True)
+
+
+def _row_to_result(row: asyncpg.Record) -> SearchResult:
+    keys = row.keys()
+    return SearchResult(
+        doc_id=row["doc_id"],
+        chunk_id=row["chunk_id"],
+        repo=row["repo"],
+        path=row["path"],
+        heading=row["heading"],
+        score=float(row["score"]),
+        snippet=row["snippet"],
+        doc_type=row["doc_type"],
+        vector_rank=row["vector_rank"] if "vector_rank" in keys else None,
+        lexical_rank=row["lexical_rank"] if "lexical_rank" in keys else None,
+        centrality=row["centrality"] if "centrality" in keys else None,
+        token_count=row["token_count"] if "token_count" in keys else None,
+        chunk_index=row["chunk_index"] if "chunk_index" in keys else None,
+    )
+
+
+def _fill_centrality(results: list[SearchResult]) -> list[SearchResult]:
+    """Completa la centralidad de resultados de la réplica desde el grafo en memoria."""
+    from docbot.search.graph import get_dependency_graph
+
+    graph = get_dependency_graph()
+    if graph is not None:
+        for r in results:
+            r.centrality = graph.centrality.get(r.doc_id, 0.0)
+    return results
+
+
+@asynccontextmanager
+async def _plan_scope(conn: asyncpg.Connection, plan: SearchPlan | None) -> AsyncIterator[None]:
+    """Aplica los GUC de pgvector del plan con ``SET LOCAL`` dentro de una transacción."""
+    if plan is None or plan.ef_search is None:
+        yield
+        return
+
+    async with conn.transaction():
+        await conn.execute(f"SET LOCAL hnsw.ef_search = {int(plan.ef_search)}")
+        if plan.strategy == "iterative":
+            await conn.execute("SET LOCAL hnsw.iterative_scan = strict_order")
+        yield
+
+
+def _vector_order(plan: SearchPlan | None) -> str:
+    if plan is None:
+        return "ann"
+    if plan.exact:
+        return "exact"
+    return "ann" if plan.vector_index == "full" else plan.vector_index
+
+
+def _is_lexical(query_text: str | None, fusion: FusionWeights | None) -> bool:
+    return fusion is not None and bool(query_text and query_text.strip())
+
+
+def _replica_behind(generation: int) -> bool:
+    """True si la réplica cargada todavía no refleja ``generation``.
+
+    Sus resultados se devuelven igual, pero no se cachean bajo esa
+    generación: quedarían fijos hasta el próximo sync.
+    """
+    from docbot.search.replica import get_replica
+
+    replica = get_replica()
+    return replica is not None and replica.generation < generation
+
+
+def _cache_key(
+    generation: int,
+    query_embedding: list[float],
+    *,
+    query_text: str | None,
+    fusion: FusionWeights | None,
+    **params: object,
+) -> tuple:
+    from docbot.search.cache import make_key
+
+    lexical = _is_lexical(query_text, fusion)
+    return make_key(
+        generation,
+        query_embedding,
+        query_text=query_text if lexical else None,
+        fusion=astuple(fusion) if lexical else None,
+        **params,
+    )
+
+
+async def _run_search(
+    conn: asyncpg.Connection,
+    query_embedding: list[float],
+    *,
+    limit: int,
+    source: str | None,
+    repo: str | None,
+    doc_type: str | None,
+    path_prefix: str | None,
+    query_text: str | None,
+    fusion: FusionWeights | None,
+    plan: SearchPlan | None,
+    with_embeddings: bool = False,
+) -> tuple[list[SearchResult], np.ndarray | None]:
+    """Ejecuta la búsqueda contra la réplica en proceso o contra Postgres.
+
+    Con la réplica cargada la rama vectorial sale de memoria; si además la
+    búsqueda es híbrida, solo la rama full-text va a Postgres y se fusiona
+    con RRF en Python.
+
+    Retorna hasta ``limit`` resultados ya rankeados y, si se pide, la matriz
+    de sus embeddings alineada fila a fila (para MMR).
+    """
+    from docbot.search.replica import get_replica
+
+    lexical = _is_lexical(query_text, fusion)
+    filters = {"source": source, "repo": repo, "doc_type": doc_type, "path_prefix": path_prefix}
+
+    replica = get_replica()
+    if replica is not None:
+        with stage("replica"):
+            results = _fill_centrality(
+                replica.search(
+                    query_embedding,
+                    top_k=max(limit, fusion.candidates) if lexical else limit,
+                    **filters,
+                )
+            )
+        if plan is not None:
+            plan.strategy = "replica"
+            plan.ef_search = None
+        vectors: dict[str, np.ndarray] = {}
+        if with_embeddings:
+            ids = [r.chunk_id for r in results]
+            vectors = dict(zip(ids, replica.vectors(ids)))
+        if lexical:
+            results = await _fuse_lexical(
+                conn,
+                results,
+                vectors,
+                query_embedding,
+                limit=limit,
+                query_text=query_text,
+                fusion=fusion,
+                with_embeddings=with_embeddings,
+                **filters,
+            )
+        embeddings = None
+        if with_embeddings:
+            embeddings = np.array([vectors[r.chunk_id] for r in results], dtype=np.float32)
+        return results, embeddings
+
+    embedding = np.array(query_embedding, dtype=np.float32)
+    query = _build_query(
+        lexical,
+        _vector_order(plan),
+        with_embeddings,
+        plan.rerank_factor if plan else 1,
+        plan.partial_filter if plan else None,
+    )
+
+    args: tuple = (embedding, source, repo, doc_type, path_prefix)
+    if lexical:
+        args += (max(limit, fusion.candidates), query_text)
+    else:
+        args += (limit,)
+
+    async with _plan_scope(conn, plan):
+        t0 = time.perf_counter()
+        with stage("sql"):
+            rows = await fetch(conn, query, *args)
+        await observe_query(
+            conn, "hybrid_search", query, args, (time.perf_counter() - t0) * 1000
+        )
+
+    results = [_row_to_result(r) for r in rows]
+    vectors = {r["chunk_id"]: r["embedding"] for r in rows} if with_embeddings else {}
+    if lexical:
+        results = reciprocal_rank_fusion(results, fusion)[:limit]
+
+    embeddings = None
+    if with_embeddings:
+        embeddings = np.array([vectors[r.chunk_id] for r in results], dtype=np.float32)
+    return results, embeddings
+
+
+async def _fuse_lexical(
+    conn: asyncpg.Connection,
+    vector_hits: list[SearchResult],
+    vectors: dict[str, np.ndarray],
+    query_embedding: list[float],
+    *,
+    limit: int,
+    source: str | None,
+    repo: str | None,
+    doc_type: str | None,
+    path_prefix: str | None,
+    query_text: str,
+    fusion: FusionWeights,
+    with_embeddings: bool,
+) -> list[SearchResult]:
+    """Trae la rama full-text de Postgres y la fusiona con ``vector_hits`` (réplica).
+
+    Completa ``vectors`` con los embeddings de los hits solo léxicos.
+    """
+    for rank, hit in enumerate(vector_hits, 1):
+        hit.vector_rank = rank
+
+    query = _build_lexical_query(with_embeddings)
+    args = (
+        np.array(query_embedding, dtype=np.float32),
+        source,
+        repo,
+        doc_type,
+        path_prefix,
+        max(limit, fusion.candidates),
+        query_text,
+    )
+    t0 = time.perf_counter()
+    with stage("sql"):
+        rows = await fetch(conn, query, *args)
+    await observe_query(
+        conn, "hybrid_search_lexical", query, args, (time.perf_counter() - t0) * 1000
+    )
+
+    merged = {hit.chunk_id: hit for hit in vector_hits}
+    for row in rows:
+        hit = _row_to_result(row)
+        known = merged.get(hit.chunk_id)
+        if known is None:
+            merged[hit.chunk_id] = hit
+        else:
+            # La réplica no guarda tokens ni posición del chunk.
+            known.lexical_rank = hit.lexical_rank
+            known.token_count = hit.token_count
+            known.chunk_index = hit.chunk_index
+        if with_embeddings:
+            vectors.setdefault(hit.chunk_id, row["embedding"])
+
+    return reciprocal_rank_fusion(list(merged.values()), fusion)[:limit]
 
 
 async def hybrid_search(
@@ -33,61 +615,237 @@ async def hybrid_search(
     repo: str | None = None,
     doc_type: str | None = None,
     path_prefix: str | None = None,
+    query_text: str | None = None,
+    fusion: FusionWeights | None = None,
+    plan: SearchPlan | None = None,
+    planner: Callable[[], Awaitable[SearchPlan]] | None = None,
+    diversity: Diversity | None = None,
+    prior: CentralityPrior | None = None,
+    use_cache: bool = True,
 ) -> list[SearchResult]:
     """Ejecuta búsqueda vectorial con filtros opcionales de metadata.
 
     Combina pre-filtro SQL sobre docs con ranking por cosine similarity
-    sobre doc_chunks.embedding.
-    """
-    from pgvector.asyncpg import register_vector
+    sobre doc_chunks.embedding. Si se pasan ``query_text`` y ``fusion``,
+    agrega una rama full-text (``docbot_es``, insensible a acentos) y
+    fusiona ambos rankings con RRF. ``score`` sigue siendo la similitud
+    coseno; el ranking fusionado queda en ``fused_score``.
 
-    await register_vector(conn)
+    ``plan`` (ver ``docbot.search.planner.plan_search``) decide si la rama
+    vectorial usa HNSW, HNSW con ``ef_search``/iterative scan o distancia
+    exacta. Sin plan se usa HNSW tal cual. En lugar del plan se puede pasar
+    ``planner``, que se invoca recién si la búsqueda no sale del cache (con
+    ``path_prefix`` planificar cuesta un ``count(*)``).
 
-    import numpy as np
+    Si la réplica en proceso está cargada (``docbot.search.replica``), la
+    rama vectorial se responde desde memoria y ``plan.strategy`` pasa a
+    ``"replica"``; una búsqueda solo vectorial no toca la DB y una híbrida
+    solo ejecuta la rama full-text.
 
-    query = """
-        SELECT
-            d.id::text   AS doc_id,
-            c.id::text   AS chunk_id,
-            d.repo,
-            d.path,
-            c.heading,
-            1 - (c.embedding <=> $1) AS score,
-            c.content    AS snippet,
-            d.doc_type
-        FROM doc_chunks c
-        JOIN docs d ON c.doc_id = d.id
-        WHERE ($2::text IS NULL OR d.source = $2)
-          AND ($3::text IS NULL OR d.repo = $3)
-          AND ($4::text IS NULL OR d.doc_type = $4)
-          AND ($5::text IS NULL OR d.path LIKE $5 || '%')
-        ORDER BY c.embedding <=> $1
-        LIMIT $6
+    Con el cache de resultados activo (``docbot.search.cache``) y
+    ``use_cache=True``, una búsqueda idéntica dentro de la misma generación
+    del índice se responde sin DB y ``plan.strategy`` pasa a ``"cache"``.
+
+    Con ``diversity`` se sobre-piden ``fetch_k`` candidatos con sus
+    embeddings y se eligen ``top_k`` con MMR y tope de chunks por doc
+    (``docbot.search.diversify``).
+
+    Con ``prior`` se sobre-piden ``prior.fetch_k`` candidatos y se
+    re-rankean mezclando relevancia con la centralidad del doc en el grafo
+    (``docbot.search.centrality``); MMR, si aplica, parte de esa mezcla.
     """
+    from docbot.search.cache import current_generation, get_cache
 
-    rows = await conn.fetch(
-        query,
-        np.array(query_embedding, dtype=np.float32),
-        source,
-        repo,
-        doc_type,
-        path_prefix,
+    cache = get_cache() if use_cache else None
+    key: tuple | None = None
+    if cache is not None:
+        with stage("cache"):
+            generation = await current_generation(conn)
+        key = _cache_key(
+            generation,
+            query_embedding,
+            top_k=top_k,
+            source=source,
+            repo=repo,
+            doc_type=doc_type,
+            path_prefix=path_prefix,
+            query_text=query_text,
+            fusion=fusion,
+            diversity=astuple(diversity) if diversity else None,
+            prior=astuple(prior) if prior else None,
+        )
+        cached = cache.get(key)
+        if cached is not None:
+            if plan is not None:
+                plan.strategy = "cache"
+                plan.ef_search = None
+            logger.debug("hybrid_search", results=len(cached), top_k=top_k, strategy="cache")
+            return cached
+
+    if plan is None and planner is not None:
+        plan = await planner()
+
+    limit = max(
         top_k,
+        diversity.fetch_k if diversity else 0,
+        prior.fetch_k if prior else 0,
+    )
+    results, embeddings = await _run_search(
+        conn,
+        query_embedding,
+        limit=limit,
+        source=source,
+        repo=repo,
+        doc_type=doc_type,
+        path_prefix=path_prefix,
+        query_text=query_text,
+        fusion=fusion,
+        plan=plan,
+        with_embeddings=diversity is not None,
     )
+    if prior is not None:
+        rows = {r.chunk_id: i for i, r in enumerate(results)}
+        results = apply_prior(results, prior)
+        if embeddings is not None:
+            embeddings = embeddings[[rows[r.chunk_id] for r in results]]
+    if diversity is not None and embeddings is not None:
+        with stage("mmr"):
+            results = mmr_select(results, embeddings, top_k=top_k, diversity=diversity)
+    results = results[:top_k]
 
-    results = [
-        SearchResult(
-            doc_id=row["doc_id"],
-            chunk_id=row["chunk_id"],
-            repo=row["repo"],
-            path=row["path"],
-            heading=row["heading"],
-            score=float(row["score"]),
-            snippet=row["snippet"],
-            doc_type=row["doc_type"],
-        )
-        for row in rows
-    ]
+    logger.debug(
+        "hybrid_search",
+        results=len(results),
+        top_k=top_k,
+        lexical=_is_lexical(query_text, fusion),
+        diversified=diversity is not None,
+        prior=prior is not None,
+        strategy=plan.strategy if plan else "hnsw",
+    )
 
-    logger.debug("hybrid_search", results=len(results), top_k=top_k)
+    if cache is not None and key is not None:
+        if _replica_behind(generation):
+            logger.debug("search_cache_skipped", reason="replica_behind", generation=generation)
+        else:
+            cache.put(key, results)
     return results
+
+
+def _vector_literal(embedding: list[float]) -> str:
+    return "[" + ",".join(str(float(x)) for x in embedding) + "]"
+
+
+async def hybrid_search_many(
+    conn: asyncpg.Connection,
+    query_embeddings: list[list[float]],
+    *,
+    query_texts: list[str] | None = None,
+    top_k: int = 10,
+    source: str | None = None,
+    repo: str | None = None,
+    doc_type: str | None = None,
+    path_prefix: str | None = None,
+    fusion: FusionWeights | None = None,
+    plan: SearchPlan | None = None,
+    planner: Callable[[], Awaitable[SearchPlan]] | None = None,
+    prior: CentralityPrior | None = None,
+    use_cache: bool = True,
+) -> list[list[SearchResult]]:
+    """Versión batch de ``hybrid_search``: N queries, un solo round trip.
+
+    Todas las queries comparten filtros, ``top_k``, fusión y plan. Retorna
+    una lista de resultados por query, en el mismo orden de entrada. Las
+    queries que están en cache (o que puede responder la réplica) no van
+    a la DB; el resto se resuelve en una única sentencia con ``LATERAL``.
+    ``planner`` se invoca solo si alguna query no sale del cache.
+    ``prior`` re-rankea cada lista igual que en ``hybrid_search``.
+    """
+    from docbot.search.cache import current_generation, get_cache
+    from docbot.search.replica import get_replica
+
+    texts = query_texts or [None] * len(query_embeddings)
+    lexical = fusion is not None and any(_is_lexical(t, fusion) for t in texts)
+    filters = {"source": source, "repo": repo, "doc_type": doc_type, "path_prefix": path_prefix}
+    limit = max(top_k, prior.fetch_k) if prior else top_k
+
+    results: list[list[SearchResult] | None] = [None] * len(query_embeddings)
+
+    cache = get_cache() if use_cache else None
+    keys: list[tuple | None] = [None] * len(query_embeddings)
+    if cache is not None:
+        generation = await current_generation(conn)
+        for i, (emb, text) in enumerate(zip(query_embeddings, texts)):
+            keys[i] = _cache_key(
+                generation,
+                emb,
+                top_k=top_k,
+                query_text=text,
+                fusion=fusion,
+                prior=astuple(prior) if prior else None,
+                **filters,
+            )
+            results[i] = cache.get(keys[i])
+
+    pending = [i for i, r in enumerate(results) if r is None]
+    # Las que se resuelven ahora (réplica o DB) y se guardan en el cache al final.
+    computed = list(pending)
+    if pending and plan is None and planner is not None:
+        plan = await planner()
+
+    replica = get_replica()
+    if pending and replica is not None and not lexical:
+        for i in pending:
+            hits = _fill_centrality(replica.search(query_embeddings[i], top_k=limit, **filters))
+            results[i] = apply_prior(hits, prior)[:top_k] if prior else hits
+        if cache is not None and _replica_behind(generation):
+            computed = []
+        pending = []
+
+    if pending:
+        query = _build_batch_query(
+            lexical,
+            _vector_order(plan),
+            plan.rerank_factor if plan else 1,
+            plan.partial_filter if plan else None,
+        )
+        args = (
+            [_vector_literal(query_embeddings[i]) for i in pending],
+            source,
+            repo,
+            doc_type,
+            path_prefix,
+            max(limit, fusion.candidates) if lexical else limit,
+            [texts[i] for i in pending],
+        )
+        async with _plan_scope(conn, plan):
+            t0 = time.perf_counter()
+            with stage("sql"):
+                rows = await fetch(conn, query, *args)
+            await observe_query(
+                conn, "hybrid_search_many", query, args, (time.perf_counter() - t0) * 1000
+            )
+
+        grouped: dict[int, list[SearchResult]] = {}
+        for row in rows:
+            grouped.setdefault(row["idx"], []).append(_row_to_result(row))
+
+        for pos, i in enumerate(pending, 1):
+            hits = grouped.get(pos, [])
+            if lexical:
+                hits = reciprocal_rank_fusion(hits, fusion)[:limit]
+            if prior is not None:
+                hits = apply_prior(hits, prior)
+            results[i] = hits[:top_k]
+
+    if cache is not None:
+        for i in computed:
+            cache.put(keys[i], results[i])
+
+    logger.debug(
+        "hybrid_search_many",
+        queries=len(query_embeddings),
+        db_queries=len(pending),
+        top_k=top_k,
+        lexical=lexical,
+    )
+    return [r or [] for r in results]
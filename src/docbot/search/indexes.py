@@ -0,0 +1,236 @@
+"""Índices HNSW sobre ``doc_chunks.embedding``: compactos y parciales.
+
+El embedding se sigue guardando en float32 (lo necesita el re-rank exacto),
+pero la primera pasada del ANN puede ir contra un índice más chico:
+
+- ``halfvec``: HNSW sobre ``embedding::halfvec`` (float16, ~½ del tamaño).
+- ``binary``: HNSW sobre ``binary_quantize(embedding)`` con distancia de
+  Hamming (1 bit por dimensión, ~1/32 del tamaño).
+
+Ambos son índices de expresión, así que no duplican la columna en la
+tabla. ``hybrid_search`` pide ``top * search_rerank_factor`` candidatos al
+índice compacto y los re-rankea con la distancia coseno exacta. Requiere
+pgvector >= 0.7.
+
+Para los filtros de mucho tráfico (``search_partial_indexes``, ej.
+``doc_type=runbook``) se construye además un HNSW parcial con
+``WHERE doc_type = 'runbook'`` sobre las columnas copiadas de ``docs`` en
+006_chunk_filters.sql. Su grafo solo contiene esos chunks, así que una
+búsqueda filtrada no recorre el grafo global descartando vecinos.
+
+Todos se construyen y se borran con ``CONCURRENTLY`` (fuera de
+transacción): un HNSW sobre ``doc_chunks`` tarda minutos y un ``CREATE
+INDEX`` común bloquearía los syncs mientras tanto. Un build interrumpido
+deja el índice ``INVALID``; al próximo arranque se borra y se rehace.
+"""
+
+from __future__ import annotations
+
+import re
+from dataclasses import dataclass
+
+import asyncpg
+import structlog
+
+from docbot.config import Settings
+
+logger = structlog.get_logger(__name__)
+
+# Debe coincidir con ``vector(1536)`` en 002_tables.sql: los casts a
+# halfvec/bit necesitan la dimensión explícita para que el planner use el índice.
+EMBEDDING_DIM = 1536
+
+VECTOR_INDEXES = ("full", "halfvec", "binary")
+
+PARTIAL_COLUMNS = ("source", "doc_type")
+_PARTIAL_PREFIX = "idx_chunks_emb_"
+_PARTIAL_VALUE_RE = re.compile(r"^[\w.-]+$")
+
+_FULL_INDEX = "idx_chunks_embedding"
+_COMPACT_INDEXES = {
+    "halfvec": "idx_chunks_embedding_halfvec",
+    "binary": "idx_chunks_embedding_bit",
+}
+
+# Expresión + opclass del HNSW para cada índice; debe coincidir con el
+# ORDER BY de la 1ª pasada en ``hybrid._CANDIDATES_SQL``.
+_INDEX_KEYS = {
+    "full": "embedding vector_cosine_ops",
+    "halfvec": f"(embedding::halfvec({EMBEDDING_DIM})) halfvec_cosine_ops",
+    "binary": f"(binary_quantize(embedding)::bit({EMBEDDING_DIM})) bit_hamming_ops",
+}
+
+_HNSW_DDL = """
+    CREATE INDEX CONCURRENTLY IF NOT EXISTS {name}
+        ON doc_chunks USING hnsw ({key})
+        WITH (m = 16, ef_construction = 64){where}
+"""
+
+# Estado de un índice por nombre: ``building`` distingue un build en curso
+# (de otro proceso) de uno que quedó INVALID tras fallar.
+_INDEX_STATE_QUERY = """
+    SELECT
+        i.indisvalid AS valid,
+        EXISTS (
+            SELECT 1 FROM pg_stat_progress_create_index p WHERE p.index_relid = i.indexrelid
+        ) AS building
+    FROM pg_index i
+    JOIN pg_class c ON c.oid = i.indexrelid
+    WHERE c.relname = $1
+"""
+
+_PARTIAL_INDEXES_QUERY = """
+    SELECT indexname
+    FROM pg_indexes
+    WHERE tablename = 'doc_chunks' AND indexname LIKE 'idx\\_chunks\\_emb\\_%'
+"""
+
+_INDEX_REPORT_QUERY = """
+    SELECT
+        s.relname                       AS table_name,
+        s.indexrelname                  AS index_name,
+        pg_relation_size(s.indexrelid)  AS size_bytes,
+        s.idx_scan                      AS scans,
+        s.idx_tup_read                  AS tuples_read,
+        pg_get_indexdef(s.indexrelid)   AS definition
+    FROM pg_stat_user_indexes s
+    WHERE s.relname IN ('docs', 'doc_chunks', 'edges')
+    ORDER BY pg_relation_size(s.indexrelid) DESC
+"""
+
+
+def vector_order_for(settings: Settings) -> str:
+    """Orden de la rama vectorial para el índice configurado (``ann`` = HNSW float32)."""
+    index = settings.search_vector_index
+    return "ann" if index == "full" else index
+
+
+def partial_filters(settings: Settings) -> list[tuple[str, str]]:
+    """Parsea ``search_partial_indexes`` (``col=valor,...``) en pares validados."""
+    filters: list[tuple[str, str]] = []
+    for item in settings.search_partial_indexes.split(","):
+        item = item.strip()
+        if not item:
+            continue
+        column, _, value = item.partition("=")
+        column, value = column.strip(), value.strip()
+        if column not in PARTIAL_COLUMNS or not _PARTIAL_VALUE_RE.match(value):
+            raise ValueError(
+                f"search_partial_indexes inválido: {item!r} (usar col=valor, col en {PARTIAL_COLUMNS})"
+            )
+        filters.append((column, value))
+    return filters
+
+
+def partial_index_name(index: str, column: str, value: str) -> str:
+    """Nombre estable del HNSW parcial; incluye el tipo de índice para rehacerlo si cambia."""
+    slug = re.sub(r"[^a-z0-9]+", "_", value.lower()).strip("_")
+    return f"{_PARTIAL_PREFIX}{index}_{column}_{slug}"[:63]
+
+
+def _hnsw_ddl(name: str, index: str, where: str | None = None) -> str:
+    return _HNSW_DDL.format(
+        name=name, key=_INDEX_KEYS[index], where=f"\n        WHERE {where}" if where else ""
+    )
+
+
+def supports_compact_indexes(pgvector_version: str | None) -> bool:
+    """halfvec y binary_quantize existen desde pgvector 0.7."""
+    if not pgvector_version:
+        return False
+    parts = pgvector_version.split(".")
+    try:
+        return (int(parts[0]), int(parts[1])) >= (0, 7)
+    except (ValueError, IndexError):
+        return False
+
+
+async def ensure_vector_indexes(conn: asyncpg.Connection, settings: Settings) -> str:
+    """Crea el índice compacto configurado y, opcionalmente, elimina el float32.
+
+    Retorna el índice efectivo: ``full`` si pgvector no soporta el compacto.
+    ``conn`` no puede estar dentro de una transacción (``CONCURRENTLY``).
+    """
+    index = settings.search_vector_index
+    if index not in VECTOR_INDEXES:
+        raise ValueError(f"search_vector_index inválido: {index!r} (usar {VECTOR_INDEXES})")
+
+    if index != "full":
+        version = await conn.fetchval(
+            "SELECT extversion FROM pg_extension WHERE extname = 'vector'"
+        )
+        if not supports_compact_indexes(version):
+            logger.warning("compact_index_unsupported", index=index, pgvector_version=version)
+            index = "full"
+
+    if index == "full" or settings.search_keep_full_index:
+        await _create_index(conn, _FULL_INDEX, _hnsw_ddl(_FULL_INDEX, "full"))
+    else:
+        await conn.execute(f"DROP INDEX CONCURRENTLY IF EXISTS {_FULL_INDEX}")
+
+    if index != "full":
+        name = _COMPACT_INDEXES[index]
+        await _create_index(conn, name, _hnsw_ddl(name, index))
+
+    await _ensure_partial_indexes(conn, settings, index)
+
+    logger.info("vector_indexes_ready", index=index, keep_full=settings.search_keep_full_index)
+    return index
+
+
+async def _ensure_partial_indexes(conn: asyncpg.Connection, settings: Settings, index: str) -> None:
+    """Crea los HNSW parciales configurados y elimina los que ya no lo están."""
+    wanted: dict[str, str] = {}
+    for column, value in partial_filters(settings):
+        name = partial_index_name(index, column, value)
+        wanted[name] = _hnsw_ddl(name, index, f"{column} = '{value}'")
+
+    existing = {r["indexname"] for r in await conn.fetch(_PARTIAL_INDEXES_QUERY)}
+    for name in existing - set(wanted):
+        await conn.execute(f"DROP INDEX CONCURRENTLY IF EXISTS {name}")
+        logger.info("partial_index_dropped", index=name)
+    for name, ddl in wanted.items():
+        if await _create_index(conn, name, ddl):
+            logger.info("partial_index_created", index=name)
+
+
+async def _create_index(conn: asyncpg.Connection, name: str, ddl: str) -> bool:
+    """Construye ``name`` con ``ddl`` si falta o quedó INVALID. Retorna si lo construyó.
+
+    No se toca un índice que otro proceso (otra réplica del API que arrancó
+    a la vez) está construyendo.
+    """
+    state = await conn.fetchrow(_INDEX_STATE_QUERY, name)
+    if state is not None:
+        if state["valid"]:
+            return False
+        if state["building"]:
+            logger.info("index_build_in_progress", index=name)
+            return False
+        logger.warning("index_invalid_rebuilding", index=name)
+        await conn.execute(f"DROP INDEX CONCURRENTLY IF EXISTS {name}")
+
+    try:
+        await conn.execute(ddl)
+    except asyncpg.exceptions.DuplicateTableError:
+        logger.info("index_build_in_progress", index=name)
+        return False
+    return True
+
+
+@dataclass
+class IndexUsage:
+    """Tamaño y uso de un índice según ``pg_stat_user_indexes``."""
+
+    table_name: str
+    index_name: str
+    size_bytes: int
+    scans: int
+    tuples_read: int
+    definition: str
+
+
+async def index_report(conn: asyncpg.Connection) -> list[IndexUsage]:
+    """Índices de docs / doc_chunks / edges ordenados por tamaño."""
+    rows = await conn.fetch(_INDEX_REPORT_QUERY)
+    return [IndexUsage(**dict(r)) for r in rows]
@@ -0,0 +1,263 @@
+"""Planner de búsqueda vectorial según la selectividad de los filtros.
+
+Con filtros selectivos el índice HNSW devuelve sus ``ef_search`` mejores
+candidatos y el WHERE los descarta después, así que una búsqueda por
+``doc_type='runbook'`` puede volver con menos de ``top_k`` filas. El
+planner estima cuántos chunks sobreviven a los filtros y elige:
+
+- ``exact``: distancia por fuerza bruta sobre el subconjunto filtrado.
+- ``iterative``: HNSW con ``hnsw.iterative_scan`` (pgvector >= 0.8).
+- ``hnsw_ef``: HNSW con ``hnsw.ef_search`` elevado (pgvector < 0.8).
+- ``hnsw``: HNSW sin ajustes.
+
+Con ``search_vector_index`` en ``halfvec`` o ``binary`` el plan lleva el
+índice compacto a usar en la primera pasada y el factor de re-rank
+(ver ``docbot.search.indexes``).
+
+Si el filtro coincide con un HNSW parcial (``search_partial_indexes``) el
+plan lo fija en ``partial_filter`` y la selectividad se mide contra los
+chunks de ese índice en lugar del total.
+
+Si la búsqueda se responde desde la réplica en proceso o desde el cache
+de resultados, ``hybrid_search`` reporta ``replica`` o ``cache``.
+"""
+
+from __future__ import annotations
+
+import math
+import time
+from dataclasses import dataclass, field
+
+import asyncpg
+import structlog
+
+from docbot.config import Settings
+from docbot.search.indexes import partial_filters, supports_compact_indexes
+
+logger = structlog.get_logger(__name__)
+
+_DEFAULT_EF_SEARCH = 40
+
+_STATS_QUERY = """
+    SELECT
+        d.source,
+        d.repo,
+        d.doc_type,
+        count(*) AS chunks,
+        (SELECT extversion FROM pg_extension WHERE extname = 'vector') AS pgvector_version
+    FROM doc_chunks c
+    JOIN docs d ON c.doc_id = d.id
+    GROUP BY d.source, d.repo, d.doc_type
+"""
+
+_PATH_COUNT_QUERY = """
+    SELECT count(*)
+    FROM doc_chunks c
+    JOIN docs d ON c.doc_id = d.id
+    WHERE ($1::text IS NULL OR d.source = $1)
+      AND ($2::text IS NULL OR d.repo = $2)
+      AND ($3::text IS NULL OR d.doc_type = $3)
+      AND d.path LIKE $4 || '%'
+"""
+
+
+@dataclass
+class FilterStats:
+    """Conteo de chunks por (source, repo, doc_type) para estimar selectividad."""
+
+    counts: dict[tuple[str, str, str], int] = field(default_factory=dict)
+    pgvector_version: str | None = None
+    loaded_at: float = 0.0
+
+    @property
+    def total(self) -> int:
+        return sum(self.counts.values())
+
+    @property
+    def supports_iterative_scan(self) -> bool:
+        if not self.pgvector_version:
+            return False
+        parts = self.pgvector_version.split(".")
+        try:
+            return (int(parts[0]), int(parts[1])) >= (0, 8)
+        except (ValueError, IndexError):
+            return False
+
+    def estimate(
+        self,
+        source: str | None = None,
+        repo: str | None = None,
+        doc_type: str | None = None,
+    ) -> int:
+        """Cantidad de chunks que cumplen los filtros de igualdad."""
+        return sum(
+            n
+            for (s, r, t), n in self.counts.items()
+            if (source is None or s == source)
+            and (repo is None or r == repo)
+            and (doc_type is None or t == doc_type)
+        )
+
+
+@dataclass
+class SearchPlan:
+    """Estrategia elegida para la rama vectorial de una búsqueda."""
+
+    strategy: str = "hnsw"
+    estimated_rows: int = 0
+    total_rows: int = 0
+    ef_search: int | None = None
+    vector_index: str = "full"
+    rerank_factor: int = 1
+    partial_filter: tuple[str, str] | None = None
+
+    @property
+    def selectivity(self) -> float:
+        if self.total_rows <= 0:
+            return 1.0
+        return self.estimated_rows / self.total_rows
+
+    @property
+    def exact(self) -> bool:
+        return self.strategy == "exact"
+
+
+_stats: FilterStats | None = None
+
+
+def invalidate_filter_stats() -> None:
+    """Descarta las estadísticas cacheadas (llamar tras un sync)."""
+    global _stats
+    _stats = None
+
+
+async def get_filter_stats(conn: asyncpg.Connection, settings: Settings) -> FilterStats:
+    """Devuelve las estadísticas de filtros, recargándolas si expiró el TTL."""
+    global _stats
+    now = time.monotonic()
+    if _stats is not None and now - _stats.loaded_at < settings.search_stats_ttl_seconds:
+        return _stats
+
+    rows = await conn.fetch(_STATS_QUERY)
+    _stats = FilterStats(
+        counts={(r["source"], r["repo"], r["doc_type"]): r["chunks"] for r in rows},
+        pgvector_version=rows[0]["pgvector_version"] if rows else None,
+        loaded_at=now,
+    )
+    logger.debug("filter_stats_loaded", groups=len(rows), total=_stats.total)
+    return _stats
+
+
+def _set_vector_index(
+    plan: SearchPlan, settings: Settings, pgvector_version: str | None
+) -> None:
+    """Aplica el índice compacto configurado si la versión de pgvector lo soporta."""
+    if settings.search_vector_index == "full":
+        return
+    if pgvector_version is not None and not supports_compact_indexes(pgvector_version):
+        return
+    plan.vector_index = settings.search_vector_index
+    plan.rerank_factor = max(1, settings.search_rerank_factor)
+
+
+def choose_plan(
+    stats: FilterStats,
+    settings: Settings,
+    *,
+    estimated_rows: int,
+    candidates: int,
+    filtered: bool,
+    partial: tuple[str, str] | None = None,
+) -> SearchPlan:
+    """Elige la estrategia para ``estimated_rows`` chunks filtrados.
+
+    ``partial`` es el filtro de un HNSW parcial aplicable: si se usa, el
+    grafo recorrido solo tiene los chunks de ese filtro.
+    """
+    total = stats.total
+    plan = SearchPlan(estimated_rows=estimated_rows, total_rows=total)
+    _set_vector_index(plan, settings, stats.pgvector_version)
+
+    if not filtered or total == 0:
+        return plan
+
+    if estimated_rows <= settings.search_exact_max_rows:
+        plan.strategy = "exact"
+        return plan
+
+    selectivity = plan.selectivity
+    if partial is not None:
+        plan.partial_filter = partial
+        partial_rows = stats.estimate(**{partial[0]: partial[1]})
+        selectivity = estimated_rows / partial_rows if partial_rows else 1.0
+
+    if selectivity >= settings.search_hnsw_min_selectivity:
+        return plan
+
+    # Con selectividad s, HNSW necesita ~candidates/s vecinos para que
+    # sobrevivan ``candidates`` al filtro.
+    needed = math.ceil(candidates / max(selectivity, 1e-6))
+    plan.ef_search = max(_DEFAULT_EF_SEARCH, min(needed, settings.search_ef_search_max))
+    plan.strategy = "iterative" if stats.supports_iterative_scan else "hnsw_ef"
+    return plan
+
+
+def _pick_partial(
+    stats: FilterStats,
+    settings: Settings,
+    *,
+    source: str | None,
+    doc_type: str | None,
+) -> tuple[str, str] | None:
+    """HNSW parcial que cubre los filtros; entre varios, el de menos chunks."""
+    requested = {"source": source, "doc_type": doc_type}
+    matching = [(col, value) for col, value in partial_filters(settings) if requested[col] == value]
+    if not matching:
+        return None
+    return min(matching, key=lambda f: stats.estimate(**{f[0]: f[1]}))
+
+
+async def plan_search(
+    conn: asyncpg.Connection,
+    settings: Settings,
+    *,
+    top_k: int,
+    source: str | None = None,
+    repo: str | None = None,
+    doc_type: str | None = None,
+    path_prefix: str | None = None,
+) -> SearchPlan:
+    """Estima la selectividad de los filtros y elige estrategia.
+
+    Los filtros de igualdad se estiman con estadísticas cacheadas (sin
+    round trip en caliente); ``path_prefix`` requiere un ``count(*)``.
+    """
+    if not settings.search_planner_enabled:
+        plan = SearchPlan()
+        _set_vector_index(plan, settings, None)
+        return plan
+
+    stats = await get_filter_stats(conn, settings)
+    if path_prefix:
+        estimated = await conn.fetchval(_PATH_COUNT_QUERY, source, repo, doc_type, path_prefix)
+    else:
+        estimated = stats.estimate(source, repo, doc_type)
+
+    plan = choose_plan(
+        stats,
+        settings,
+        estimated_rows=estimated,
+        candidates=max(top_k, settings.search_candidates),
+        filtered=any(v is not None for v in (source, repo, doc_type, path_prefix)),
+        partial=_pick_partial(stats, settings, source=source, doc_type=doc_type),
+    )
+    logger.debug(
+        "search_planned",
+        strategy=plan.strategy,
+        estimated=plan.estimated_rows,
+        total=plan.total_rows,
+        ef_search=plan.ef_search,
+        vector_index=plan.vector_index,
+        partial_filter=plan.partial_filter,
+    )
+    return plan
@@ -0,0 +1,359 @@
+"""Réplica en proceso de los embeddings de doc_chunks para búsqueda sin round trip.
+
+La réplica guarda en disco una matriz ``(n, dim)`` de embeddings
+normalizados (float32 o float16) que se abre con ``np.memmap``, más un
+sidecar JSON (``meta.json``, que nombra la matriz de su snapshot) con la
+metadata por fila (doc, repo, path, heading, tipo, contenido) y la versión
+de cada doc (``docs.updated_at`` más cantidad y último ``created_at`` de
+sus chunks, así cambia con los chunks aunque se lea a mitad de un sync).
+Tras cada sync se refresca incrementalmente: solo se traen los chunks de
+docs nuevos o modificados y se descartan los de docs borrados.
+La réplica recuerda la generación del índice (``index_state``) de su
+snapshot; si quedó atrás, ``hybrid_search`` no cachea sus resultados.
+
+La búsqueda es exacta (producto punto vectorizado con NumPy) y aplica los
+mismos filtros que ``hybrid_search``. Sirve la rama vectorial: en modo
+``hybrid`` (el default de ``search_mode``) la rama full-text sigue yendo a
+Postgres y se fusiona con RRF en ``hybrid_search``; ``hybrid_search_many``
+solo usa la réplica para batches sin rama léxica.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import json
+import os
+import pathlib
+import tempfile
+import time
+
+import asyncpg
+import numpy as np
+import structlog
+
+from docbot.config import Settings
+from docbot.search.hybrid import SearchResult
+
+logger = structlog.get_logger(__name__)
+
+_MATRIX_FILE = "embeddings.bin"  # snapshots sin "matrix" en el meta (formato anterior)
+_META_FILE = "meta.json"
+_STALE_SECONDS = 3600
+_BLOCK_ROWS = 4096
+
+_COLUMNS = ("doc_id", "chunk_id", "source", "repo", "path", "heading", "doc_type", "content")
+
+_VERSIONS_QUERY = """
+    SELECT
+        d.id::text,
+        concat_ws('|', d.updated_at::text, count(c.id), max(c.created_at)::text) AS version
+    FROM docs d
+    LEFT JOIN doc_chunks c ON c.doc_id = d.id
+    GROUP BY d.id
+"""
+
+_CHUNKS_QUERY = """
+    SELECT
+        d.id::text   AS doc_id,
+        c.id::text   AS chunk_id,
+        d.source,
+        d.repo,
+        d.path,
+        c.heading,
+        d.doc_type,
+        c.content,
+        c.embedding
+    FROM doc_chunks c
+    JOIN docs d ON c.doc_id = d.id
+    WHERE c.embedding IS NOT NULL
+      AND ($1::uuid[] IS NULL OR d.id = ANY($1::uuid[]))
+    ORDER BY d.id, c.chunk_index
+"""
+
+
+def _normalize(matrix: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return matrix / norms
+
+
+class VectorReplica:
+    """Matriz de embeddings memory-mapped + metadata columnar."""
+
+    def __init__(
+        self,
+        matrix: np.ndarray,
+        columns: dict[str, list],
+        doc_versions: dict[str, str],
+        generation: int = 0,
+    ) -> None:
+        self.matrix = matrix
+        self.columns = {name: np.asarray(values, dtype=object) for name, values in columns.items()}
+        self.doc_versions = doc_versions
+        self.generation = generation  # generación del índice del snapshot refrescado
+        self.loaded_at = time.monotonic()
+        self._row_by_chunk = {cid: i for i, cid in enumerate(self.columns["chunk_id"])}
+
+    def __len__(self) -> int:
+        return self.matrix.shape[0]
+
+    # ---------- Persistencia ----------
+
+    @classmethod
+    def load(cls, directory: pathlib.Path) -> VectorReplica | None:
+        """Abre la réplica publicada en ``directory`` o retorna None si no existe."""
+        meta_path = directory / _META_FILE
+        # Un segundo intento por si otro proceso publicó (y borró el snapshot
+        # anterior) entre la lectura del meta y la apertura de la matriz.
+        for _ in range(2):
+            if not meta_path.exists():
+                return None
+            meta = json.loads(meta_path.read_text())
+            rows, dim = meta["rows"], meta["dim"]
+            try:
+                if rows == 0:
+                    matrix = np.zeros((0, dim), dtype=meta["dtype"])
+                else:
+                    matrix = np.memmap(
+                        directory / meta.get("matrix", _MATRIX_FILE),
+                        dtype=meta["dtype"],
+                        mode="r",
+                        shape=(rows, dim),
+                    )
+            except FileNotFoundError:
+                continue
+            return cls(matrix, meta["columns"], meta["doc_versions"], meta.get("generation", 0))
+        return None
+
+    @classmethod
+    def write(
+        cls,
+        directory: pathlib.Path,
+        matrix: np.ndarray,
+        columns: dict[str, list],
+        doc_versions: dict[str, str],
+        dtype: str,
+        generation: int = 0,
+    ) -> VectorReplica:
+        """Escribe un snapshot nuevo, lo publica de forma atómica y lo reabre como memmap.
+
+        Cada snapshot usa su propio archivo de matriz (nombre único, así dos
+        procesos con el mismo ``replica_dir`` no se pisan) y el meta nombra
+        la matriz a la que corresponde. Publicar es un único ``os.replace``
+        del meta: un ``load()`` concurrente ve el snapshot viejo o el nuevo
+        completo, nunca una matriz con el meta de otra.
+        """
+        directory.mkdir(parents=True, exist_ok=True)
+        matrix = np.ascontiguousarray(matrix, dtype=dtype)
+
+        fd, matrix_path = tempfile.mkstemp(dir=directory, prefix="embeddings-", suffix=".bin")
+        with os.fdopen(fd, "wb") as f:
+            matrix.tofile(f)
+            f.flush()
+            os.fsync(f.fileno())
+
+        meta = {
+            "matrix": os.path.basename(matrix_path),
+            "dtype": dtype,
+            "rows": matrix.shape[0],
+            "dim": matrix.shape[1],
+            "columns": columns,
+            "doc_versions": doc_versions,
+            "generation": generation,
+        }
+        fd, meta_path = tempfile.mkstemp(dir=directory, prefix="meta-", suffix=".json.tmp")
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump(meta, f, ensure_ascii=False)
+            f.flush()
+            os.fsync(f.fileno())
+
+        previous = _published_matrix(directory)
+        os.replace(meta_path, directory / _META_FILE)
+        _remove_old_snapshots(directory, keep=meta["matrix"], previous=previous)
+
+        replica = cls.load(directory)
+        assert replica is not None
+        return replica
+
+    # ---------- Búsqueda ----------
+
+    def vectors(self, chunk_ids: list[str]) -> np.ndarray:
+        """Embeddings (float32) de los chunks pedidos, en el mismo orden."""
+        rows = [self._row_by_chunk[cid] for cid in chunk_ids]
+        return np.asarray(self.matrix[rows], dtype=np.float32)
+
+    def _mask(
+        self,
+        source: str | None,
+        repo: str | None,
+        doc_type: str | None,
+        path_prefix: str | None,
+    ) -> np.ndarray:
+        mask = np.ones(len(self), dtype=bool)
+        if source is not None:
+            mask &= self.columns["source"] == source
+        if repo is not None:
+            mask &= self.columns["repo"] == repo
+        if doc_type is not None:
+            mask &= self.columns["doc_type"] == doc_type
+        if path_prefix:
+            mask &= np.char.startswith(self.columns["path"].astype(str), path_prefix)
+        return mask
+
+    def search(
+        self,
+        query_embedding: list[float],
+        *,
+        top_k: int = 10,
+        source: str | None = None,
+        repo: str | None = None,
+        doc_type: str | None = None,
+        path_prefix: str | None = None,
+    ) -> list[SearchResult]:
+        """Top-k exacto por similitud coseno sobre las filas que cumplen los filtros."""
+        rows = np.flatnonzero(self._mask(source, repo, doc_type, path_prefix))
+        if rows.size == 0:
+            return []
+
+        # Copia: el embedding del caller se reutiliza (cache, MMR, expansión).
+        q = np.array(query_embedding, dtype=np.float32)
+        q /= np.linalg.norm(q) or 1.0
+
+        # Por bloques para acotar la memoria al subir float16 → float32.
+        scores = np.empty(rows.size, dtype=np.float32)
+        for start in range(0, rows.size, _BLOCK_ROWS):
+            block = rows[start : start + _BLOCK_ROWS]
+            scores[start : start + block.size] = self.matrix[block].astype(np.float32) @ q
+
+        k = min(top_k, rows.size)
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top])]
+
+        cols = self.columns
+        return [
+            SearchResult(
+                doc_id=cols["doc_id"][i],
+                chunk_id=cols["chunk_id"][i],
+                repo=cols["repo"][i],
+                path=cols["path"][i],
+                heading=cols["heading"][i],
+                score=float(scores[j]),
+                snippet=cols["content"][i],
+                doc_type=cols["doc_type"][i],
+            )
+            for j, i in ((j, int(rows[j])) for j in top)
+        ]
+
+
+def _published_matrix(directory: pathlib.Path) -> str | None:
+    """Nombre del archivo de matriz del snapshot publicado, si hay uno."""
+    try:
+        meta = json.loads((directory / _META_FILE).read_text())
+    except (FileNotFoundError, json.JSONDecodeError):
+        return None
+    return meta.get("matrix", _MATRIX_FILE)
+
+
+def _remove_old_snapshots(directory: pathlib.Path, *, keep: str, previous: str | None) -> None:
+    """Borra el snapshot reemplazado y restos de escrituras interrumpidas.
+
+    El reemplazado se borra enseguida (un memmap ya abierto sigue siendo
+    válido); el resto solo si tiene más de ``_STALE_SECONDS``, para no
+    tocar lo que otro proceso está escribiendo.
+    """
+    if previous and previous != keep:
+        (directory / previous).unlink(missing_ok=True)
+
+    cutoff = time.time() - _STALE_SECONDS
+    for path in [*directory.glob("embeddings*.bin"), *directory.glob("*.tmp")]:
+        if path.name == keep:
+            continue
+        try:
+            if path.stat().st_mtime < cutoff:
+                path.unlink()
+        except FileNotFoundError:
+            pass
+
+
+_replica: VectorReplica | None = None
+_refresh_lock = asyncio.Lock()
+
+
+def get_replica() -> VectorReplica | None:
+    """Devuelve la réplica cargada o None si está deshabilitada / sin construir."""
+    return _replica
+
+
+async def refresh_replica(conn: asyncpg.Connection, settings: Settings) -> VectorReplica:
+    """Sincroniza la réplica con la DB trayendo solo los docs nuevos o modificados."""
+    global _replica
+
+    async with _refresh_lock:
+        t0 = time.time()
+        directory = pathlib.Path(settings.replica_dir)
+        current = _replica if _replica is not None else VectorReplica.load(directory)
+
+        # Versiones, chunks y generación del mismo snapshot.
+        async with conn.transaction(isolation="repeatable_read", readonly=True):
+            generation = await conn.fetchval("SELECT generation FROM index_state") or 0
+            versions = {r["id"]: r["version"] for r in await conn.fetch(_VERSIONS_QUERY)}
+            old_versions = current.doc_versions if current is not None else {}
+            changed = [doc_id for doc_id, v in versions.items() if old_versions.get(doc_id) != v]
+            removed = set(old_versions) - set(versions)
+
+            if current is not None and not changed and not removed:
+                current.generation = generation
+                _replica = current
+                return current
+
+            fetch_ids = changed if current is not None else None
+            fetched = await conn.fetch(_CHUNKS_QUERY, fetch_ids)
+
+        # Conserva las filas de docs intactos y agrega las recién traídas.
+        stale = removed | set(changed)
+        columns: dict[str, list] = {name: [] for name in _COLUMNS}
+        blocks: list[np.ndarray] = []
+        if current is not None and len(current):
+            keep = np.flatnonzero(
+                ~np.isin(current.columns["doc_id"], np.asarray(sorted(stale), dtype=object))
+            )
+            blocks.append(np.asarray(current.matrix[keep], dtype=np.float32))
+            for name in _COLUMNS:
+                columns[name].extend(current.columns[name][keep].tolist())
+
+        if fetched:
+            embeddings = [np.asarray(r["embedding"], dtype=np.float32) for r in fetched]
+            blocks.append(_normalize(np.stack(embeddings)))
+            for r in fetched:
+                for name in _COLUMNS:
+                    columns[name].append(r[name])
+
+        matrix = (
+            np.concatenate(blocks)
+            if blocks
+            else np.zeros((0, settings.embedding_dimensions), dtype=np.float32)
+        )
+        _replica = VectorReplica.write(
+            directory, matrix, columns, versions, settings.replica_dtype, generation
+        )
+
+        logger.info(
+            "replica_refreshed",
+            rows=len(_replica),
+            docs_changed=len(changed),
+            docs_removed=len(removed),
+            chunks_fetched=len(fetched),
+            duration=round(time.time() - t0, 2),
+        )
+        return _replica
+
+
+async def replica_refresh_loop(pool: asyncpg.Pool, settings: Settings) -> None:
+    """Refresca la réplica periódicamente (cubre syncs hechos por otras réplicas del API)."""
+    while True:
+        await asyncio.sleep(settings.replica_refresh_seconds)
+        try:
+            async with pool.acquire() as conn:
+                await refresh_replica(conn, settings)
+        except Exception as exc:
+            logger.warning("replica_refresh_failed", error=str(exc))
@@ -0,0 +1,158 @@
+"""Resolución difusa de nombres de docs (títulos, aliases y nombres de archivo).
+
+Las tools del agente reciben nombres escritos a mano ("Carteleria",
+"turn o matic", "webapi"). ``TitleIndex`` normaliza cada clave (sin
+acentos, minúsculas, separadores como espacio), la indexa por trigramas y
+devuelve candidatos rankeados con su score, en lugar de un único match
+arbitrario. La similitud por trigramas replica la de ``pg_trgm``, que es
+el respaldo en SQL (007_title_trgm.sql) cuando el grafo en memoria está
+deshabilitado.
+"""
+
+from __future__ import annotations
+
+import re
+import unicodedata
+from collections import defaultdict
+from dataclasses import dataclass
+from typing import Iterable
+
+_NON_ALNUM_RE = re.compile(r"[^a-z0-9]+")
+
+# Por debajo de esta similitud de trigramas no se considera candidato
+# (mismo default que ``pg_trgm.similarity_threshold``).
+MIN_SIMILARITY = 0.3
+
+# Desempate leve a favor de services: son el objetivo típico de las tools.
+_SERVICE_BONUS = 0.02
+
+
+def normalize(text: str) -> str:
+    """Minúsculas, sin acentos y con cualquier separador como un espacio."""
+    decomposed = unicodedata.normalize("NFKD", text)
+    ascii_text = "".join(ch for ch in decomposed if not unicodedata.combining(ch))
+    return _NON_ALNUM_RE.sub(" ", ascii_text.lower()).strip()
+
+
+def trigrams(text: str) -> set[str]:
+    """Trigramas estilo pg_trgm: cada palabra con dos espacios al inicio y uno al final."""
+    grams: set[str] = set()
+    for word in text.split():
+        padded = f"  {word} "
+        grams.update(padded[i : i + 3] for i in range(len(padded) - 2))
+    return grams
+
+
+def similarity(a: set[str], b: set[str]) -> float:
+    if not a or not b:
+        return 0.0
+    return len(a & b) / len(a | b)
+
+
+@dataclass
+class TitleMatch:
+    """Candidato de resolución con su score en [0, 1]."""
+
+    doc_id: str
+    title: str
+    doc_type: str | None
+    score: float
+    matched: str  # clave normalizada que dio el mejor score
+
+
+@dataclass
+class _Key:
+    doc_id: str
+    text: str
+    compact: str
+    grams: set[str]
+
+
+class TitleIndex:
+    """Índice invertido de trigramas sobre títulos, aliases y nombres de archivo."""
+
+    def __init__(self) -> None:
+        self._docs: dict[str, tuple[str, str | None]] = {}
+        self._keys: list[_Key] = []
+        self._by_compact: dict[str, set[int]] = defaultdict(set)
+        self._postings: dict[str, set[int]] = defaultdict(set)
+
+    def __len__(self) -> int:
+        return len(self._docs)
+
+    def add(
+        self,
+        doc_id: str,
+        title: str,
+        doc_type: str | None,
+        *,
+        path: str | None = None,
+        aliases: Iterable[str] = (),
+    ) -> None:
+        self._docs[doc_id] = (title, doc_type)
+        names = [title, *aliases]
+        if path:
+            names.append(path.rsplit("/", 1)[-1].rsplit(".", 1)[0])
+        for name in names:
+            text = normalize(str(name))
+            if not text:
+                continue
+            key = _Key(doc_id, text, text.replace(" ", ""), trigrams(text))
+            idx = len(self._keys)
+            self._keys.append(key)
+            self._by_compact[key.compact].add(idx)
+            for gram in key.grams:
+                self._postings[gram].add(idx)
+
+    def _score(self, key: _Key, compact: str, grams: set[str]) -> float:
+        if key.compact == compact:
+            return 1.0
+        if compact in key.compact:
+            # Substring: mejor cuanto más del nombre cubre la query.
+            return 0.6 + 0.35 * len(compact) / len(key.compact)
+        return similarity(grams, key.grams)
+
+    def search(
+        self,
+        query: str,
+        *,
+        limit: int = 5,
+        min_score: float = MIN_SIMILARITY,
+    ) -> list[TitleMatch]:
+        """Candidatos ordenados por score (mejor clave por doc)."""
+        text = normalize(query)
+        if not text:
+            return []
+        compact = text.replace(" ", "")
+        grams = trigrams(text)
+
+        candidates = set(self._by_compact.get(compact, ()))
+        for gram in grams:
+            candidates |= self._postings.get(gram, set())
+        # Los substrings cortos ("api") pueden no compartir trigramas con
+        # bordes de palabra; se revisan por contención directa.
+        if len(compact) <= 4:
+            candidates |= {i for i, k in enumerate(self._keys) if compact in k.compact}
+
+        best: dict[str, tuple[float, str]] = {}
+        for idx in candidates:
+            key = self._keys[idx]
+            score = self._score(key, compact, grams)
+            if score > best.get(key.doc_id, (-1.0, ""))[0]:
+                best[key.doc_id] = (score, key.text)
+
+        matches = []
+        for doc_id, (score, matched) in best.items():
+            if score < min_score:
+                continue
+            title, doc_type = self._docs[doc_id]
+            if doc_type == "service" and score < 1.0:
+                score = min(score + _SERVICE_BONUS, 0.99)
+            matches.append(TitleMatch(doc_id, title, doc_type, round(score, 4), matched))
+
+        matches.sort(key=lambda m: (-m.score, m.doc_type != "service", len(m.title)))
+        return matches[:limit]
+
+    def best(self, query: str) -> TitleMatch | None:
+        matches = self.search(query, limit=1)
+        return matches[0] if matches else None
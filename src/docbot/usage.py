@@ -0,0 +1,127 @@
+"""Contabilidad de tokens del LLM por request, endpoint y comando.
+
+Cada endpoint que llama al LLM abre ``track_usage(endpoint, command)``; las
+capas que hablan con OpenAI (``docbot.rag.answerer``, el agente) registran
+el ``usage`` de cada respuesta con ``record_openai_usage`` /
+``record_message_usage`` sin recibir nada explícito, porque el acumulador
+del request vive en un ``ContextVar`` (igual que el perfil de
+``docbot.profiling``).
+
+Al cerrar el request se loguea ``llm_usage`` y se suma al resumen del
+proceso por ``(endpoint, comando)``, expuesto en ``GET /admin/usage``.
+``cached_tokens`` son los tokens del prompt servidos desde el prompt
+caching del proveedor: su proporción muestra si el prefijo estático de
+los prompts se está reutilizando.
+"""
+
+from __future__ import annotations
+
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass
+from typing import Any, Iterator
+
+import structlog
+
+logger = structlog.get_logger(__name__)
+
+
+@dataclass
+class TokenUsage:
+    """Tokens acumulados de una o más llamadas al LLM."""
+
+    calls: int = 0
+    prompt_tokens: int = 0
+    completion_tokens: int = 0
+    cached_tokens: int = 0  # parte de prompt_tokens leída del prompt cache
+
+    def add(self, prompt_tokens: int, completion_tokens: int, cached_tokens: int = 0) -> None:
+        self.calls += 1
+        self.prompt_tokens += prompt_tokens
+        self.completion_tokens += completion_tokens
+        self.cached_tokens += cached_tokens
+
+    def merge(self, other: TokenUsage) -> None:
+        self.calls += other.calls
+        self.prompt_tokens += other.prompt_tokens
+        self.completion_tokens += other.completion_tokens
+        self.cached_tokens += other.cached_tokens
+
+    @property
+    def cache_hit_rate(self) -> float:
+        return self.cached_tokens / self.prompt_tokens if self.prompt_tokens else 0.0
+
+
+@dataclass
+class UsageSummary(TokenUsage):
+    """Acumulado del proceso para un endpoint y comando."""
+
+    requests: int = 0
+
+    def record(self, usage: TokenUsage) -> None:
+        self.requests += 1
+        self.merge(usage)
+
+
+_current: ContextVar[TokenUsage | None] = ContextVar("docbot_usage", default=None)
+_summaries: dict[tuple[str, str | None], UsageSummary] = {}
+
+
+@contextmanager
+def track_usage(endpoint: str, command: str | None = None) -> Iterator[TokenUsage]:
+    """Acumula el uso del LLM dentro del bloque y lo cierra como un request."""
+    usage = TokenUsage()
+    _current.set(usage)
+    try:
+        yield usage
+    finally:
+        # set en lugar de reset: un generador SSE puede cerrarse desde otro contexto.
+        _current.set(None)
+        _summaries.setdefault((endpoint, command), UsageSummary()).record(usage)
+        if usage.calls:
+            logger.info(
+                "llm_usage",
+                endpoint=endpoint,
+                command=command,
+                calls=usage.calls,
+                prompt_tokens=usage.prompt_tokens,
+                completion_tokens=usage.completion_tokens,
+                cached_tokens=usage.cached_tokens,
+            )
+
+
+def current_usage() -> TokenUsage | None:
+    """Acumulador del request actual o None fuera de ``track_usage``."""
+    return _current.get()
+
+
+def record_openai_usage(usage: Any) -> None:
+    """Registra el ``usage`` (``CompletionUsage``) de una respuesta de OpenAI."""
+    current = _current.get()
+    if current is None or usage is None:
+        return
+    details = getattr(usage, "prompt_tokens_details", None)
+    current.add(
+        usage.prompt_tokens or 0,
+        usage.completion_tokens or 0,
+        (getattr(details, "cached_tokens", None) or 0) if details else 0,
+    )
+
+
+def record_message_usage(message: Any) -> None:
+    """Registra el ``usage_metadata`` de un AIMessage de LangChain, si lo trae."""
+    current = _current.get()
+    meta = getattr(message, "usage_metadata", None)
+    if current is None or not meta:
+        return
+    details = meta.get("input_token_details") or {}
+    current.add(
+        meta.get("input_tokens", 0),
+        meta.get("output_tokens", 0),
+        details.get("cache_read", 0) or 0,
+    )
+
+
+def usage_summaries() -> dict[tuple[str, str | None], UsageSummary]:
+    """Acumulado por ``(endpoint, comando)`` desde que arrancó el proceso."""
+    return _summaries
@@ -0,0 +1,105 @@
+"""Tests para los eventos de ``stream_agent`` sobre un grafo de pasos fijos."""
+
+from __future__ import annotations
+
+import asyncio
+
+from langchain_core.messages import AIMessage, AIMessageChunk, ToolMessage
+
+from docbot.agent import graph as agent_graph
+from docbot.agent.graph import (
+    AgentAnswer,
+    AgentClarification,
+    AgentStep,
+    invoke_agent,
+    stream_agent,
+)
+
+
+class _ScriptedAgent:
+    """Reproduce una secuencia fija de chunks de ``astream``."""
+
+    def __init__(self, chunks: list[tuple[str, object]]) -> None:
+        self.chunks = chunks
+
+    async def astream(self, _input, stream_mode):
+        for mode, chunk in self.chunks:
+            if mode in stream_mode:
+                yield mode, chunk
+
+
+def _collect(chunks, monkeypatch, **kwargs) -> list:
+    monkeypatch.setattr(agent_graph, "_compiled_graph", _ScriptedAgent(chunks))
+
+    async def run() -> list:
+        return [e async for e in stream_agent([{"role": "user", "content": "hola"}], **kwargs)]
+
+    return asyncio.run(run())
+
+
+def test_stream_agent_emits_tool_steps_tokens_and_answer(monkeypatch):
+    call = {"name": "knowledge_search", "args": {"query": "redis"}, "id": "c1"}
+    result = ToolMessage("[1] infra/redis.md", name="knowledge_search", tool_call_id="c1")
+    chunks = [
+        ("updates", {"agent": {"messages": [AIMessage(content="", tool_calls=[call])]}}),
+        ("updates", {"tools": {"messages": [result]}}),
+        ("messages", (AIMessageChunk(content="Redis "), {"langgraph_node": "agent"})),
+        ("messages", (AIMessageChunk(content="usa Sentinel."), {"langgraph_node": "agent"})),
+        ("updates", {"agent": {"messages": [AIMessage(content="Redis usa Sentinel.")]}}),
+    ]
+
+    events = _collect(chunks, monkeypatch)
+
+    kinds = [e.kind if isinstance(e, AgentStep) else type(e).__name__ for e in events]
+    assert kinds == ["tool_start", "tool_end", "token", "token", "AgentAnswer"]
+    assert events[0].args == {"query": "redis"}
+    assert events[-1].reply == "Redis usa Sentinel."
+    assert events[-1].tool_calls[0]["tool"] == "knowledge_search"
+
+
+def test_stream_agent_stops_on_ask_user(monkeypatch):
+    call = {"name": "ask_user", "args": {"question": "¿Qué ambiente?"}, "id": "c1"}
+    result = ToolMessage("x", name="ask_user", tool_call_id="c1")
+    chunks = [
+        ("updates", {"agent": {"messages": [AIMessage(content="", tool_calls=[call])]}}),
+        ("updates", {"tools": {"messages": [result]}}),
+    ]
+
+    events = _collect(chunks, monkeypatch)
+
+    assert len(events) == 1
+    assert isinstance(events[0], AgentClarification)
+    assert events[0].question == "¿Qué ambiente?"
+
+
+def test_invoke_agent_returns_final_result(monkeypatch):
+    chunks = [("updates", {"agent": {"messages": [AIMessage(content="Listo.")]}})]
+    monkeypatch.setattr(agent_graph, "_compiled_graph", _ScriptedAgent(chunks))
+
+    result = asyncio.run(invoke_agent([{"role": "user", "content": "hola"}]))
+
+    assert isinstance(result, AgentAnswer)
+    assert result.reply == "Listo."
+
+
+def test_stream_agent_separates_tool_turn_text_from_reply_tokens(monkeypatch):
+    call = {"name": "knowledge_search", "args": {"query": "redis"}, "id": "c1"}
+    result = ToolMessage("[1] infra/redis.md", name="knowledge_search", tool_call_id="c1")
+    preamble = AIMessage(content="Busco en la documentación.", tool_calls=[call])
+    chunks = [
+        ("messages", (AIMessageChunk(content="Busco en "), {"langgraph_node": "agent"})),
+        ("messages", (AIMessageChunk(content="la documentación."), {"langgraph_node": "agent"})),
+        ("updates", {"agent": {"messages": [preamble]}}),
+        ("updates", {"tools": {"messages": [result]}}),
+        ("messages", (AIMessageChunk(content="Usa "), {"langgraph_node": "agent"})),
+        ("messages", (AIMessageChunk(content="Sentinel."), {"langgraph_node": "agent"})),
+        ("updates", {"agent": {"messages": [AIMessage(content="Usa Sentinel.")]}}),
+    ]
+
+    events = _collect(chunks, monkeypatch)
+
+    steps = [e for e in events if isinstance(e, AgentStep)]
+    assert [s.kind for s in steps] == ["thinking", "tool_start", "tool_end", "token", "token"]
+    assert steps[0].text == "Busco en la documentación."
+    tokens = "".join(s.text for s in steps if s.kind == "token")
+    assert tokens == events[-1].reply == "Usa Sentinel."
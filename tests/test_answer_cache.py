@@ -0,0 +1,60 @@
+"""Tests para el cache semántico de respuestas."""
+
+from __future__ import annotations
+
+import time
+
+from docbot.rag.answerer import AnswerResult
+from docbot.rag.cache import AnswerCache
+
+_SCOPE = (None, None, None, False)
+
+
+def _put(cache: AnswerCache, question: str, embedding: list[float], scope=_SCOPE) -> None:
+    cache.put(
+        question,
+        embedding,
+        scope,
+        AnswerResult(answer=f"respuesta a {question}"),
+        doc_versions={},
+        generation=1,
+    )
+
+
+def test_find_respects_threshold_and_scope():
+    cache = AnswerCache(max_entries=10, threshold=0.95, ttl_seconds=60)
+    _put(cache, "cómo rotar credenciales", [1.0, 0.0, 0.0])
+
+    found = cache.find([0.99, 0.05, 0.0], _SCOPE)
+    assert found is not None
+    entry, similarity = found
+    assert entry.answer.answer == "respuesta a cómo rotar credenciales"
+    assert similarity > 0.95
+
+    assert cache.find([0.7, 0.7, 0.0], _SCOPE) is None
+    assert cache.find([1.0, 0.0, 0.0], ("github", None, None, False)) is None
+    assert cache.stats.hits == 1
+    assert cache.stats.misses == 2
+
+
+def test_ttl_lru_and_drop():
+    cache = AnswerCache(max_entries=2, threshold=0.9, ttl_seconds=60)
+    _put(cache, "a", [1.0, 0.0])
+    _put(cache, "b", [0.0, 1.0])
+
+    assert cache.find([1.0, 0.0], _SCOPE) is not None  # "a" pasa a ser el más reciente
+    _put(cache, "c", [-1.0, 0.0])
+    assert len(cache) == 2
+    assert cache.find([0.0, 1.0], _SCOPE) is None
+    assert cache.stats.evictions == 1
+
+    entry, _ = cache.find([1.0, 0.0], _SCOPE)
+    cache.drop(entry)
+    assert cache.find([1.0, 0.0], _SCOPE) is None
+    assert cache.stats.invalidations == 1
+
+    expired = AnswerCache(max_entries=2, threshold=0.9, ttl_seconds=0)
+    _put(expired, "a", [1.0, 0.0])
+    time.sleep(0.001)
+    assert expired.find([1.0, 0.0], _SCOPE) is None
+    assert len(expired) == 0
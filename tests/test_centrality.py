@@ -0,0 +1,51 @@
+"""Tests para el prior de centralidad del grafo."""
+
+from __future__ import annotations
+
+from docbot.search.centrality import CentralityPrior, apply_prior, pagerank
+from docbot.search.hybrid import SearchResult
+
+
+def _result(chunk_id: str, score: float, centrality: float) -> SearchResult:
+    return SearchResult(
+        doc_id=f"doc-{chunk_id}",
+        chunk_id=chunk_id,
+        repo="knowledge",
+        path=f"{chunk_id}.md",
+        heading=None,
+        score=score,
+        snippet="...",
+        centrality=centrality,
+    )
+
+
+def test_pagerank_favors_hubs_and_confidence():
+    # webapi, worker y cron dependen de postgres; cron menciona redis con baja confianza.
+    docs = ["webapi", "worker", "cron", "postgres", "redis", "orphan"]
+    edges = [
+        ("webapi", "postgres", 1.0),
+        ("worker", "postgres", 1.0),
+        ("cron", "postgres", 1.0),
+        ("cron", "redis", 0.2),
+    ]
+
+    scores = pagerank(docs, edges)
+
+    assert scores["postgres"] == 1.0
+    assert scores["redis"] < scores["postgres"]
+    assert scores["redis"] > scores["orphan"]
+    assert scores["orphan"] == scores["webapi"]
+    assert pagerank([], []) == {}
+
+
+def test_apply_prior_promotes_hub_on_close_scores():
+    results = [
+        _result("leaf", 0.82, 0.05),
+        _result("hub", 0.80, 1.0),
+        _result("far", 0.40, 1.0),
+    ]
+
+    ranked = apply_prior(results, CentralityPrior(weight=0.15))
+
+    assert [r.chunk_id for r in ranked] == ["hub", "leaf", "far"]
+    assert all(r.prior_score is not None for r in ranked)
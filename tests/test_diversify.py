@@ -0,0 +1,52 @@
+"""Tests para la diversificación MMR de resultados."""
+
+from __future__ import annotations
+
+import numpy as np
+
+from docbot.search.diversify import Diversity, mmr_select
+from docbot.search.hybrid import SearchResult
+
+
+def _result(chunk_id: str, doc_id: str, score: float) -> SearchResult:
+    return SearchResult(
+        doc_id=doc_id,
+        chunk_id=chunk_id,
+        repo="knowledge",
+        path=f"{doc_id}.md",
+        heading=None,
+        score=score,
+        snippet="",
+    )
+
+
+def test_mmr_skips_near_duplicates():
+    """Dos chunks casi idénticos: MMR prefiere uno distinto aunque tenga menos score."""
+    candidates = [
+        _result("a1", "a", 0.95),
+        _result("a2", "b", 0.94),
+        _result("c1", "c", 0.80),
+    ]
+    embeddings = np.array([[1.0, 0.0], [0.99, 0.01], [0.0, 1.0]])
+
+    selected = mmr_select(
+        candidates, embeddings, top_k=2, diversity=Diversity(lambda_mult=0.5, max_per_doc=None)
+    )
+
+    assert [r.chunk_id for r in selected] == ["a1", "c1"]
+
+
+def test_per_doc_cap():
+    candidates = [
+        _result("a1", "a", 0.95),
+        _result("a2", "a", 0.94),
+        _result("a3", "a", 0.93),
+        _result("b1", "b", 0.50),
+    ]
+    embeddings = np.eye(4)
+
+    selected = mmr_select(
+        candidates, embeddings, top_k=4, diversity=Diversity(lambda_mult=1.0, max_per_doc=2)
+    )
+
+    assert [r.chunk_id for r in selected] == ["a1", "a2", "b1"]
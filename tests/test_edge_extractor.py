@@ -0,0 +1,34 @@
+"""Tests para la deduplicación de edges antes del upsert."""
+
+from __future__ import annotations
+
+from docbot.indexer.edge_extractor import _merge_edges
+from docbot.models import Edge
+
+
+def _edge(title: str, relation: str, evidence: str, confidence: float) -> Edge:
+    return Edge(
+        from_doc_path="services/webapi.md",
+        to_doc_title=title,
+        relation_type=relation,
+        evidence=evidence,
+        confidence=confidence,
+    )
+
+
+def test_merge_collapses_same_target_and_relation():
+    resolved = [
+        ("d1", _edge("Redis", "related_service", "frontmatter.related_services", 1.0)),
+        ("d1", _edge("redis", "related_service", "wikilink [[redis]]", 0.7)),
+        ("d1", _edge("Redis", "depends_on", "frontmatter.depends_on", 1.0)),
+        ("d2", _edge("Postgres", "related_service", "wikilink [[Postgres]]", 0.7)),
+    ]
+
+    merged = {(to, rel): (ev, conf) for to, rel, ev, conf in _merge_edges(resolved)}
+
+    assert len(merged) == 3
+    assert merged[("d1", "related_service")] == (
+        "frontmatter.related_services; wikilink [[redis]]",
+        1.0,
+    )
+    assert merged[("d2", "related_service")][1] == 0.7
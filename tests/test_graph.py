@@ -0,0 +1,105 @@
+"""Tests para el grafo de dependencias en memoria."""
+
+from __future__ import annotations
+
+from docbot.search.blast_radius import compute_blast_radius, to_impact_result
+from docbot.search.graph import DependencyGraph, GraphNode
+
+
+def _node(doc_id: str, doc_type: str = "service") -> GraphNode:
+    return GraphNode(doc_id=doc_id, title=doc_id.capitalize(), doc_type=doc_type, criticality=None)
+
+
+def _graph() -> DependencyGraph:
+    # webapi y turnos dependen de redis; webapi <-> turnos es un ciclo
+    # (related_service en ambos sentidos); panel depende de webapi.
+    nodes = [_node("redis", "infra"), _node("webapi"), _node("turnos"), _node("panel")]
+    edges = [
+        ("webapi", "redis", "depends_on", None),
+        ("turnos", "redis", "depends_on", None),
+        ("webapi", "turnos", "related_service", None),
+        ("turnos", "webapi", "related_service", None),
+        ("panel", "webapi", "depends_on", None),
+    ]
+    return DependencyGraph(nodes, edges)
+
+
+def test_dependents_bfs_terminates_on_cycles():
+    graph = _graph()
+
+    direct = graph.dependents("redis", depth=1)
+    assert {n.doc_id for n in direct.nodes} == {"redis", "webapi", "turnos"}
+    assert len(direct.edges) == 2
+
+    deep = graph.dependents("redis", depth=10)
+    assert {n.doc_id for n in deep.nodes} == {"redis", "webapi", "turnos", "panel"}
+    # Cada arista aparece una sola vez aunque el ciclo se recorra desde ambos lados.
+    assert len(deep.edges) == 5
+
+
+def test_resolve_prefers_exact_then_services():
+    graph = DependencyGraph(
+        [
+            GraphNode("a", "Redis runbook", "runbook", None),
+            GraphNode("b", "Redis", "infra", None),
+            GraphNode("c", "Redis proxy", "service", None),
+            GraphNode("d", "Redis sentinel", "infra", None),
+        ],
+        [],
+    )
+    assert graph.resolve("redis").doc_id == "b"
+    assert graph.resolve("redis pro").doc_id == "c"
+    assert graph.resolve("nada") is None
+
+
+def test_forward_dependencies_and_relation_filter():
+    graph = _graph()
+
+    deps = graph.dependencies("panel", depth=2)
+    assert {n.doc_id for n in deps.nodes} == {"panel", "webapi", "redis", "turnos"}
+
+    only_depends = graph.dependencies("panel", depth=3, relation_types=["depends_on"])
+    assert {n.doc_id for n in only_depends.nodes} == {"panel", "webapi", "redis"}
+
+
+def test_shortest_path_directed_and_undirected():
+    graph = _graph()
+
+    path = graph.shortest_path("panel", "redis", directed=True)
+    assert [n.doc_id for n in path.nodes] == ["panel", "webapi", "redis"]
+    assert [e.relation_type for e in path.edges] == ["depends_on", "depends_on"]
+
+    assert graph.shortest_path("redis", "panel", directed=True) is None
+    assert len(graph.shortest_path("redis", "panel").edges) == 2
+
+
+def test_subgraph_is_induced():
+    sub = _graph().subgraph(["webapi", "turnos"])
+
+    assert {n.doc_id for n in sub.nodes} == {"webapi", "turnos"}
+    assert {(e.from_doc_id, e.to_doc_id) for e in sub.edges} == {
+        ("webapi", "turnos"),
+        ("turnos", "webapi"),
+    }
+
+
+def test_blast_radius_tracks_depth_paths_and_criticality():
+    graph = _graph()
+    graph.nodes["panel"].criticality = "high"
+
+    radius = compute_blast_radius(graph, "redis")
+    by_id = {n["doc_id"]: n for n in radius["nodes"]}
+    assert by_id["panel"]["depth"] == 2
+    assert by_id["panel"]["path"] == ["panel", "webapi", "redis"]
+
+    shallow = to_impact_result(radius, depth=1)
+    assert {n.doc_id for n in shallow.nodes} == {"redis", "webapi", "turnos"}
+    assert shallow.criticality_counts == {"unknown": 2}
+
+    full = to_impact_result(radius, depth=3)
+    assert full.paths["panel"] == ["Panel", "Webapi", "Redis"]
+    assert full.criticality_counts == {"unknown": 2, "high": 1}
+    # Mismas aristas que el recorrido en vivo.
+    assert len(full.edges) == len(graph.dependents("redis", depth=3).edges)
+
+    assert compute_blast_radius(graph, "panel") is None
@@ -0,0 +1,79 @@
+"""Tests para el armado del contexto del RAG por presupuesto de tokens."""
+
+from __future__ import annotations
+
+from docbot.rag.answerer import _format_chunks
+from docbot.rag.packing import ContextPacking, pack_context
+from docbot.search.hybrid import SearchResult
+
+
+def _chunk(
+    chunk_id: str,
+    *,
+    doc_id: str = "d1",
+    index: int | None = None,
+    tokens: int = 100,
+    text: str | None = None,
+    heading: str = "Intro",
+) -> SearchResult:
+    return SearchResult(
+        doc_id=doc_id,
+        chunk_id=chunk_id,
+        repo="knowledge",
+        path=f"docs/{doc_id}.md",
+        heading=heading,
+        score=0.5,
+        snippet=text or f"contenido único del chunk {chunk_id} en {doc_id}",
+        token_count=tokens,
+        chunk_index=index,
+    )
+
+
+def test_budget_keeps_ranking_order_and_skips_what_does_not_fit():
+    chunks = [
+        _chunk("a", doc_id="d1", tokens=600),
+        _chunk("b", doc_id="d2", tokens=500),
+        _chunk("c", doc_id="d3", tokens=300),
+    ]
+
+    packed = pack_context(chunks, ContextPacking(token_budget=1000))
+
+    assert [c.chunk_id for c in packed.chunks] == ["a", "c"]
+    assert packed.tokens == 900
+    assert packed.over_budget == 1
+
+    # El primero entra aunque solo ya supere el presupuesto.
+    assert len(pack_context(chunks[:1], ContextPacking(token_budget=100)).chunks) == 1
+
+
+def test_near_duplicates_are_dropped():
+    text = "para rotar credenciales de redis ejecutar el job rotate-secrets en el cluster"
+    chunks = [
+        _chunk("a", doc_id="d1", text=text),
+        _chunk("b", doc_id="d2", text=text + " prod"),
+        _chunk("a", doc_id="d1", text=text),
+    ]
+
+    packed = pack_context(chunks, ContextPacking())
+
+    assert [c.chunk_id for c in packed.chunks] == ["a"]
+    assert packed.duplicates == 2
+
+
+def test_adjacent_chunks_of_a_doc_are_merged_in_reading_order():
+    chunks = [
+        _chunk("c3", index=3, heading="Deploy"),
+        _chunk("x", doc_id="d2"),
+        _chunk("c5", index=5, heading="Rollback"),
+        _chunk("c4", index=4, heading="Deploy"),
+    ]
+
+    packed = pack_context(chunks, ContextPacking())
+
+    assert [[c.chunk_id for c in b.chunks] for b in packed.blocks] == [["c3", "c4", "c5"], ["x"]]
+    assert packed.blocks[0].tokens == 300
+
+    context = _format_chunks(packed.blocks)
+    assert context.startswith("[1] knowledge:docs/d1.md#Deploy\n")
+    assert "(knowledge:docs/d1.md#Rollback)" in context
+    assert "[2] knowledge:docs/d2.md#Intro" in context
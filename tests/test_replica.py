@@ -0,0 +1,148 @@
+"""Tests para la réplica vectorial en proceso."""
+
+from __future__ import annotations
+
+import asyncio
+import json
+import pathlib
+
+import numpy as np
+
+from docbot.search.replica import VectorReplica
+
+
+def _columns(n: int) -> dict[str, list]:
+    return {
+        "doc_id": [f"doc-{i // 2}" for i in range(n)],
+        "chunk_id": [f"chunk-{i}" for i in range(n)],
+        "source": ["obsidian"] * n,
+        "repo": ["knowledge"] * n,
+        "path": [("runbooks/" if i % 2 else "services/") + f"{i}.md" for i in range(n)],
+        "heading": [None] * n,
+        "doc_type": ["runbook" if i % 2 else "service" for i in range(n)],
+        "content": [f"contenido {i}" for i in range(n)],
+    }
+
+
+def test_replica_roundtrip_and_filtered_search(tmp_path: pathlib.Path):
+    """La réplica se reabre como memmap y respeta los filtros de hybrid_search."""
+    matrix = np.eye(6, 4, dtype=np.float32)
+    replica = VectorReplica.write(tmp_path, matrix, _columns(6), {}, "float16")
+
+    assert isinstance(replica.matrix, np.memmap)
+    assert len(replica) == 6
+
+    results = replica.search([0.0, 1.0, 0.0, 0.0], top_k=3)
+    assert results[0].chunk_id == "chunk-1"
+    assert results[0].score > 0.99
+
+    filtered = replica.search([0.0, 1.0, 0.0, 0.0], top_k=3, doc_type="service")
+    assert all(r.doc_type == "service" for r in filtered)
+    assert "chunk-1" not in {r.chunk_id for r in filtered}
+
+    by_path = replica.search([1.0, 0.0, 0.0, 0.0], top_k=10, path_prefix="runbooks/")
+    assert {r.chunk_id for r in by_path} == {"chunk-1", "chunk-3", "chunk-5"}
+
+
+def test_replica_load_missing_directory(tmp_path: pathlib.Path):
+    assert VectorReplica.load(tmp_path / "nope") is None
+
+
+def test_replica_generation_gates_result_cache(tmp_path: pathlib.Path, monkeypatch):
+    """Mientras la réplica no llega a la generación del índice, no se cachea lo que responde."""
+    from docbot.search import replica as replica_module
+    from docbot.search.hybrid import _replica_behind
+
+    matrix = np.eye(2, 4, dtype=np.float32)
+    replica = VectorReplica.write(tmp_path, matrix, _columns(2), {}, "float32", generation=3)
+    assert VectorReplica.load(tmp_path).generation == 3
+
+    monkeypatch.setattr(replica_module, "_replica", replica)
+    assert not _replica_behind(3)
+    assert _replica_behind(4)
+
+    monkeypatch.setattr(replica_module, "_replica", None)
+    assert not _replica_behind(4)
+
+
+def test_replica_write_publishes_snapshots_atomically(tmp_path: pathlib.Path):
+    """Cada snapshot tiene su propia matriz; el meta publicado nombra la vigente."""
+    first = VectorReplica.write(tmp_path, np.eye(2, 4), _columns(2), {}, "float32")
+    second = VectorReplica.write(tmp_path, np.eye(4, 4), _columns(4), {}, "float32")
+
+    matrices = sorted(p.name for p in tmp_path.glob("embeddings*.bin"))
+    assert len(matrices) == 1
+    assert json.loads((tmp_path / "meta.json").read_text())["matrix"] == matrices[0]
+    assert not list(tmp_path.glob("*.tmp"))
+
+    # Un memmap abierto del snapshot anterior sigue siendo legible.
+    assert len(first) == 2 and first.search([1.0, 0.0, 0.0, 0.0], top_k=1)
+    assert len(VectorReplica.load(tmp_path)) == len(second) == 4
+
+
+def test_replica_search_does_not_mutate_query(tmp_path: pathlib.Path):
+    replica = VectorReplica.write(tmp_path, np.eye(2, 4), _columns(2), {}, "float32")
+    query = np.array([3.0, 4.0, 0.0, 0.0], dtype=np.float32)
+
+    replica.search(query, top_k=1)
+    assert query.tolist() == [3.0, 4.0, 0.0, 0.0]
+
+
+class _LexicalConn:
+    """Conexión falsa que responde la rama full-text con filas fijas."""
+
+    def __init__(self, rows: list[dict]) -> None:
+        self.rows = rows
+        self.queries: list[str] = []
+
+    async def fetch(self, query: str, *args: object) -> list[dict]:
+        self.queries.append(query)
+        return self.rows
+
+
+def test_hybrid_search_uses_replica_for_vector_branch(tmp_path: pathlib.Path, monkeypatch):
+    """En modo híbrido la réplica responde la rama vectorial y Postgres solo la léxica."""
+    from docbot.search import replica as replica_module
+    from docbot.search.hybrid import FusionWeights, _run_search
+
+    replica = VectorReplica.write(tmp_path, np.eye(4, 4), _columns(4), {}, "float32")
+    monkeypatch.setattr(replica_module, "_replica", replica)
+    lexical_row = {
+        "doc_id": "doc-1",
+        "chunk_id": "chunk-3",
+        "repo": "knowledge",
+        "path": "runbooks/3.md",
+        "heading": None,
+        "score": 0.1,
+        "snippet": "contenido 3",
+        "doc_type": "runbook",
+        "centrality": 0.0,
+        "token_count": 12,
+        "chunk_index": 1,
+        "lexical_rank": 1,
+        "embedding": np.array([0.0, 0.0, 0.0, 1.0], dtype=np.float32),
+    }
+    conn = _LexicalConn([lexical_row])
+
+    results, embeddings = asyncio.run(
+        _run_search(
+            conn,
+            [1.0, 0.0, 0.0, 0.0],
+            limit=2,
+            source=None,
+            repo=None,
+            doc_type=None,
+            path_prefix=None,
+            query_text="contenido 3",
+            fusion=FusionWeights(candidates=4),
+            plan=None,
+            with_embeddings=True,
+        )
+    )
+
+    assert len(conn.queries) == 1 and "vec AS" not in conn.queries[0]
+    by_id = {r.chunk_id: r for r in results}
+    assert by_id["chunk-3"].lexical_rank == 1 and by_id["chunk-3"].vector_rank is not None
+    assert by_id["chunk-3"].token_count == 12
+    assert [r.chunk_id for r in results] == ["chunk-3", "chunk-0"]  # RRF de ambas ramas
+    assert embeddings.shape == (2, 4)
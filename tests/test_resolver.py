@@ -0,0 +1,40 @@
+"""Tests para el resolver difuso de títulos."""
+
+from __future__ import annotations
+
+from docbot.search.resolver import TitleIndex, normalize
+
+
+def _index() -> TitleIndex:
+    index = TitleIndex()
+    index.add("1", "Turn-o-Matic", "service", path="services/turn-o-matic.md")
+    index.add("2", "Cartelería Digital", "module", aliases=["ZeroQ TV"])
+    index.add("3", "Turn-o-Matic runbook", "runbook")
+    index.add("4", "WebAPI", "service", path="services/webapi.md")
+    return index
+
+
+def test_normalize_strips_accents_and_separators():
+    assert normalize("  Cartelería_Digital ") == "carteleria digital"
+    assert normalize("Turn-o-Matic") == "turn o matic"
+
+
+def test_search_ranks_variants():
+    index = _index()
+
+    top = index.search("turn o matic")
+    assert top[0].doc_id == "1" and top[0].score == 1.0
+    assert top[1].doc_id == "3"
+
+    assert index.best("turnomatic").doc_id == "1"
+    assert index.best("Carteleria").doc_id == "2"
+    assert index.best("zeroq tv").doc_id == "2"
+    assert index.best("web api").doc_id == "4"
+    assert index.best("api").doc_id == "4"
+
+
+def test_search_tolerates_typos_and_rejects_noise():
+    index = _index()
+
+    assert index.best("cartelria digital").doc_id == "2"
+    assert index.search("kubernetes") == []
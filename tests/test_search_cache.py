@@ -0,0 +1,31 @@
+"""Tests para el cache de resultados de búsqueda."""
+
+from __future__ import annotations
+
+from docbot.search.cache import SearchCache, make_key
+
+
+def test_cache_lru_eviction_and_hit_rate():
+    cache = SearchCache(max_entries=2)
+    cache.put(("a",), [1])
+    cache.put(("b",), [2])
+
+    assert cache.get(("a",)) == [1]  # "a" pasa a ser el más reciente
+    cache.put(("c",), [3])
+
+    assert cache.get(("b",)) is None
+    assert cache.get(("c",)) == [3]
+    assert cache.stats.evictions == 1
+    assert cache.stats.hits == 2
+    assert cache.stats.misses == 1
+    assert round(cache.stats.hit_rate, 2) == 0.67
+
+
+def test_make_key_depends_on_generation_and_filters():
+    emb = [0.1, 0.2, 0.3]
+    base = make_key(1, emb, top_k=10, doc_type="runbook")
+
+    assert base == make_key(1, list(emb), doc_type="runbook", top_k=10)
+    assert base != make_key(2, emb, top_k=10, doc_type="runbook")
+    assert base != make_key(1, emb, top_k=10, doc_type="service")
+    assert base != make_key(1, [0.1, 0.2, 0.31], top_k=10, doc_type="runbook")
@@ -0,0 +1,40 @@
+"""Tests para el formato de eventos Server-Sent Events."""
+
+from __future__ import annotations
+
+import json
+
+import structlog
+
+from docbot.api.schemas import AnswerStreamDone, CitationItem
+from docbot.api.sse import sse_error, sse_event
+
+
+def test_sse_event_is_single_line_json():
+    raw = sse_event("token", {"text": "línea 1\nlínea 2"})
+
+    assert raw.startswith("event: token\ndata: ")
+    assert raw.endswith("\n\n")
+    data_line = raw.splitlines()[1]
+    assert json.loads(data_line.removeprefix("data: ")) == {"text": "línea 1\nlínea 2"}
+
+
+def test_sse_event_serializes_models():
+    done = AnswerStreamDone(
+        answer="Ver [knowledge:infra/redis.md#HA]",
+        citations=[CitationItem(repo="knowledge", path="infra/redis.md", heading="HA")],
+    )
+
+    data = json.loads(sse_event("done", done).splitlines()[1].removeprefix("data: "))
+    assert data["citations"][0]["path"] == "infra/redis.md"
+    assert data["debug"] is None
+
+
+def test_sse_error_hides_exception_details():
+    structlog.contextvars.bind_contextvars(request_id="abc12345")
+    try:
+        data = json.loads(sse_error().splitlines()[1].removeprefix("data: "))
+    finally:
+        structlog.contextvars.clear_contextvars()
+
+    assert data == {"detail": "internal error", "request_id": "abc12345"}
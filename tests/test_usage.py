@@ -0,0 +1,73 @@
+"""Tests para la contabilidad de tokens del LLM."""
+
+from __future__ import annotations
+
+from langchain_core.messages import AIMessage
+from openai.types import CompletionUsage
+from openai.types.completion_usage import PromptTokensDetails
+
+from docbot import usage
+from docbot.rag.answerer import _messages
+from docbot.rag.packing import ContextPacking, pack_context
+from docbot.search.hybrid import SearchResult
+
+
+def test_usage_is_tracked_per_request_and_summarized():
+    usage._summaries.clear()
+
+    with usage.track_usage("/answer") as tracked:
+        usage.record_openai_usage(
+            CompletionUsage(
+                prompt_tokens=1200,
+                completion_tokens=80,
+                total_tokens=1280,
+                prompt_tokens_details=PromptTokensDetails(cached_tokens=1024),
+            )
+        )
+    with usage.track_usage("/chat", "user-story"):
+        usage.record_message_usage(
+            AIMessage(
+                content="hola",
+                usage_metadata={
+                    "input_tokens": 900,
+                    "output_tokens": 40,
+                    "total_tokens": 940,
+                    "input_token_details": {"cache_read": 0},
+                },
+            )
+        )
+        usage.record_message_usage(AIMessage(content="sin usage"))
+    with usage.track_usage("/answer"):
+        pass  # p.ej. respuesta del cache semántico: sin llamadas al LLM
+
+    assert tracked.calls == 1
+    assert usage.current_usage() is None
+    usage.record_openai_usage(CompletionUsage(prompt_tokens=1, completion_tokens=1, total_tokens=2))
+
+    summaries = usage.usage_summaries()
+    answer = summaries[("/answer", None)]
+    assert (answer.requests, answer.calls, answer.prompt_tokens) == (2, 1, 1200)
+    assert round(answer.cache_hit_rate, 3) == 0.853
+    chat = summaries[("/chat", "user-story")]
+    assert (chat.calls, chat.prompt_tokens, chat.completion_tokens) == (1, 900, 40)
+
+
+def test_rag_prompt_prefix_is_identical_across_requests():
+    def context(text: str):
+        chunk = SearchResult(
+            doc_id="d1",
+            chunk_id=text,
+            repo="knowledge",
+            path="docs/a.md",
+            heading=None,
+            score=0.5,
+            snippet=text,
+        )
+        return pack_context([chunk], ContextPacking())
+
+    first = _messages("¿qué usa webapi?", context("webapi usa fastapi"))
+    second = _messages("¿dónde corre redis?", context("redis corre en sentinel"))
+
+    assert first[0] == second[0]
+    assert first[0]["role"] == "system"
+    assert "webapi usa fastapi" not in first[0]["content"]